@@ -8,8 +8,14 @@ import time
 from flask import Flask, request, make_response, jsonify
 from flask_cors import CORS, cross_origin
 from functools import wraps
-import snapser_internal
 from snapser_internal.rest import ApiException
+import snapser_clients
+from settings_cache import settings_cache
+from json_provider import CodecJSONProvider, raw_json_response
+from blob_passthrough import get_blob_raw, payload_json
+import blob_codec
+import metrics
+import request_deadlines
 
 
 # Constants
@@ -32,7 +38,12 @@ logging.basicConfig(level=logging.DEBUG,
 
 # App Initialization
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 CORS(app, resources={r'/*': {'origins': '*'}})
+metrics.init_app(app)
+request_deadlines.init_app(app)
+metrics.register_stats('settings_cache', settings_cache.stats)
+metrics.register_stats('blob_codec', blob_codec.stats)
 
 # Decorators
 
@@ -185,25 +196,16 @@ def get_settings():
     tool_id = request.args.get('tool_id')
     environment = request.args.get('environment', default='DEFAULT')
     blob_owner_key = f"{tool_id}_{environment}"
-    # Make an internal call to Storage to get the settings
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        try:
-            api_response = api_instance.storage_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id=blob_owner_key,
-                gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
-            )
-            if api_response is None:
-                return make_response(jsonify(default_settings), 200)
-            return make_response(jsonify(json.loads(api_response.value)), 200)
-        except ApiException as e:
-            pass
+    # Read through the worker's settings cache, which only goes to Storage on a
+    # miss or when the cached CAS needs revalidating
+    try:
+        value = settings_cache.get(blob_owner_key, 'character_settings')
+        if value is None:
+            return make_response(jsonify(default_settings), 200)
+        # The blob is already JSON; send it without re-encoding
+        return raw_json_response(value)
+    except ApiException as e:
+        pass
     return make_response(jsonify(default_settings), 200)
 
    # return make_response(jsonify(), 200)
@@ -229,47 +231,44 @@ def update_settings():
             'error_message': 'Invalid JSON ' + str(e)
         }), 500)
 
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as api_client:
-        cas = '12345'
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        try:
-            api_response = api_instance.storage_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id=blob_owner_key,
-                gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
-            )
-            if api_response is not None:
-                cas = api_response.cas
-        except ApiException:
-            # You come here when the doc is not even present
-            pass
-        try:
-            api_response = api_instance.storage_replace_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id=blob_owner_key,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-                body={
-                    "value": json.dumps(blob_data),
-                    "ttl": 0,
-                    "create": True,
-                    "cas": cas
-                }
-            )
-            if api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'Server Error'
-                }), 500)
-            return make_response(jsonify(blob_data), 200)
-        except ApiException as e:
+    cas = '12345'
+    # Create an instance of the API class
+    api_instance = snapser_clients.storage_api()
+    try:
+        api_response = api_instance.storage_get_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id=blob_owner_key,
+            gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
+        )
+        if api_response is not None:
+            cas = api_response.cas
+    except ApiException:
+        # You come here when the doc is not even present
+        pass
+    try:
+        api_response = api_instance.storage_replace_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id=blob_owner_key,
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+            body={
+                "value": json.dumps(blob_data),
+                "ttl": 0,
+                "create": True,
+                "cas": cas
+            }
+        )
+        if api_response is None:
             return make_response(jsonify({
-                'error_message': 'Server Exception: ' + str(e)
+                'error_message': 'Server Error'
             }), 500)
+        settings_cache.invalidate(blob_owner_key, 'character_settings')
+        return make_response(jsonify(blob_data), 200)
+    except ApiException as e:
+        return make_response(jsonify({
+            'error_message': 'Server Exception: ' + str(e)
+        }), 500)
 
 # End: Configuration Tool: Built using the Snapser UI Builder
 
@@ -288,26 +287,14 @@ def get_settings_custom():
     tool_id = request.args.get('tool_id')
     environment = request.args.get('environment', default='DEFAULT')
     blob_owner_key = f"{tool_id}_{environment}"
-    # Make an internal call to Storage to get the settings
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        try:
-            api_response = api_instance.storage_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id=blob_owner_key,
-                gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
-            )
-            if api_response is None:
-                return make_response(jsonify(default_settings), 200)
-            final_payload = {"payload": json.loads(api_response.value)}
-            return make_response(jsonify(final_payload), 200)
-        except ApiException as e:
-            pass
+    # Read through the worker's settings cache
+    try:
+        value = settings_cache.get(blob_owner_key, 'character_settings')
+        if not value:
+            return make_response(jsonify(default_settings), 200)
+        return raw_json_response(payload_json(value))
+    except ApiException as e:
+        pass
     return make_response(jsonify(default_settings), 200)
 
    # return make_response(jsonify(), 200)
@@ -333,47 +320,44 @@ def update_settings_custom():
             'error_message': 'Invalid JSON ' + str(e)
         }), 500)
 
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as api_client:
-        cas = '12345'
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        try:
-            api_response = api_instance.storage_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id=blob_owner_key,
-                gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
-            )
-            if api_response is not None:
-                cas = api_response.cas
-        except ApiException:
-            # You come here when the doc is not even present
-            pass
-        try:
-            api_response = api_instance.storage_replace_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id=blob_owner_key,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-                body={
-                    "value": json.dumps(blob_data),
-                    "ttl": 0,
-                    "create": True,
-                    "cas": cas
-                }
-            )
-            if api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'Server Error'
-                }), 500)
-            return make_response(jsonify(blob_data), 200)
-        except ApiException as e:
+    cas = '12345'
+    # Create an instance of the API class
+    api_instance = snapser_clients.storage_api()
+    try:
+        api_response = api_instance.storage_get_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id=blob_owner_key,
+            gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
+        )
+        if api_response is not None:
+            cas = api_response.cas
+    except ApiException:
+        # You come here when the doc is not even present
+        pass
+    try:
+        api_response = api_instance.storage_replace_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id=blob_owner_key,
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+            body={
+                "value": json.dumps(blob_data),
+                "ttl": 0,
+                "create": True,
+                "cas": cas
+            }
+        )
+        if api_response is None:
             return make_response(jsonify({
-                'error_message': 'Server Exception: ' + str(e)
+                'error_message': 'Server Error'
             }), 500)
+        settings_cache.invalidate(blob_owner_key, 'character_settings')
+        return make_response(jsonify(blob_data), 200)
+    except ApiException as e:
+        return make_response(jsonify({
+            'error_message': 'Server Exception: ' + str(e)
+        }), 500)
 
 # End: Configuration Tool: Custom HTML Snap Configuration Tool
 
@@ -386,26 +370,15 @@ def get_user_data_custom(user_id):
     '''
     Get the user data for custom HTML User Manager tool
     '''
-    # Make an internal call to Storage to get the user data
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        try:
-            api_response = api_instance.storage_get_blob(
-                access_type='protected',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
-            )
-            if api_response is None:
-                return make_response(jsonify({"payload": ""}), 200)
-            final_payload = {"payload": json.loads(api_response.value)}
-            return make_response(jsonify(final_payload), 200)
-        except ApiException as e:
-            pass
+    # Make an internal call to Storage to get the user data. The blob is
+    # relayed as is, without decoding it
+    try:
+        _cas, value = get_blob_raw(user_id, 'characters', access_type='protected')
+        if not value:
+            return make_response(jsonify({"payload": ""}), 200)
+        return raw_json_response(payload_json(value))
+    except ApiException as e:
+        pass
     return make_response(jsonify({"payload": ""}), 200)
 
 
@@ -427,47 +400,44 @@ def update_user_data_custom(user_id):
             'error_message': 'Invalid JSON ' + str(e)
         }), 500)
 
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as api_client:
-        cas = '12345'
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        try:
-            api_response = api_instance.storage_get_blob(
-                access_type='protected',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
-            )
-            if api_response is not None:
-                cas = api_response.cas
-        except ApiException:
-            # You come here when the doc is not even present
-            pass
-        try:
-            api_response = api_instance.storage_replace_blob(
-                access_type='protected',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-                body={
-                    "value": json.dumps(blob_data),
-                    "ttl": 0,
-                    "create": True,
-                    "cas": cas
-                }
-            )
-            if api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'Server Error'
-                }), 500)
-            return make_response(jsonify(blob_data), 200)
-        except ApiException as e:
+    cas = '12345'
+    # Create an instance of the API class
+    api_instance = snapser_clients.storage_api()
+    try:
+        api_response = api_instance.storage_get_blob(
+            access_type='protected',
+            blob_key='characters',
+            owner_id=user_id,
+            gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
+        )
+        if api_response is not None:
+            cas = api_response.cas
+    except ApiException:
+        # You come here when the doc is not even present
+        pass
+    try:
+        api_response = api_instance.storage_replace_blob(
+            access_type='protected',
+            blob_key='characters',
+            owner_id=user_id,
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+            body={
+                # Plain JSON: game clients read protected blobs straight from Storage
+                "value": json.dumps(blob_data),
+                "ttl": 0,
+                "create": True,
+                "cas": cas
+            }
+        )
+        if api_response is None:
             return make_response(jsonify({
-                'error_message': 'Server Exception: ' + str(e)
+                'error_message': 'Server Error'
             }), 500)
+        return make_response(jsonify(blob_data), 200)
+    except ApiException as e:
+        return make_response(jsonify({
+            'error_message': 'Server Exception: ' + str(e)
+        }), 500)
 
 # End: User Manager Tool: Custom HTML User Manager Tool
 
@@ -550,44 +520,40 @@ def settings_export():
     # Remember when storing these blobs we are storing them with `characters_dev`, `characters_stage` and `characters_prod` as the blob_key
     blob_key_ids = [characters_tool_id + '_' +
                     environment for environment in ['dev', 'stage', 'prod']]
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        try:
-            # Storage Settings
-            api_response = api_instance.storage_batch_get_blobs(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id=blob_key_ids,
-                gateway=os.environ.get(
-                    'SNAPEND_INTERNAL_HEADER', 'internal')
-            )
-            if api_response is None:
-                return make_response(jsonify(response), 200)
-            for result in api_response.results:
-                if result.success and result.response.owner_id == blob_key_ids[0] and \
-                        result.response.value is not None and result.response.value != "":
-                    # Load the dev data
-                    response['data']['dev']['characters'] = json.loads(
-                        result.response.value)
-                elif result.success and result.response.owner_id == blob_key_ids[1] and \
-                        result.response.value is not None and result.response.value != "":
-                    # Load the stage data
-                    response['data']['stage']['characters'] = json.loads(
-                        result.response.value)
-                elif result.success and result.response.owner_id == blob_key_ids[2] and \
-                        result.response.value is not None and result.response.value != "":
-                    # Load the prod data
-                    response['data']['prod']['characters'] = json.loads(
-                        result.response.value)
+    # Create an instance of the API class
+    api_instance = snapser_clients.storage_api()
+    try:
+        # Storage Settings
+        api_response = api_instance.storage_batch_get_blobs(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id=blob_key_ids,
+            gateway=os.environ.get(
+                'SNAPEND_INTERNAL_HEADER', 'internal')
+        )
+        if api_response is None:
             return make_response(jsonify(response), 200)
-        except ApiException as e:
-            return make_response(jsonify({
-                'error_message': 'API Exception' + str(e)
-            }), 500)
+        for result in api_response.results:
+            if result.success and result.response.owner_id == blob_key_ids[0] and \
+                    result.response.value is not None and result.response.value != "":
+                # Load the dev data
+                response['data']['dev']['characters'] = json.loads(
+                    result.response.value)
+            elif result.success and result.response.owner_id == blob_key_ids[1] and \
+                    result.response.value is not None and result.response.value != "":
+                # Load the stage data
+                response['data']['stage']['characters'] = json.loads(
+                    result.response.value)
+            elif result.success and result.response.owner_id == blob_key_ids[2] and \
+                    result.response.value is not None and result.response.value != "":
+                # Load the prod data
+                response['data']['prod']['characters'] = json.loads(
+                    result.response.value)
+        return make_response(jsonify(response), 200)
+    except ApiException as e:
+        return make_response(jsonify({
+            'error_message': 'API Exception' + str(e)
+        }), 500)
     return make_response(jsonify(response), 200)
 
 
@@ -726,26 +692,24 @@ def settings_import():
         }
         payload = {'blobs': [blob_dev, blob_stage, blob_prod]}
         # Save the characters to the storage
-        configuration = snapser_internal.Configuration(
-            host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-        )
-        with snapser_internal.ApiClient(configuration=configuration) as api_client:
-            # Create an instance of the API class
-            api_instance = snapser_internal.StorageServiceApi(api_client)
-            try:
-                api_response = api_instance.storage_batch_replace_blob(
-                    gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-                    body=payload,
-                )
-                if api_response is None:
-                    return make_response(jsonify({
-                        'error_message': 'Server Error'
-                    }), 500)
-                return make_response({'message': 'Success'}, 200)
-            except ApiException as e:
+        # Create an instance of the API class
+        api_instance = snapser_clients.storage_api()
+        try:
+            api_response = api_instance.storage_batch_replace_blob(
+                gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+                body=payload,
+            )
+            if api_response is None:
                 return make_response(jsonify({
-                    'error_message': 'Server Exception: ' + str(e)
+                    'error_message': 'Server Error'
                 }), 500)
+            for blob in payload['blobs']:
+                settings_cache.invalidate(blob['owner_id'], blob['blob_key'])
+            return make_response({'message': 'Success'}, 200)
+        except ApiException as e:
+            return make_response(jsonify({
+                'error_message': 'Server Exception: ' + str(e)
+            }), 500)
     except Exception as e:
         return make_response(jsonify({
             'error_message': 'Server Exception' + str(e)
@@ -790,28 +754,16 @@ def get_user_data(user_id):
         return make_response(jsonify({
             'error_message': 'Unauthorized'
         }), 401)
-    # Delete the character blob from storage
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as storage_api_client:
-        storage_api_instance = snapser_internal.StorageServiceApi(
-            storage_api_client)
-        try:
-            # Get blob
-            api_response = storage_api_instance.storage_get_blob(
-                access_type='private',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'No data'
-                }), 400)
-            return make_response(jsonify(json.loads(api_response.value)), 200)
-        except ApiException:
-            pass
+    try:
+        # Get the raw blob and relay it without decoding
+        _cas, value = get_blob_raw(user_id, 'characters')
+        if value is None:
+            return make_response(jsonify({
+                'error_message': 'No data'
+            }), 400)
+        return raw_json_response(value)
+    except ApiException:
+        pass
     return make_response(jsonify({}), 200)
 
 
@@ -842,26 +794,21 @@ def delete_user_data(user_id):
             'error_message': 'Unauthorized'
         }), 401)
     # Delete the character blob from storage
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
-    with snapser_internal.ApiClient(configuration=configuration) as storage_api_client:
-        storage_api_instance = snapser_internal.StorageServiceApi(
-            storage_api_client)
-        try:
-            # Get blob
-            storage_api_response = storage_api_instance.storage_delete_blob(
-                access_type='private',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if storage_api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'No blob'
-                }), 400)
-        except ApiException:
-            pass
+    storage_api_instance = snapser_clients.storage_api()
+    try:
+        # Get blob
+        storage_api_response = storage_api_instance.storage_delete_blob(
+            access_type='private',
+            blob_key='characters',
+            owner_id=user_id,
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+        )
+        if storage_api_response is None:
+            return make_response(jsonify({
+                'error_message': 'No blob'
+            }), 400)
+    except ApiException:
+        pass
     return make_response(jsonify({}), 200)
 
 # End: User Tool: Delete and Reset User data
@@ -0,0 +1,131 @@
+'''
+Benchmark: fanning out Storage calls with threads vs. asyncio.
+
+Starts a local stub Storage Snap that answers every blob GET after --latency-ms,
+then issues --calls concurrent `storage_get_blob` calls with:
+  1. `threads`: `ApiClient(pool_threads=N)` and `async_req=True`, the generated
+     way to run calls concurrently. Every in-flight call holds an OS thread.
+  2. `asyncio`: `AsyncStorageServiceApi` and `asyncio.gather` on one thread.
+
+Both clients get a connection pool of --concurrency, so the stub sees the same
+parallelism. Both runs report the peak number of
+threads in the client process.
+
+Requires aiohttp. Usage (from advanced/byosnap-python):
+    python benchmarks/bench_async_client.py --calls 1000 --concurrency 100 --latency-ms 20
+'''
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import snapser_internal  # noqa: E402
+
+PAYLOAD = json.dumps({"cas": "1", "value": json.dumps({"level": 12})}).encode()
+
+
+class StubStorageHandler(BaseHTTPRequestHandler):
+    '''
+    Keep-alive Storage stub that answers every GET after a fixed delay.
+    '''
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Both clients open --concurrency connections at once
+    request_queue_size = 1024
+
+
+def serve_stub(latency, port_queue):
+    server = StubServer(('127.0.0.1', 0), StubStorageHandler)
+    server.latency = latency
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub(latency):
+    '''
+    Run the stub in its own process so the thread counts below are the client's.
+    '''
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve_stub, args=(latency, port_queue),
+                                      daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get()}"
+
+
+def configuration(host, concurrency):
+    config = snapser_internal.Configuration(host=host)
+    config.connection_pool_maxsize = concurrency
+    return config
+
+
+def run_threads(host, calls, concurrency):
+    api_client = snapser_internal.ApiClient(
+        configuration(host, concurrency), pool_threads=concurrency)
+    api = snapser_internal.StorageServiceApi(api_client)
+    start = time.perf_counter()
+    pending = [api.storage_get_blob(f'user-{i}', 'private', 'characters', 'internal',
+                                    async_req=True) for i in range(calls)]
+    peak_threads = threading.active_count()
+    results = [result.get() for result in pending]
+    elapsed = time.perf_counter() - start
+    api_client.close()
+    return elapsed, peak_threads, results
+
+
+async def run_asyncio(host, calls, concurrency):
+    async with snapser_internal.AsyncApiClient(configuration(host, concurrency)) as api_client:
+        api = snapser_internal.AsyncStorageServiceApi(api_client)
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            api.storage_get_blob(f'user-{i}', 'private', 'characters', 'internal')
+            for i in range(calls)])
+        return time.perf_counter() - start, threading.active_count(), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    stub, host = start_stub(args.latency_ms / 1000)
+    baseline_threads = threading.active_count()
+    threaded = run_threads(host, args.calls, args.concurrency)
+    coroutines = asyncio.run(run_asyncio(host, args.calls, args.concurrency))
+    assert threaded[2] == coroutines[2]
+    stub.terminate()
+
+    print(f"{args.calls} calls, concurrency {args.concurrency}, "
+          f"stub latency {args.latency_ms:.0f} ms")
+    print(f"{'mode':<8} {'wall_s':>7} {'calls/s':>8} {'client_threads':>15}")
+    for mode, (elapsed, threads, _) in (('threads', threaded), ('asyncio', coroutines)):
+        print(f"{mode:<8} {elapsed:>7.2f} {args.calls / elapsed:>8.0f} "
+              f"{threads - baseline_threads:>15}")
+
+
+if __name__ == '__main__':
+    main()
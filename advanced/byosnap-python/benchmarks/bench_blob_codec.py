@@ -0,0 +1,85 @@
+'''
+Benchmark: compressing large Storage blob values with `blob_codec`.
+
+Builds a save blob of about --kb kilobytes, the same shape as
+bench_blob_passthrough.py, and reports for each algorithm:
+  - `ratio`: JSON bytes / stored bytes
+  - `encode_ms` / `decode_ms`: best time to compress or expand the blob once
+  - `saved_ms@<N>mbps`: time saved on one write plus one read of the blob over
+    a link of N megabits per second. The value crosses the link twice, and the
+    codec time is subtracted. A negative number means compression costs more
+    than it saves at that speed.
+
+Usage (from advanced/byosnap-python):
+    python benchmarks/bench_blob_codec.py --kb 10,100,1000 --mbps 100,1000
+'''
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def save_blob(kb):
+    item = {"id": 0, "name": "character", "level": 12,
+            "inventory": ["sword", "shield", "potion"], "position": [1.5, 2.5, 0.0]}
+    per_item = len(json.dumps(item))
+    return json.dumps({"characters": [dict(item, id=i, level=i % 60)
+                                      for i in range(kb * 1024 // per_item)]})
+
+
+def timed(fn, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_codec(algorithm):
+    # The algorithm is read from the environment at import time
+    os.environ['BLOB_CODEC_ALGORITHM'] = algorithm
+    os.environ.pop('BLOB_CODEC_LEVEL', None)
+    import blob_codec
+    return importlib.reload(blob_codec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kb', default='10,100,1000')
+    parser.add_argument('--mbps', default='100,1000')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    speeds = [float(mbps) for mbps in args.mbps.split(',')]
+
+    algorithms = ['zlib']
+    if load_codec('zstd').BLOB_CODEC_ALGORITHM == 'zstd':
+        algorithms.insert(0, 'zstd')
+    else:
+        print('zstandard is not installed; only zlib is measured')
+
+    header = f"{'kb':>6} {'algorithm':<9} {'ratio':>6} {'encode_ms':>10} {'decode_ms':>10}"
+    print(header + ''.join(f" {'saved_ms@%gmbps' % mbps:>18}" for mbps in speeds))
+    for kb in [int(kb) for kb in args.kb.split(',')]:
+        value = save_blob(kb)
+        raw_bytes = len(value.encode('utf-8'))
+        for algorithm in algorithms:
+            codec = load_codec(algorithm)
+            stored = codec.encode(value)
+            assert codec.decode(stored) == value
+            encode_s = timed(lambda: codec.encode(value), args.rounds)
+            decode_s = timed(lambda: codec.decode(stored), args.rounds)
+            saved = [2 * (raw_bytes - len(stored)) * 8 / (mbps * 1e6) - encode_s - decode_s
+                     for mbps in speeds]
+            print(f"{kb:>6} {algorithm:<9} {raw_bytes / len(stored):>6.1f} "
+                  f"{encode_s * 1000:>10.2f} {decode_s * 1000:>10.2f}"
+                  + ''.join(f" {s * 1000:>18.2f}" for s in saved))
+
+
+if __name__ == '__main__':
+    main()
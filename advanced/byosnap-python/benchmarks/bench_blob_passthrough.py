@@ -0,0 +1,89 @@
+'''
+Benchmark: relaying a large Storage blob through a handler.
+
+Builds a save blob of about --kb kilobytes, wraps it in the Storage
+`{"cas", "value"}` envelope and times the work a GET handler does after the
+response bytes arrive:
+  1. `decoded`: the generated path. `ApiClient.deserialize` builds a
+     `StorageGetBlobResponse`, the handler runs `json.loads` on the value and
+     `jsonify` re-encodes it.
+  2. `raw`: `blob_passthrough`. The envelope is decoded once and the value text
+     is sent as the body.
+
+Usage (from advanced/byosnap-python):
+    python benchmarks/bench_blob_passthrough.py --kb 100,500,1000 --rounds 20
+'''
+import argparse
+import json
+import os
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from flask import Flask, jsonify  # noqa: E402
+
+import snapser_internal  # noqa: E402
+from snapser_internal import json_codec  # noqa: E402
+from blob_passthrough import payload_json  # noqa: E402
+from json_provider import CodecJSONProvider, raw_json_response  # noqa: E402
+
+
+class FakeResponse:
+    '''
+    The part of RESTResponse that ApiClient.deserialize reads.
+    '''
+
+    def __init__(self, data):
+        self.data = data
+
+
+def save_blob(kb):
+    item = {"id": 0, "name": "character", "level": 12,
+            "inventory": ["sword", "shield", "potion"], "position": [1.5, 2.5, 0.0]}
+    per_item = len(json.dumps(item))
+    return json.dumps({"characters": [dict(item, id=i) for i in range(kb * 1024 // per_item)]})
+
+
+def timed(fn, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kb', default='100,500,1000')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.json = CodecJSONProvider(app)
+    api_client = snapser_internal.ApiClient()
+
+    def decoded(body):
+        model = api_client.deserialize(FakeResponse(body.decode('utf-8')),
+                                       'StorageGetBlobResponse')
+        return jsonify({"payload": json.loads(model.value)}).get_data()
+
+    def raw(body):
+        value = json_codec.loads(body)['value']
+        return raw_json_response(payload_json(value)).get_data()
+
+    print(f"json backend: {json_codec.BACKEND}")
+    print(f"{'blob_kb':>8} {'decoded_ms':>11} {'raw_ms':>8} {'speedup':>8}")
+    with app.app_context():
+        for kb in [int(size) for size in args.kb.split(',')]:
+            body = json.dumps({"cas": "1234", "value": save_blob(kb)}).encode('utf-8')
+            assert json.loads(decoded(body)) == json.loads(raw(body))
+            slow = timed(lambda: decoded(body), args.rounds)
+            fast = timed(lambda: raw(body), args.rounds)
+            print(f"{kb:>8} {slow * 1000:>11.2f} {fast * 1000:>8.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+'''
+Benchmark: pooled Snapser clients vs. one ApiClient per request.
+
+Starts a local stub Storage Snap that counts TCP connections and requests, then
+  1. `inproc`: calls storage_get_blob N times in this process, first building a
+     fresh ApiClient for every call (the old pattern) and then through
+     `snapser_clients` (the pooled registry).
+  2. `gunicorn`: boots this BYOSnap under gunicorn pointed at the stub and fires
+     N requests at `GET /v1/byosnap-advanced/settings`.
+
+With pooling, the number of connections the stub sees tracks the number of
+workers, not the number of requests.
+
+Usage (from advanced/byosnap-python):
+    python benchmarks/bench_client_pool.py --mode inproc --requests 500
+    python benchmarks/bench_client_pool.py --mode gunicorn --requests 500 --workers 2
+'''
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+BLOB_VALUE = json.dumps({"sections": [{"id": "registration", "components": [
+    {"id": "characters", "type": "textarea", "value": "warrior,mage"}]}]})
+
+
+class StubStorageHandler(BaseHTTPRequestHandler):
+    '''
+    Minimal keep-alive Storage stub. Every GET returns the same blob.
+    '''
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        with self.server.stats_lock:
+            self.server.connections += 1
+        super().handle()
+
+    def do_GET(self):
+        with self.server.stats_lock:
+            self.server.requests += 1
+        payload = json.dumps({"cas": "1", "value": BLOB_VALUE}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    '''
+    Start the stub Storage server on a free port.
+    '''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubStorageHandler)
+    server.daemon_threads = True
+    server.stats_lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def reset(server):
+    with server.stats_lock:
+        server.connections = 0
+        server.requests = 0
+
+
+def report(label, server, elapsed, n):
+    print(f"{label:<28} requests={server.requests:<6} "
+          f"connections={server.connections:<6} "
+          f"total={elapsed * 1000:8.1f}ms  per_call={elapsed / n * 1e6:8.1f}us")
+
+
+def get_blob(api_instance):
+    return api_instance.storage_get_blob(
+        access_type='private', blob_key='character_settings',
+        owner_id='characters_DEFAULT', gateway='internal')
+
+
+def bench_inproc(server, host, n):
+    import snapser_internal
+    import snapser_clients
+
+    reset(server)
+    start = time.perf_counter()
+    for _ in range(n):
+        configuration = snapser_internal.Configuration(host=host)
+        with snapser_internal.ApiClient(configuration=configuration) as api_client:
+            get_blob(snapser_internal.StorageServiceApi(api_client))
+    report('per-request ApiClient', server, time.perf_counter() - start, n)
+
+    reset(server)
+    start = time.perf_counter()
+    for _ in range(n):
+        get_blob(snapser_clients.storage_api(host))
+    report('pooled snapser_clients', server, time.perf_counter() - start, n)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_gunicorn(server, host, n, workers):
+    port = free_port()
+    env = dict(os.environ, SNAPEND_STORAGE_HTTP_URL=host,
+               SNAPEND_INTERNAL_HEADER='internal')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b',
+         f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=APP_DIR, env=env)
+    url = f'http://127.0.0.1:{port}/v1/byosnap-advanced/settings?tool_id=characters'
+    try:
+        deadline = time.time() + 20
+        while True:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/healthz')
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+        reset(server)
+        start = time.perf_counter()
+        for _ in range(n):
+            req = urllib.request.Request(url, headers={'Gateway': 'internal'})
+            urllib.request.urlopen(req).read()
+        report(f'gunicorn -w {workers}', server, time.perf_counter() - start, n)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mode', choices=['inproc', 'gunicorn'], default='inproc')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    server, host = start_stub()
+    if args.mode == 'inproc':
+        bench_inproc(server, host, args.requests)
+    else:
+        bench_gunicorn(server, host, args.requests, args.workers)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+'''
+Benchmark: validated vs. trusted response deserialization.
+
+Builds a representative JSON payload for each of the 144 pydantic models in
+`snapser_internal.models` (the other generated models are enums). It then times
+`ApiClient.deserialize` in each mode:
+  1. `validated`: the generated path (type-string regexes, `from_dict`, pydantic
+     `parse_obj` for every nested model).
+  2. `trusted`: `ApiClient(trusted_responses=True)`, which uses the compiled
+     decoders in `snapser_internal.deserializers`.
+
+Before timing, every model is checked to produce the same `to_dict()` on both paths.
+
+Usage (from advanced/byosnap-python):
+    python benchmarks/bench_deserialize.py --iterations 2000 --top 10
+'''
+import argparse
+import enum
+import inspect
+import json
+import os
+import sys
+import time
+
+from pydantic import BaseModel, ConstrainedInt
+from pydantic.fields import SHAPE_DICT, SHAPE_LIST
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import snapser_internal  # noqa: E402
+import snapser_internal.models  # noqa: E402
+
+
+class FakeResponse:
+    '''
+    The part of RESTResponse that ApiClient.deserialize reads.
+    '''
+
+    def __init__(self, data):
+        self.data = data
+
+
+def sample_value(field, depth):
+    klass = field.type_
+    if isinstance(klass, type) and issubclass(klass, BaseModel):
+        item = sample_payload(klass, depth + 1) if depth < 3 else None
+    elif isinstance(klass, type) and issubclass(klass, enum.Enum):
+        item = list(klass)[0].value
+    elif isinstance(klass, type) and issubclass(klass, ConstrainedInt):
+        item = 3600
+    elif getattr(klass, '__name__', '') == 'StrictBool':
+        item = True
+    elif 'Dict' in str(klass) or klass is object:
+        return {'key': 'value'}
+    elif getattr(klass, '__origin__', None) is not None:
+        # ApiHttpBody.data: base64 bytes or str
+        item = 'dmFsdWU='
+    elif field.name == 'access_type':
+        # The only string field with a validator besides ApiHttpBody.data
+        item = 'private'
+    else:
+        item = 'value'
+    if field.shape == SHAPE_LIST:
+        return [item, item, item] if item is not None else None
+    if field.shape == SHAPE_DICT:
+        return {'a': item, 'b': item} if item is not None else None
+    return item
+
+
+def sample_payload(klass, depth=0):
+    payload = {}
+    for field in klass.__fields__.values():
+        value = sample_value(field, depth)
+        if value is not None:
+            payload[field.alias] = value
+    return payload
+
+
+def models():
+    for name, klass in sorted(vars(snapser_internal.models).items()):
+        if inspect.isclass(klass) and issubclass(klass, BaseModel):
+            yield name, klass
+
+
+def timed(api_client, response, name, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        api_client.deserialize(response, name)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    validated = snapser_internal.ApiClient()
+    trusted = snapser_internal.ApiClient(trusted_responses=True)
+
+    rows = []
+    for name, klass in models():
+        response = FakeResponse(json.dumps(sample_payload(klass)))
+        expected = validated.deserialize(response, name).to_dict()
+        actual = trusted.deserialize(response, name).to_dict()
+        assert expected == actual, f"{name}: {expected} != {actual}"
+        rows.append((name,
+                     timed(validated, response, name, args.iterations),
+                     timed(trusted, response, name, args.iterations)))
+
+    total_validated = sum(row[1] for row in rows)
+    total_trusted = sum(row[2] for row in rows)
+    print(f"{len(rows)} models, {args.iterations} iterations each")
+    print(f"{'model':<48} {'validated_us':>12} {'trusted_us':>10} {'speedup':>8}")
+    for name, v, t in sorted(rows, key=lambda row: -row[1])[:args.top]:
+        print(f"{name:<48} {v * 1e6:>12.1f} {t * 1e6:>10.1f} {v / t:>7.1f}x")
+    print(f"{'all models (sum)':<48} {total_validated * 1e6:>12.1f} "
+          f"{total_trusted * 1e6:>10.1f} {total_validated / total_trusted:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Benchmark: cold start of a BYOSnap worker.
+
+Each round starts a fresh Python process that imports the app, the way a
+gunicorn worker does, and reports:
+  - `import_ms`: time to `import app`
+  - `ready_ms`: the import plus loading `StorageServiceApi`, which the first
+    Storage call has to do
+  - `rss_mb`: peak resident memory of the process
+The SDK imports its APIs and models on first access. `eager` sets
+SNAPSER_EAGER_IMPORTS=true, which imports all of them up front as the SDK used
+to do.
+
+The apps are imported from a scratch working directory, so files they write
+on import (such as swagger.json) do not touch the repo.
+
+Usage (from advanced/byosnap-python):
+    python benchmarks/bench_import_time.py --rounds 5
+    python benchmarks/bench_import_time.py --app-dirs .,../../games/byosnap-characters,../../ai/mcp/byosnap-mcp-python
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import app  # noqa: F401
+imported = time.perf_counter() - start
+getattr(sys.modules[sys.argv[1]], 'StorageServiceApi')
+ready = time.perf_counter() - start
+print(json.dumps({"import_ms": imported * 1000, "ready_ms": ready * 1000,
+                  "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+'''
+
+
+def sdk_package(app_dir):
+    # The characters Snap names its SDK package `snapser`
+    return 'snapser_internal' if os.path.isdir(os.path.join(app_dir, 'snapser_internal')) \
+        else 'snapser'
+
+
+def run(app_dir, eager, scratch):
+    env = dict(os.environ, PYTHONPATH=app_dir,
+               SNAPSER_EAGER_IMPORTS='true' if eager else 'false')
+    out = subprocess.run([sys.executable, '-c', CHILD, sdk_package(app_dir)],
+                         cwd=scratch, env=env, check=True,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--app-dirs', default='.')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'app':<24} {'mode':<6} {'import_ms':>10} {'ready_ms':>9} {'rss_mb':>7}")
+    with tempfile.TemporaryDirectory() as scratch:
+        for app_dir in [os.path.abspath(path) for path in args.app_dirs.split(',')]:
+            for eager in (True, False):
+                runs = [run(app_dir, eager, scratch) for _ in range(args.rounds)]
+                median = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+                print(f"{os.path.basename(app_dir):<24} {'eager' if eager else 'lazy':<6} "
+                      f"{median['import_ms']:>10.0f} {median['ready_ms']:>9.0f} "
+                      f"{median['rss_mb']:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
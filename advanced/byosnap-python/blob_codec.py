@@ -0,0 +1,154 @@
+'''
+Compression of large Storage blob values.
+
+User blobs, such as the `characters` save blob, are stored as JSON text. Every
+`storage_replace_blob` sends the whole value and every `storage_get_blob` reads
+it back. `encode` compresses values of BLOB_CODEC_MIN_BYTES or more and stores
+them as a JSON string with a short header:
+
+    "snapz1:zstd:<base64 of the compressed JSON text>"
+
+`decode` expands such values and returns any other value unchanged. Blobs
+written before this module, or below the threshold, keep working. A value is
+only stored compressed when that makes it smaller. A plain value that starts
+like the header, such as the JSON string "snapz1:zlib:hello", is stored with
+its first letter escaped ("\u0073napz1:zlib:hello"), which is the same JSON
+value. A value that starts with the header but does not decode is returned
+unchanged.
+
+The stored value is still valid JSON. Anything that reads the blob straight
+from Storage, such as a game client or the Snapser web app, sees the encoded
+string, though. Only use the codec for blobs that are always read through this
+Snap.
+
+zstd is used when the `zstandard` package is installed, zlib otherwise. The
+header names the algorithm, so zlib blobs can always be read, and zstd blobs
+wherever `zstandard` is installed.
+
+Tuning (environment variables):
+  - BLOB_CODEC_MIN_BYTES: smallest value that is compressed (default 4096)
+  - BLOB_CODEC_ALGORITHM: 'zstd', 'zlib', or 'none' to write plain JSON
+    (default zstd when installed). Reads always decode.
+  - BLOB_CODEC_LEVEL: compression level (default 3 for zstd, 6 for zlib)
+'''
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+_DECODE_ERRORS = (ValueError, zlib.error) + \
+    ((zstandard.ZstdError,) if zstandard is not None else ())
+
+# Constants
+MAGIC = '"snapz1:'
+BLOB_CODEC_MIN_BYTES = int(os.getenv('BLOB_CODEC_MIN_BYTES', '4096'))
+BLOB_CODEC_ALGORITHM = os.getenv(
+    'BLOB_CODEC_ALGORITHM', 'zstd' if zstandard is not None else 'zlib').lower()
+if BLOB_CODEC_ALGORITHM == 'zstd' and zstandard is None:
+    BLOB_CODEC_ALGORITHM = 'zlib'
+BLOB_CODEC_LEVEL = int(os.getenv('BLOB_CODEC_LEVEL',
+                                 '3' if BLOB_CODEC_ALGORITHM == 'zstd' else '6'))
+
+_stats = {'compressed': 0, 'stored_plain': 0, 'decompressed': 0,
+          'raw_bytes': 0, 'stored_bytes': 0, 'compress_us': 0, 'decompress_us': 0}
+_stats_lock = threading.Lock()
+
+
+def _compress(algorithm: str, data: bytes) -> bytes:
+    if algorithm == 'zstd':
+        # ZstdCompressor objects are not thread safe, so one per call
+        return zstandard.ZstdCompressor(level=BLOB_CODEC_LEVEL).compress(data)
+    return zlib.compress(data, BLOB_CODEC_LEVEL)
+
+
+def _decompress(algorithm: str, data: bytes) -> bytes:
+    if algorithm == 'zstd':
+        if zstandard is None:
+            raise ValueError('blob is zstd compressed but zstandard is not installed')
+        return zstandard.ZstdDecompressor().decompress(data)
+    if algorithm == 'zlib':
+        return zlib.decompress(data)
+    raise ValueError('unknown blob compression ' + repr(algorithm))
+
+
+def _plain(value: str) -> str:
+    # The same JSON text, but never read back as compressed
+    if value.startswith(MAGIC):
+        return '"\\u%04x' % ord(MAGIC[1]) + value[2:]
+    return value
+
+
+def encode(value: str) -> str:
+    '''
+    Return the value to store for the JSON text `value`.
+    '''
+    raw = value.encode('utf-8')
+    if BLOB_CODEC_ALGORITHM == 'none' or len(raw) < BLOB_CODEC_MIN_BYTES:
+        return _plain(value)
+    started = time.perf_counter()
+    packed = base64.b64encode(_compress(BLOB_CODEC_ALGORITHM, raw)).decode('ascii')
+    encoded = MAGIC + BLOB_CODEC_ALGORITHM + ':' + packed + '"'
+    elapsed_us = int((time.perf_counter() - started) * 1000000)
+    with _stats_lock:
+        _stats['compress_us'] += elapsed_us
+        if len(encoded) >= len(raw):
+            # Already dense, e.g. a blob of random ids
+            _stats['stored_plain'] += 1
+            return _plain(value)
+        _stats['compressed'] += 1
+        _stats['raw_bytes'] += len(raw)
+        _stats['stored_bytes'] += len(encoded)
+    return encoded
+
+
+def decode(value: Optional[str]) -> Optional[str]:
+    '''
+    Return the JSON text of a stored value, expanding it if `encode` compressed it.
+    '''
+    if not value or not value.startswith(MAGIC) or not value.endswith('"'):
+        return value
+    started = time.perf_counter()
+    algorithm, _, packed = value[len(MAGIC):-1].partition(':')
+    if algorithm == 'zstd' and zstandard is None:
+        raise ValueError('blob is zstd compressed but zstandard is not installed')
+    try:
+        text = _decompress(algorithm, base64.b64decode(packed, validate=True)).decode('utf-8')
+    except _DECODE_ERRORS:
+        # Not written by `encode`: a plain string stored before they were escaped
+        return value
+    elapsed_us = int((time.perf_counter() - started) * 1000000)
+    with _stats_lock:
+        _stats['decompressed'] += 1
+        _stats['decompress_us'] += elapsed_us
+    return text
+
+
+def dumps(obj: Any) -> str:
+    '''
+    `json.dumps` followed by `encode`.
+    '''
+    return encode(json.dumps(obj))
+
+
+def loads(value: str) -> Any:
+    '''
+    `decode` followed by `json.loads`.
+    '''
+    return json.loads(decode(value))
+
+
+def stats() -> Dict[str, int]:
+    '''
+    Counters for /metrics. The compression ratio is raw_bytes / stored_bytes,
+    and raw_bytes - stored_bytes is what no longer crosses the wire on a write.
+    '''
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,57 @@
+'''
+Raw reads of Storage blobs for handlers that only relay them.
+
+Handlers such as `get_user_data` return the stored JSON unchanged. The
+generated `storage_get_blob` would decode the whole response into a
+`StorageGetBlobResponse` model, and the handler would then `json.loads` the
+blob and `jsonify` it again. For multi-hundred-KB save blobs, that is three
+full passes over data the handler never looks at.
+
+`get_blob_raw` calls `storage_get_blob_with_http_info` with
+`_preload_content=False`. The SDK then skips its decode and model step and
+hands back the response bytes. Storage wraps the blob in a `{"cas", "value"}`
+envelope, where `value` is a JSON document encoded as a string, so the envelope
+is decoded once to unescape it. The blob itself is never parsed into Python
+objects. Pass the result to `json_provider.raw_json_response`, or use
+`payload_json` to wrap it for the custom HTML tools.
+
+Values that `blob_codec` compressed are expanded, so callers always get JSON.
+'''
+import os
+from typing import Optional, Tuple
+
+from snapser_internal import json_codec
+import blob_codec
+import snapser_clients
+
+
+def get_blob_raw(owner_id: str, blob_key: str,
+                 access_type: str = 'private') -> Tuple[Optional[str], Optional[str]]:
+    '''
+    Return (cas, value) for a blob, where value is the stored JSON text.
+
+    Returns (None, None) when Storage sends back an empty body. Errors raise
+    the same ApiException subclasses as `storage_get_blob`, e.g.
+    NotFoundException when the blob does not exist.
+    '''
+    api_response = snapser_clients.storage_api().storage_get_blob_with_http_info(
+        owner_id=owner_id,
+        access_type=access_type,
+        blob_key=blob_key,
+        gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal'),
+        _preload_content=False
+    )
+    # raw_data holds the undecoded body. Reading it to the end puts the
+    # connection back in the pool.
+    body = api_response.raw_data
+    if not body:
+        return None, None
+    envelope = json_codec.loads(body)
+    return envelope.get('cas'), blob_codec.decode(envelope.get('value'))
+
+
+def payload_json(value: str) -> bytes:
+    '''
+    Wrap stored JSON text as `{"payload": <value>}` without parsing it.
+    '''
+    return b'{"payload":' + value.encode('utf-8') + b'}'
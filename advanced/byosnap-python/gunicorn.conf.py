@@ -0,0 +1,23 @@
+'''
+Gunicorn settings, loaded automatically from the working directory.
+
+The workers share their Prometheus samples through files in
+PROMETHEUS_MULTIPROC_DIR (see metrics.py).
+'''
+import os
+import shutil
+
+# Set before the workers import the app, so prometheus_client sees it
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/byosnap-metrics')
+
+
+def on_starting(server):
+    # Samples left by a previous run would be merged into the new one
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
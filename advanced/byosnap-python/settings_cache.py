@@ -0,0 +1,134 @@
+'''
+Read-through cache for Configuration Tool blobs.
+
+Settings blobs are read on almost every request but change only when someone
+saves the Configuration Tool. Entries live for SETTINGS_CACHE_TTL_SECONDS. Once
+an entry expires it is revalidated with `storage_get_cas`. If the CAS has not
+moved, the cached value is kept and the blob itself is never transferred again.
+
+Writes made by this worker invalidate the entry right away. Other gunicorn
+workers pick up the change at their next revalidation, so a stale read lasts at
+most one TTL.
+
+Tuning (environment variables):
+  - SETTINGS_CACHE_TTL_SECONDS: seconds before an entry is revalidated (default 30)
+  - SETTINGS_CACHE_MAX_ENTRIES: entries kept before LRU eviction (default 256)
+'''
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from snapser_internal.exceptions import NotFoundException
+import snapser_clients
+from blob_passthrough import get_blob_raw
+
+
+# Constants
+SETTINGS_CACHE_TTL_SECONDS = float(os.getenv('SETTINGS_CACHE_TTL_SECONDS', '30'))
+SETTINGS_CACHE_MAX_ENTRIES = int(os.getenv('SETTINGS_CACHE_MAX_ENTRIES', '256'))
+
+
+class _Entry:
+    '''
+    A cached blob. `value` is None when the blob does not exist in Storage.
+    '''
+    __slots__ = ('cas', 'value', 'expires_at')
+
+    def __init__(self, cas: Optional[str], value: Optional[str], expires_at: float):
+        self.cas = cas
+        self.value = value
+        self.expires_at = expires_at
+
+
+class SettingsCache:
+    '''
+    Bounded LRU cache of Storage blob values keyed by (owner_id, access_type, blob_key).
+    '''
+
+    def __init__(self, ttl_seconds: float = SETTINGS_CACHE_TTL_SECONDS,
+                 max_entries: int = SETTINGS_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, str, str], _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0,
+                       'revalidations': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, owner_id: str, blob_key: str, access_type: str = 'private') -> Optional[str]:
+        '''
+        Return the blob value (a JSON string) or None if the blob does not exist.
+        Raises ApiException for any Storage error other than "not found".
+        '''
+        key = (owner_id, access_type, blob_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry.expires_at:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry.value
+
+        if entry is not None and entry.cas is not None:
+            # Cheap revalidation: only the CAS crosses the wire
+            if self._fetch_cas(owner_id, blob_key, access_type) == entry.cas:
+                with self._lock:
+                    entry.expires_at = time.monotonic() + self.ttl_seconds
+                    self._stats['revalidations'] += 1
+                return entry.value
+
+        cas, value = self._fetch_blob(owner_id, blob_key, access_type)
+        with self._lock:
+            self._stats['misses'] += 1
+            self._entries[key] = _Entry(
+                cas, value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return value
+
+    def invalidate(self, owner_id: str, blob_key: str, access_type: str = 'private'):
+        '''
+        Drop an entry after this worker wrote the blob.
+        '''
+        with self._lock:
+            if self._entries.pop((owner_id, access_type, blob_key), None) is not None:
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Hit/miss counters plus the current size.
+        '''
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        return stats
+
+    @staticmethod
+    def _fetch_cas(owner_id: str, blob_key: str, access_type: str) -> Optional[str]:
+        try:
+            api_response = snapser_clients.storage_api().storage_get_cas(
+                owner_id=owner_id,
+                access_type=access_type,
+                blob_key=blob_key,
+                gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
+            )
+        except NotFoundException:
+            return None
+        return api_response.cas if api_response is not None else None
+
+    @staticmethod
+    def _fetch_blob(owner_id: str, blob_key: str, access_type: str) -> Tuple[Optional[str], Optional[str]]:
+        # Only the value text is cached, so skip building the response model
+        try:
+            return get_blob_raw(owner_id, blob_key, access_type)
+        except NotFoundException:
+            return None, None
+
+
+settings_cache = SettingsCache()
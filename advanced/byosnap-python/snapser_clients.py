@@ -0,0 +1,152 @@
+'''
+Pooled Snapser SDK clients.
+
+Every `snapser_internal.ApiClient` owns its own urllib3 `PoolManager`. Building
+one per request throws away the keep-alive connection to the Snap as soon as the
+handler returns, so every request paid for a fresh TCP connection. This module
+keeps one `ApiClient` per Snap base URL for the lifetime of the worker process
+and hands it out to the handlers.
+
+`async_storage_api()` and `async_auth_api()` do the same for asyncio code with
+`snapser_internal.AsyncApiClient`. Those clients are kept per event loop.
+
+Tuning (environment variables):
+  - SNAPSER_HTTP_POOL_MAXSIZE: connections kept alive per Snap host (default 10)
+  - SNAPSER_TRUSTED_RESPONSES: 'true' to build response models without pydantic
+    validation, see `snapser_internal.deserializers` (default 'false')
+'''
+import atexit
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import snapser_internal
+
+
+# Constants
+POOL_MAXSIZE = int(os.getenv('SNAPSER_HTTP_POOL_MAXSIZE', '10'))
+TRUSTED_RESPONSES = os.getenv(
+    'SNAPSER_TRUSTED_RESPONSES', 'false').lower() == 'true'
+
+_clients: Dict[str, snapser_internal.ApiClient] = {}
+_async_clients: 'Dict[Tuple[int, str], snapser_internal.AsyncApiClient]' = {}
+_clients_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+def _reset_after_fork():
+    '''
+    Drop the clients inherited from the parent process.
+    '''
+    # @GOTCHAS 👋 - Fork safety
+    #   1. gunicorn forks its workers. Sockets opened by the parent must never be
+    #      shared with the children, so each worker starts with an empty registry.
+    #   2. We only forget the parent's clients here; closing them from the child
+    #      would tear down connections that still belong to the parent.
+    global _clients_lock, _owner_pid
+    _clients.clear()
+    _async_clients.clear()
+    _clients_lock = threading.Lock()
+    _owner_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_api_client(host: str) -> snapser_internal.ApiClient:
+    '''
+    Return the shared ApiClient for a Snap base URL, creating it on first use.
+    '''
+    if _owner_pid != os.getpid():
+        _reset_after_fork()
+    client = _clients.get(host)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(host)
+        if client is None:
+            configuration = snapser_internal.Configuration(host=host)
+            configuration.connection_pool_maxsize = POOL_MAXSIZE
+            client = snapser_internal.ApiClient(
+                configuration=configuration, trusted_responses=TRUSTED_RESPONSES)
+            _clients[host] = client
+    return client
+
+
+def storage_api(host: Optional[str] = None) -> 'snapser_internal.StorageServiceApi':
+    '''
+    Storage Snap API backed by the shared client.
+    '''
+    return snapser_internal.StorageServiceApi(
+        get_api_client(host or os.getenv('SNAPEND_STORAGE_HTTP_URL')))
+
+
+def auth_api(host: Optional[str] = None) -> 'snapser_internal.AuthServiceApi':
+    '''
+    Auth Snap API backed by the shared client.
+    '''
+    return snapser_internal.AuthServiceApi(
+        get_api_client(host or os.getenv('SNAPEND_AUTH_HTTP_URL')))
+
+
+def get_async_api_client(host: str) -> 'snapser_internal.AsyncApiClient':
+    '''
+    Return the shared AsyncApiClient for a Snap base URL in the running event loop.
+    '''
+    if _owner_pid != os.getpid():
+        _reset_after_fork()
+    # Imported here so that blocking Snaps never load asyncio
+    import asyncio
+    # No lock needed: a loop runs its coroutines on one thread
+    key = (id(asyncio.get_running_loop()), host)
+    client = _async_clients.get(key)
+    if client is None:
+        configuration = snapser_internal.Configuration(host=host)
+        configuration.connection_pool_maxsize = POOL_MAXSIZE
+        client = snapser_internal.AsyncApiClient(
+            configuration=configuration, trusted_responses=TRUSTED_RESPONSES)
+        _async_clients[key] = client
+    return client
+
+
+def async_storage_api(host: Optional[str] = None) -> 'snapser_internal.AsyncStorageServiceApi':
+    '''
+    Storage Snap API for coroutines, backed by the shared async client.
+    '''
+    return snapser_internal.AsyncStorageServiceApi(
+        get_async_api_client(host or os.getenv('SNAPEND_STORAGE_HTTP_URL')))
+
+
+def async_auth_api(host: Optional[str] = None) -> 'snapser_internal.AsyncAuthServiceApi':
+    '''
+    Auth Snap API for coroutines, backed by the shared async client.
+    '''
+    return snapser_internal.AsyncAuthServiceApi(
+        get_async_api_client(host or os.getenv('SNAPEND_AUTH_HTTP_URL')))
+
+
+async def close_all_async():
+    '''
+    Close the async clients of the running event loop. Call it from the ASGI
+    server's shutdown hook; atexit runs after the loop has stopped.
+    '''
+    import asyncio
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _async_clients if key[0] == loop_id]:
+        await _async_clients.pop(key).close()
+
+
+def close_all():
+    '''
+    Close every pooled client. Registered with atexit so a worker closes its
+    keep-alive connections on shutdown.
+    '''
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+            client.rest_client.pool_manager.clear()
+        _clients.clear()
+
+
+atexit.register(close_all)
@@ -1,6 +1,27 @@
 # flake8: noqa
 
-# import apis into api package
-from snapser_internal.api.auth_service_api import AuthServiceApi
-from snapser_internal.api.storage_service_api import StorageServiceApi
+import importlib
 
+# Imported on first access by `__getattr__` below
+_LAZY_IMPORTS = {
+    # apis
+    'AuthServiceApi': 'snapser_internal.api.auth_service_api',
+    'StorageServiceApi': 'snapser_internal.api.storage_service_api',
+    'AsyncAuthServiceApi': 'snapser_internal.api.async_auth_service_api',
+    'AsyncStorageServiceApi': 'snapser_internal.api.async_storage_service_api',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    # Cache it so later lookups do not come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
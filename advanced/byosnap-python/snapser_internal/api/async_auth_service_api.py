@@ -0,0 +1,24 @@
+# coding: utf-8
+
+"""
+    asyncio variant of `AuthServiceApi`.
+
+    The methods, arguments and models are those of the generated
+    AuthServiceApi. Backed by an AsyncApiClient, each method returns a
+    coroutine, so a handler ports by adding `await`:
+
+        api_response = await api.auth_anon_login(body)
+"""  # noqa: E501
+
+
+from snapser_internal.api.auth_service_api import AuthServiceApi
+from snapser_internal.async_api_client import AsyncApiClient
+
+
+class AsyncAuthServiceApi(AuthServiceApi):
+    """AuthServiceApi whose methods are awaited."""
+
+    def __init__(self, api_client=None) -> None:
+        if api_client is None:
+            api_client = AsyncApiClient.get_default()
+        self.api_client = api_client
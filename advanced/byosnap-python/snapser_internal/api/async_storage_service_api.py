@@ -0,0 +1,24 @@
+# coding: utf-8
+
+"""
+    asyncio variant of `StorageServiceApi`.
+
+    The methods, arguments and models are those of the generated
+    StorageServiceApi. Backed by an AsyncApiClient, each method returns a
+    coroutine, so a handler ports by adding `await`:
+
+        api_response = await api.storage_get_blob(owner_id, access_type, blob_key, gateway)
+"""  # noqa: E501
+
+
+from snapser_internal.api.storage_service_api import StorageServiceApi
+from snapser_internal.async_api_client import AsyncApiClient
+
+
+class AsyncStorageServiceApi(StorageServiceApi):
+    """StorageServiceApi whose methods are awaited."""
+
+    def __init__(self, api_client=None) -> None:
+        if api_client is None:
+            api_client = AsyncApiClient.get_default()
+        self.api_client = api_client
@@ -0,0 +1,129 @@
+# coding: utf-8
+
+"""
+    asyncio variant of `ApiClient`.
+
+    `AsyncApiClient.call_api` returns a coroutine. It reuses the request building
+    and response decoding of `ApiClient`, and sends the request through the
+    aiohttp transport in `snapser_internal.async_rest`. The generated API
+    classes only return what `call_api` returns, so with an AsyncApiClient
+    every API method returns a coroutine with the same arguments and the same
+    models:
+
+        async with AsyncApiClient(configuration) as api_client:
+            api = AsyncStorageServiceApi(api_client)
+            blob = await api.storage_get_blob(owner_id, 'private', 'characters', 'internal')
+
+    Concurrent calls share one keep-alive connection pool instead of a thread
+    each. A client belongs to the event loop that made its first request.
+"""  # noqa: E501
+
+
+import sys
+import time
+
+from snapser_internal import async_rest, instrumentation
+from snapser_internal.api_client import ApiClient
+from snapser_internal.exceptions import ApiException
+
+
+class AsyncApiClient(ApiClient):
+    """ApiClient for asyncio code.
+
+    :param configuration: .Configuration object for this client
+    :param header_name: a header to pass when making calls to the API.
+    :param header_value: a header value to pass when making calls to
+        the API.
+    :param cookie: a cookie to include in the header when making calls
+        to the API
+    :param trusted_responses: Build response models without pydantic
+        validation. See `snapser_internal.deserializers`.
+    """
+
+    _default = None
+
+    def __init__(self, configuration=None, header_name=None, header_value=None,
+                 cookie=None, trusted_responses=False) -> None:
+        super().__init__(configuration, header_name, header_value, cookie,
+                         trusted_responses=trusted_responses)
+        self.rest_client = async_rest.RESTClientObject(self.configuration)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        await self.rest_client.close()
+
+    @classmethod
+    def get_default(cls):
+        """Return the default AsyncApiClient, creating it on first use."""
+        if cls._default is None:
+            cls._default = AsyncApiClient()
+        return cls._default
+
+    @classmethod
+    def set_default(cls, default):
+        cls._default = default
+
+    def call_api(self, resource_path, method,
+                 path_params=None, query_params=None, header_params=None,
+                 body=None, post_params=None, files=None,
+                 response_types_map=None, auth_settings=None,
+                 async_req=None, _return_http_data_only=None,
+                 collection_formats=None, _preload_content=True,
+                 _request_timeout=None, _host=None, _request_auth=None):
+        """Returns a coroutine that makes the HTTP request and returns
+        deserialized data.
+
+        Same parameters as `ApiClient.call_api`. `async_req` is ignored: await
+        the call, or wrap it in a task, to run requests concurrently.
+        """
+        # Named here: the coroutine body runs later, under the awaiting frame
+        _operation_id = instrumentation.operation_id(
+            sys._getframe(1), method, resource_path)
+        return self._call_api(
+            resource_path, method, path_params, query_params, header_params,
+            body, post_params, files, response_types_map, auth_settings,
+            _return_http_data_only, collection_formats, _preload_content,
+            _request_timeout, _host, _request_auth, _operation_id)
+
+    async def _call_api(self, resource_path, method, path_params,
+                        query_params, header_params, body, post_params, files,
+                        response_types_map, auth_settings,
+                        _return_http_data_only, collection_formats,
+                        _preload_content, _request_timeout, _host,
+                        _request_auth, _operation_id):
+        started = time.perf_counter()
+        try:
+            url, query_params, header_params, post_params, body = \
+                self._prepare_request(
+                    resource_path, method, path_params, query_params,
+                    header_params, body, post_params, files, auth_settings,
+                    collection_formats, _host, _request_auth)
+
+            try:
+                # perform request and return response
+                response_data = await self.request(
+                    method, url,
+                    query_params=query_params,
+                    headers=header_params,
+                    post_params=post_params, body=body,
+                    _preload_content=_preload_content,
+                    _request_timeout=_request_timeout)
+            except ApiException as e:
+                if e.body:
+                    e.body = e.body.decode('utf-8')
+                raise e
+
+            result = self._handle_response(
+                response_data, response_types_map, _return_http_data_only,
+                _preload_content)
+        except Exception as e:
+            instrumentation.operation(_operation_id, instrumentation.status_of(e),
+                                      started)
+            raise
+        instrumentation.operation(_operation_id, response_data.status, started)
+        return result
@@ -0,0 +1,88 @@
+# coding: utf-8
+
+"""
+    Hooks for measuring the Snap calls made through the SDK.
+
+    Register an `Observer` subclass with `add_observer` to be told about:
+      - every API call: the operation id (the API method name, e.g.
+        `storage_get_blob`), the HTTP status ('error' when no response came
+        back) and the time spent in the call, including retries and decoding,
+      - every request attempt: whether it opened a new connection or reused a
+        pooled one,
+      - the bytes sent and received by each attempt.
+
+    Observers run in the calling thread and must be quick. Without observers
+    the hooks cost a few attribute lookups per call.
+"""  # noqa: E501
+
+
+import time
+
+
+_HTTP_INFO_SUFFIX = '_with_http_info'
+
+
+class Observer:
+    """Base class for SDK observers; override the events you need."""
+
+    def operation(self, operation_id, status, seconds):
+        pass
+
+    def connection(self, host, reused):
+        pass
+
+    def transfer(self, host, bytes_sent, bytes_received):
+        pass
+
+
+_observers = ()
+
+
+def add_observer(observer):
+    global _observers
+    if observer not in _observers:
+        _observers = _observers + (observer,)
+
+
+def remove_observer(observer):
+    global _observers
+    _observers = tuple(o for o in _observers if o is not observer)
+
+
+def operation_id(frame, method, resource_path):
+    """Name the operation from the frame that called `call_api`.
+
+    Generated API methods call it from `<operation>_with_http_info`.
+    """
+    name = frame.f_code.co_name
+    if name.endswith(_HTTP_INFO_SUFFIX):
+        return name[:-len(_HTTP_INFO_SUFFIX)]
+    return '{0} {1}'.format(method, resource_path)
+
+
+def status_of(error):
+    """Status label for a call that raised `error`."""
+    status = getattr(error, 'status', None)
+    return str(status) if status else 'error'
+
+
+def operation(operation_id, status, started):
+    """Report a finished API call; `started` is a time.perf_counter()."""
+    if _observers:
+        seconds = time.perf_counter() - started
+        for observer in _observers:
+            observer.operation(operation_id, str(status), seconds)
+
+
+def connection(host, reused):
+    for observer in _observers:
+        observer.connection(host, reused)
+
+
+def transfer(host, bytes_sent, bytes_received):
+    for observer in _observers:
+        observer.transfer(host, bytes_sent, bytes_received)
+
+
+def enabled():
+    return bool(_observers)
@@ -2,14 +2,22 @@
 Anthropic Claude Wrapper - Snapser BYOSnap
 '''
 from anthropic import Anthropic
+import base64
+import json
 import logging
 from dotenv import load_dotenv
 import os
+import numpy as np
+import urllib3
 
 from flask import Flask, request, make_response, jsonify, Response, stream_with_context
 from flask_cors import CORS, cross_origin
 from functools import wraps
 
+import metrics
+from response_cache import CACHE_STATUS_HEADER, response_cache
+from semantic_cache import SEMANTIC_CACHE_STATUS_HEADER, semantic_cache, split_last_user_message
+
 # Constants
 AUTH_TYPE_HEADER_KEY = 'Auth-Type'
 GATEWAY_HEADER_KEY = 'Gateway'
@@ -27,6 +35,11 @@ logging.basicConfig(level=logging.DEBUG,
 # Initialization
 load_dotenv()
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Anthropic has no embedding API: the semantic cache uses the /embedding API of
+# the OpenAI BYOSnap, e.g. http://byosnap-openai:5003/v1/byosnap-openai/embedding
+SEMANTIC_CACHE_EMBEDDING_URL = os.getenv("SEMANTIC_CACHE_EMBEDDING_URL", "")
+SEMANTIC_CACHE_EMBEDDING_MODEL = os.getenv("SEMANTIC_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+embedding_http = urllib3.PoolManager(timeout=urllib3.Timeout(total=2.0), retries=False)
 
 CLAUDE_MODELS = {
     "opus": "claude-3-opus-20240229",
@@ -36,6 +49,12 @@ CLAUDE_MODELS = {
 
 app = Flask(__name__)
 CORS(app, resources={r'/*': {'origins': '*'}})
+metrics.init_app(app)
+metrics.register_stats('response_cache', response_cache.stats)
+metrics.register_stats('semantic_cache', semantic_cache.stats)
+if semantic_cache.enabled and not SEMANTIC_CACHE_EMBEDDING_URL:
+    logging.warning('SEMANTIC_CACHE_ENABLED is set without SEMANTIC_CACHE_EMBEDDING_URL: '
+                    'the semantic cache is off')
 
 
 def validate_authorization(*allowed_auth_types, user_id_resource_key="user_id"):
@@ -111,6 +130,21 @@ def health():
     return "Ok"
 
 
+def embed_prompt(text):
+    '''
+    Embedding of a prompt for the semantic cache, from the OpenAI BYOSnap
+    '''
+    response = embedding_http.request(
+        'POST', SEMANTIC_CACHE_EMBEDDING_URL,
+        body=json.dumps({"model": SEMANTIC_CACHE_EMBEDDING_MODEL, "input": text,
+                         "encoding_format": "base64"}).encode('utf-8'),
+        headers={GATEWAY_HEADER_KEY: GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE,
+                 'Content-Type': 'application/json'})
+    if response.status != 200:
+        raise urllib3.exceptions.HTTPError('embedding: %d' % response.status)
+    return np.frombuffer(base64.b64decode(json.loads(response.data)["embedding"]), dtype='<f4')
+
+
 @app.route('/v1/byosnap-anthropic/chat', methods=['POST'])
 @cross_origin()
 @validate_authorization(AUTH_TYPE_HEADER_VALUE_USER_AUTH, AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH, GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE)
@@ -119,7 +153,13 @@ def chat():
     ---
     post:
       summary: 'Chat APIs'
-      description: This API is a wrapper around Claude's non-streaming chat.
+      description: >
+        This API is a wrapper around Claude's non-streaming chat.
+        When the response cache is on, requests sent with temperature 0 may be
+        answered from it. The X-Cache response header tells which. When the
+        semantic cache is on, a question close enough to an earlier one in the
+        same conversation context may get its answer. The X-Semantic-Cache
+        response header tells which.
       operationId: 'ClaudeChat'
       x-snapser-auth-types:
         - user
@@ -144,15 +184,39 @@ def chat():
     """
     try:
         data = request.get_json()
-        response = client.messages.create(
-            model=CLAUDE_MODELS.get(data.get("tier"), data.get(
+        params = {
+            "model": CLAUDE_MODELS.get(data.get("tier"), data.get(
                 "model", os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229"))),
-            system=data.get("system", "You are a helpful assistant."),
-            messages=data["messages"],
-            max_tokens=data.get("max_tokens", 1024),
-            temperature=data.get("temperature", 0.7)
-        )
-        return jsonify({"response": response.content[0].text})
+            "system": data.get("system", "You are a helpful assistant."),
+            "messages": data["messages"],
+            "max_tokens": data.get("max_tokens", 1024),
+            "temperature": data.get("temperature", 0.7)
+        }
+
+        cache_control = request.headers.get('Cache-Control', '')
+        prompt, earlier_messages = split_last_user_message(params["messages"])
+        semantic_status = None
+
+        def call():
+            response = client.messages.create(**params)
+            return {"response": response.content[0].text}
+
+        def semantic_call():
+            nonlocal semantic_status
+            payload, semantic_status = semantic_cache.cached_call(
+                embed_prompt if SEMANTIC_CACHE_EMBEDDING_URL else None,
+                dict(params, messages=earlier_messages), prompt, call, cache_control)
+            return payload
+
+        # A semantic hit answers a different prompt, so it is not stored
+        # under this one's exact key
+        payload, cache_status = response_cache.cached_call(
+            'chat', params, semantic_call, cache_control,
+            should_store=lambda: semantic_status != 'hit')
+        headers = {CACHE_STATUS_HEADER: cache_status}
+        if semantic_status is not None:
+            headers[SEMANTIC_CACHE_STATUS_HEADER] = semantic_status
+        return jsonify(payload), 200, headers
     except Exception as e:
         return jsonify({"error_message": str(e)}), 500
 
@@ -0,0 +1,41 @@
+'''
+Gunicorn settings, loaded automatically from the working directory.
+
+`/chat-stream` keeps its request open for the whole generation, and the worker
+spends nearly all of that time waiting on the provider. A sync worker serves one
+request at a time, so `-w 2` could hold only two streams per pod. These settings
+run gthread workers instead: each open request holds one thread of a worker
+process, and the provider clients are shared by the threads. A gthread worker
+also keeps answering gunicorn's heartbeat while a long stream runs, so streams
+are not cut off at the worker `timeout` as they are with sync workers.
+
+The workers share their Prometheus samples through files in
+PROMETHEUS_MULTIPROC_DIR (see metrics.py).
+
+Tuning (environment variables):
+  - GUNICORN_WORKER_CLASS: worker type (default 'gthread'). 'sync' goes back to
+    one request per worker process.
+  - GUNICORN_THREADS: open requests per gthread worker process (default 256).
+    Requests beyond that wait for a free thread.
+'''
+import os
+import shutil
+
+# Set before the workers import the app, so prometheus_client sees it
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/byosnap-metrics')
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# Gunicorn turns a sync worker with more than one thread into a gthread worker
+threads = int(os.getenv('GUNICORN_THREADS', '256' if worker_class == 'gthread' else '1'))
+
+
+def on_starting(server):
+    # Samples left by a previous run would be merged into the new one
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -8,6 +8,11 @@ from flask import Flask, request, jsonify, make_response, Response, stream_with_
 from flask_cors import CORS, cross_origin
 from functools import wraps
 import google.generativeai as genai
+import numpy as np
+
+import metrics
+from response_cache import CACHE_STATUS_HEADER, response_cache
+from semantic_cache import SEMANTIC_CACHE_STATUS_HEADER, semantic_cache, split_last_user_message
 
 # Constants
 AUTH_TYPE_HEADER_KEY = 'Auth-Type'
@@ -28,10 +33,14 @@ logging.basicConfig(level=logging.DEBUG,
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 genai.configure(api_key=GOOGLE_API_KEY)
+SEMANTIC_CACHE_EMBEDDING_MODEL = os.getenv("SEMANTIC_CACHE_EMBEDDING_MODEL", "models/text-embedding-004")
 
 # Flask App
 app = Flask(__name__)
 CORS(app, resources={r'/*': {'origins': '*'}})
+metrics.init_app(app)
+metrics.register_stats('response_cache', response_cache.stats)
+metrics.register_stats('semantic_cache', semantic_cache.stats)
 
 
 def validate_authorization(*allowed_auth_types, user_id_resource_key="user_id"):
@@ -117,6 +126,14 @@ def build_text_prompt(messages):
     return [{"role": m["role"], "parts": [m["content"]]} for m in messages]
 
 
+def embed_prompt(text):
+    '''
+    Embedding of a prompt, for the semantic cache
+    '''
+    result = genai.embed_content(model=SEMANTIC_CACHE_EMBEDDING_MODEL, content=text)
+    return np.asarray(result["embedding"], dtype=np.float32)
+
+
 @app.route("/v1/byosnap-gemini/chat", methods=["POST"])
 @cross_origin()
 @validate_authorization(AUTH_TYPE_HEADER_VALUE_USER_AUTH, AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH, GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE)
@@ -125,7 +142,13 @@ def chat():
     ---
     post:
       summary: 'Chat APIs'
-      description: This API is a wrapper around Gemini's non-streaming text and multimodal chat.
+      description: >
+        This API is a wrapper around Gemini's non-streaming text and multimodal chat.
+        When the response cache is on, requests sent with temperature 0 may be
+        answered from it. The X-Cache response header tells which. When the
+        semantic cache is on, a question close enough to an earlier one in the
+        same conversation context may get its answer. The X-Semantic-Cache
+        response header tells which.
       operationId: 'GeminiChat'
       x-snapser-auth-types:
         - user
@@ -196,27 +219,45 @@ def chat():
         model_name = data.get("model", "models/gemini-2.0-flash")
         if not model_name.startswith("models/"):
             model_name = f"models/{model_name}"
-        model = genai.GenerativeModel(model_name)
+        params = {
+            "model": model_name,
+            "contents": data["parts"] if "parts" in data else build_text_prompt(data["messages"]),
+            "temperature": data.get("temperature", 0.7),
+            "max_output_tokens": data.get("max_tokens", 1024)
+        }
+        cache_control = request.headers.get('Cache-Control', '')
+        # Multimodal `parts` requests have no user message to compare
+        prompt, earlier_messages = (None, []) if "parts" in data \
+            else split_last_user_message(data["messages"])
+        semantic_status = None
 
-        if "parts" in data:
+        def call():
+            model = genai.GenerativeModel(model_name)
             response = model.generate_content(
-                contents=data["parts"],
+                contents=params["contents"],
                 generation_config={
-                    "temperature": data.get("temperature", 0.7),
-                    "max_output_tokens": data.get("max_tokens", 1024)
-                }
-            )
-        else:
-            prompt = build_text_prompt(data["messages"])
-            response = model.generate_content(
-                contents=prompt,
-                generation_config={
-                    "temperature": data.get("temperature", 0.7),
-                    "max_output_tokens": data.get("max_tokens", 1024)
+                    "temperature": params["temperature"],
+                    "max_output_tokens": params["max_output_tokens"]
                 }
             )
+            return {"response": response.text}
+
+        def semantic_call():
+            nonlocal semantic_status
+            payload, semantic_status = semantic_cache.cached_call(
+                embed_prompt, dict(params, contents=build_text_prompt(earlier_messages)),
+                prompt, call, cache_control)
+            return payload
 
-        return jsonify({"response": response.text})
+        # A semantic hit answers a different prompt, so it is not stored
+        # under this one's exact key
+        payload, cache_status = response_cache.cached_call(
+            'chat', params, semantic_call, cache_control,
+            should_store=lambda: semantic_status != 'hit')
+        headers = {CACHE_STATUS_HEADER: cache_status}
+        if semantic_status is not None:
+            headers[SEMANTIC_CACHE_STATUS_HEADER] = semantic_status
+        return jsonify(payload), 200, headers
     except Exception as e:
         return jsonify({"error_message": str(e)}), 500
 
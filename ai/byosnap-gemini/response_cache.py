@@ -0,0 +1,243 @@
+'''
+Opt-in cache of provider responses for deterministic requests.
+
+Game prompts are often the same templated line sent again and again at
+temperature 0. With the cache on, such a request is answered without calling the
+provider when the same request was answered before.
+
+Only requests sent with `temperature` 0 are cacheable. Any other temperature
+samples, so the same request may rightly get a different answer, and those
+requests always go to the provider. Streaming endpoints are never cached. A
+request with `Cache-Control: no-cache` skips the lookup (its answer is still
+stored), and one with `Cache-Control: no-store` bypasses the cache entirely.
+
+The key is a SHA-256 of the endpoint and the exact provider call arguments
+(model, messages or prompt, and generation parameters), serialized as canonical
+JSON. There are two tiers:
+  1. an in-process LRU per worker,
+  2. optionally, blobs in the Storage Snap, shared by every worker and replica.
+     They are written with the TTL of the cache, so Storage expires them. The
+     Storage Snap must be part of the Snapend. A Storage error is logged and
+     counted, and the request goes on as a miss.
+Concurrent misses for the same key in one worker wait for the first one
+instead of all calling the provider.
+
+Responses carry `X-Cache`: `hit-memory`, `hit-storage`, `miss`, or `bypass` for
+requests that are not cacheable.
+
+Tuning (environment variables):
+  - LLM_CACHE_ENABLED: 'true' to turn the cache on (default 'false')
+  - LLM_CACHE_TTL_SECONDS: how long an answer is reused (default 3600)
+  - LLM_CACHE_MAX_ENTRIES: answers kept per worker (default 1024)
+  - LLM_CACHE_STORAGE_ENABLED: 'true' to add the Storage tier (default 'false')
+  - LLM_CACHE_STORAGE_URL: Storage Snap URL (default SNAPEND_STORAGE_HTTP_URL)
+  - LLM_CACHE_STORAGE_OWNER: owner id of the cache blobs (default 'llm-response-cache')
+  - LLM_CACHE_STORAGE_TIMEOUT_SECONDS: timeout of each Storage call (default 0.5)
+'''
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import urllib3
+
+
+# Constants
+CACHE_STATUS_HEADER = 'X-Cache'
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'false').lower() == 'true'
+LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', '3600'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1024'))
+LLM_CACHE_STORAGE_ENABLED = os.getenv('LLM_CACHE_STORAGE_ENABLED', 'false').lower() == 'true'
+LLM_CACHE_STORAGE_URL = os.getenv('LLM_CACHE_STORAGE_URL', os.getenv('SNAPEND_STORAGE_HTTP_URL', ''))
+LLM_CACHE_STORAGE_OWNER = os.getenv('LLM_CACHE_STORAGE_OWNER', 'llm-response-cache')
+LLM_CACHE_STORAGE_TIMEOUT_SECONDS = float(os.getenv('LLM_CACHE_STORAGE_TIMEOUT_SECONDS', '0.5'))
+STORAGE_ACCESS_TYPE = 'private'
+STORAGE_GATEWAY = 'internal'
+# Longest a concurrent miss waits for the first one to finish
+FOLLOWER_WAIT_SECONDS = 60.0
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    '''
+    Hash of the endpoint and the provider call arguments, as canonical JSON.
+    '''
+    canonical = json.dumps([endpoint, params], sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def is_cacheable(params: Dict[str, Any]) -> bool:
+    '''
+    Whether a provider call is deterministic enough to reuse its answer.
+    '''
+    return params.get('temperature') == 0 and not params.get('stream')
+
+
+class _StorageTier:
+    '''
+    Cache entries as Storage blobs, through the Storage Snap's REST API.
+    '''
+
+    def __init__(self, url: str, owner_id: str, timeout_seconds: float):
+        self.url = url.rstrip('/')
+        self.owner_id = owner_id
+        self._http = urllib3.PoolManager(
+            timeout=urllib3.Timeout(total=timeout_seconds), retries=False)
+
+    def _blob_url(self, key: str) -> str:
+        return '{0}/v1/storage/owner/{1}/{2}/blobs/{3}'.format(
+            self.url, quote(self.owner_id, safe=''), STORAGE_ACCESS_TYPE, key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        response = self._http.request('GET', self._blob_url(key),
+                                      headers={'Gateway': STORAGE_GATEWAY})
+        if response.status == 404:
+            return None
+        if response.status != 200:
+            raise urllib3.exceptions.HTTPError('storage_get_blob: %d' % response.status)
+        return json.loads(json.loads(response.data)['value'])
+
+    def put(self, key: str, payload: Dict[str, Any], ttl_seconds: int):
+        body = {'value': json.dumps(payload), 'ttl': ttl_seconds, 'create': True}
+        response = self._http.request(
+            'PUT', self._blob_url(key), body=json.dumps(body).encode('utf-8'),
+            headers={'Gateway': STORAGE_GATEWAY, 'Content-Type': 'application/json'})
+        if response.status != 200:
+            raise urllib3.exceptions.HTTPError('storage_replace_blob: %d' % response.status)
+
+
+class ResponseCache:
+    '''
+    Bounded LRU of provider responses with an optional Storage tier behind it.
+    '''
+
+    def __init__(self, enabled: bool = LLM_CACHE_ENABLED,
+                 ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 storage: Optional[_StorageTier] = None):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.storage = storage
+        # key -> (expires_at, payload)
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits_memory': 0, 'hits_storage': 0, 'misses': 0, 'bypassed': 0,
+                       'coalesced': 0, 'evictions': 0, 'storage_errors': 0}
+
+    def cached_call(self, endpoint: str, params: Dict[str, Any],
+                    call: Callable[[], Dict[str, Any]],
+                    cache_control: str = '',
+                    should_store: Optional[Callable[[], bool]] = None
+                    ) -> Tuple[Dict[str, Any], str]:
+        '''
+        Return `call()`'s payload, or the cached one for the same `params`,
+        and the `X-Cache` value. Payloads are only stored when `call()` returns,
+        and `should_store()`, if given, returns true.
+        '''
+        cache_control = cache_control.lower()
+        if not self.enabled or not is_cacheable(params) or 'no-store' in cache_control:
+            with self._lock:
+                self._stats['bypassed'] += 1
+            return call(), 'bypass'
+        key = cache_key(endpoint, params)
+        if 'no-cache' not in cache_control:
+            found = self._lookup(key)
+            if found is not None:
+                return found
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = threading.Event()
+        if not leader:
+            # The same request is already with the provider
+            flight.wait(FOLLOWER_WAIT_SECONDS)
+            payload = self._get_memory(key)
+            if payload is not None:
+                with self._lock:
+                    self._stats['coalesced'] += 1
+                return payload, 'hit-memory'
+        try:
+            payload = call()
+            with self._lock:
+                self._stats['misses'] += 1
+            if should_store is None or should_store():
+                self._store(key, payload)
+            return payload, 'miss'
+        finally:
+            if leader:
+                with self._lock:
+                    del self._inflight[key]
+                flight.set()
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters for /metrics.
+        '''
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def _lookup(self, key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        payload = self._get_memory(key)
+        if payload is not None:
+            with self._lock:
+                self._stats['hits_memory'] += 1
+            return payload, 'hit-memory'
+        if self.storage is None:
+            return None
+        try:
+            payload = self.storage.get(key)
+        except Exception as e:
+            logging.warning('Response cache Storage read failed: %s', e)
+            with self._lock:
+                self._stats['storage_errors'] += 1
+            return None
+        if payload is None:
+            return None
+        self._put_memory(key, payload)
+        with self._lock:
+            self._stats['hits_storage'] += 1
+        return payload, 'hit-storage'
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _put_memory(self, key: str, payload: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _store(self, key: str, payload: Dict[str, Any]):
+        self._put_memory(key, payload)
+        if self.storage is None:
+            return
+        try:
+            self.storage.put(key, payload, self.ttl_seconds)
+        except Exception as e:
+            logging.warning('Response cache Storage write failed: %s', e)
+            with self._lock:
+                self._stats['storage_errors'] += 1
+
+
+response_cache = ResponseCache(
+    storage=_StorageTier(LLM_CACHE_STORAGE_URL, LLM_CACHE_STORAGE_OWNER,
+                         LLM_CACHE_STORAGE_TIMEOUT_SECONDS)
+    if LLM_CACHE_STORAGE_ENABLED and LLM_CACHE_STORAGE_URL else None)
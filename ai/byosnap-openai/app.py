@@ -5,11 +5,18 @@ from openai import OpenAI
 import logging
 from dotenv import load_dotenv
 import os
+import numpy as np
 
 from flask import Flask, request, make_response, jsonify, Response, stream_with_context
 from flask_cors import CORS, cross_origin
 from functools import wraps
 
+import metrics
+from embeddings import ENCODING_FORMATS, embedder, encode_base64
+from vector_index import VECTOR_INDEX_MAX_K, parse_vectors, vector_indexes
+from response_cache import CACHE_STATUS_HEADER, response_cache
+from semantic_cache import SEMANTIC_CACHE_STATUS_HEADER, semantic_cache, split_last_user_message
+
 
 # Constants
 # Header Keys
@@ -32,9 +39,15 @@ logging.basicConfig(level=logging.DEBUG,
 # App Initialization
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+SEMANTIC_CACHE_EMBEDDING_MODEL = os.getenv("SEMANTIC_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
 
 app = Flask(__name__)
 CORS(app, resources={r'/*': {'origins': '*'}})
+metrics.init_app(app)
+metrics.register_stats('response_cache', response_cache.stats)
+metrics.register_stats('embeddings', embedder.stats)
+metrics.register_stats('vector_index', vector_indexes.stats)
+metrics.register_stats('semantic_cache', semantic_cache.stats)
 
 # Decorators
 
@@ -105,6 +118,8 @@ def validate_authorization(*allowed_auth_types, user_id_resource_key="user_id"):
 # @app.route('/v1/byosnap-openai/completion', methods=['OPTIONS'])
 # @app.route('/v1/byosnap-openai/completion-stream', methods=['OPTIONS'])
 # @app.route('/v1/byosnap-openai/embedding', methods=['OPTIONS'])
+# @app.route('/v1/byosnap-openai/index/<index_name>/upsert', methods=['OPTIONS'])
+# @app.route('/v1/byosnap-openai/index/<index_name>/search', methods=['OPTIONS'])
 # @cross_origin()
 # def cors_overrides(path):
 #     '''
@@ -140,6 +155,14 @@ def health():
 
 # --------- CHAT --------- #
 
+def embed_prompt(text):
+    '''
+    Embedding of a prompt, for the semantic cache
+    '''
+    vector = embedder.embed(client.embeddings.create, SEMANTIC_CACHE_EMBEDDING_MODEL, [text])[0]
+    return np.frombuffer(vector, dtype=np.float32)
+
+
 @app.route("/v1/byosnap-openai/chat", methods=["POST"])
 @cross_origin()
 @validate_authorization(AUTH_TYPE_HEADER_VALUE_USER_AUTH, AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH, GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE)
@@ -148,7 +171,13 @@ def chat():
     ---
     post:
       summary: 'Chat APIs'
-      description: This API is a wrapper around OpenAI's chat completion API.
+      description: >
+        This API is a wrapper around OpenAI's chat completion API.
+        When the response cache is on, requests sent with temperature 0 may be
+        answered from it. The X-Cache response header tells which. When the
+        semantic cache is on, a question close enough to an earlier one in the
+        same conversation context may get its answer. The X-Semantic-Cache
+        response header tells which.
       operationId: 'Chat'
       x-snapser-auth-types:
         - user
@@ -173,14 +202,35 @@ def chat():
     """
     try:
         data = request.get_json()
-        response = client.chat.completions.create(
-            model=data.get("model", os.getenv("OPENAI_MODEL")),
-            messages=data["messages"],
-            temperature=data.get("temperature", 0.7)
-        )
-        return jsonify({
-            "response": response.choices[0].message.content
-        })
+        params = {
+            "model": data.get("model", os.getenv("OPENAI_MODEL")),
+            "messages": data["messages"],
+            "temperature": data.get("temperature", 0.7)
+        }
+
+        cache_control = request.headers.get('Cache-Control', '')
+        prompt, earlier_messages = split_last_user_message(params["messages"])
+        semantic_status = None
+
+        def call():
+            response = client.chat.completions.create(**params)
+            return {"response": response.choices[0].message.content}
+
+        def semantic_call():
+            nonlocal semantic_status
+            payload, semantic_status = semantic_cache.cached_call(
+                embed_prompt, dict(params, messages=earlier_messages), prompt, call, cache_control)
+            return payload
+
+        # A semantic hit answers a different prompt, so it is not stored
+        # under this one's exact key
+        payload, cache_status = response_cache.cached_call(
+            'chat', params, semantic_call, cache_control,
+            should_store=lambda: semantic_status != 'hit')
+        headers = {CACHE_STATUS_HEADER: cache_status}
+        if semantic_status is not None:
+            headers[SEMANTIC_CACHE_STATUS_HEADER] = semantic_status
+        return jsonify(payload), 200, headers
     except Exception as e:
         return jsonify({"error_message": str(e)}), 500
 
@@ -257,7 +307,10 @@ def completion():
     ---
     post:
       summary: 'Completion APIs'
-      description: This API is a wrapper around OpenAI's completion API.
+      description: >
+        This API is a wrapper around OpenAI's completion API.
+        When the response cache is on, requests sent with temperature 0 may be
+        answered from it. The X-Cache response header tells which.
       operationId: 'Completion'
       x-snapser-auth-types:
         - user
@@ -282,15 +335,20 @@ def completion():
     """
     try:
         data = request.get_json()
-        response = client.completions.create(
-            model=data.get("model", "gpt-3.5-turbo-instruct"),
-            prompt=data["prompt"],
-            max_tokens=data.get("max_tokens", 100),
-            temperature=data.get("temperature", 0.7)
-        )
-        return jsonify({
-            "response": response.choices[0].text.strip()
-        })
+        params = {
+            "model": data.get("model", "gpt-3.5-turbo-instruct"),
+            "prompt": data["prompt"],
+            "max_tokens": data.get("max_tokens", 100),
+            "temperature": data.get("temperature", 0.7)
+        }
+
+        def call():
+            response = client.completions.create(**params)
+            return {"response": response.choices[0].text.strip()}
+
+        payload, cache_status = response_cache.cached_call(
+            'completion', params, call, request.headers.get('Cache-Control', ''))
+        return jsonify(payload), 200, {CACHE_STATUS_HEADER: cache_status}
     except Exception as e:
         return jsonify({"error_message": str(e)}), 500
 
@@ -368,7 +426,13 @@ def embedding():
     ---
     post:
       summary: 'Embedding APIs'
-      description: This API is a wrapper around OpenAI's embedding API.
+      description: >
+        This API is a wrapper around OpenAI's embedding API. `input` is a string or
+        a list of strings. A string returns `embedding`, and a list returns
+        `embeddings` in the order of its inputs. Lists are sent to OpenAI in
+        batches, and texts embedded before are served from a cache. With
+        `encoding_format` set to base64, each embedding is a base64 string of
+        little-endian float32 values instead of a list of floats.
       operationId: 'Embedding'
       x-snapser-auth-types:
         - user
@@ -385,6 +449,11 @@ def embedding():
             application/json:
               schema: SuccessEmbeddingResponseSchema
           description: 'A successful response'
+        400:
+          content:
+            application/json:
+              schema: ErrorResponseSchema
+          description: 'Bad Request'
         500:
           content:
             application/json:
@@ -393,13 +462,169 @@ def embedding():
     """
     try:
         data = request.get_json()
-        response = client.embeddings.create(
-            model=data.get("model", "text-embedding-ada-002"),
-            input=data["input"]
+        texts = data.get("input")
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts or not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return jsonify({"error_message": "input must be a string or a list of strings"}), 400
+        encoding_format = data.get("encoding_format", "float")
+        if encoding_format not in ENCODING_FORMATS:
+            return jsonify({"error_message": "encoding_format must be float or base64"}), 400
+        vectors = embedder.embed(
+            client.embeddings.create,
+            data.get("model", "text-embedding-ada-002"),
+            texts,
+            data.get("dimensions")
         )
-        return jsonify({
-            "embedding": response.data[0].embedding
-        })
+        if encoding_format == "base64":
+            encoded = [encode_base64(vector) for vector in vectors]
+        else:
+            encoded = [vector.tolist() for vector in vectors]
+        if single:
+            return jsonify({"embedding": encoded[0]})
+        return jsonify({"embeddings": encoded})
+    except Exception as e:
+        return jsonify({"error_message": str(e)}), 500
+
+
+def request_vectors(data):
+    '''
+    Vectors from the `vectors` of a request, or from embedding its `texts`
+    '''
+    if "vectors" in data:
+        return parse_vectors(data["vectors"])
+    texts = data.get("texts")
+    if not texts or not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        raise ValueError("send vectors or texts")
+    vectors = embedder.embed(
+        client.embeddings.create, data.get("model", "text-embedding-ada-002"), texts)
+    return np.stack([np.frombuffer(vector, dtype=np.float32) for vector in vectors])
+
+
+@app.route("/v1/byosnap-openai/index/<index_name>/upsert", methods=["POST"])
+@cross_origin()
+@validate_authorization(AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH, GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE)
+def index_upsert(index_name):
+    """API to add vectors to a vector index
+    ---
+    post:
+      summary: 'Vector Index APIs'
+      description: >
+        Adds vectors to the named vector index, or overwrites the vectors of ids
+        it has. Send `vectors` (lists of floats, or base64 strings from the
+        embedding API), or `texts` to embed them with `model`. The first upsert
+        creates the index, and every vector of an index has the same length.
+      operationId: 'IndexUpsert'
+      x-snapser-auth-types:
+        - api-key
+        - internal
+      parameters:
+        - in: path
+          name: index_name
+          schema:
+            type: string
+          required: true
+          description: 'Letters, digits, - and _'
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema: IndexUpsertRequestSchema
+      responses:
+        200:
+          content:
+            application/json:
+              schema: IndexUpsertResponseSchema
+          description: 'A successful response'
+        400:
+          content:
+            application/json:
+              schema: ErrorResponseSchema
+          description: 'Bad Request'
+        500:
+          content:
+            application/json:
+              schema: ErrorResponseSchema
+          description: 'Server Error'
+    """
+    try:
+        data = request.get_json()
+        ids = data.get("ids")
+        if not ids or not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+            return jsonify({"error_message": "ids must be a list of strings"}), 400
+        added, count = vector_indexes.upsert(index_name, ids, request_vectors(data))
+        return jsonify({"added": added, "count": count})
+    except ValueError as e:
+        return jsonify({"error_message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error_message": str(e)}), 500
+
+
+@app.route("/v1/byosnap-openai/index/<index_name>/search", methods=["POST"])
+@cross_origin()
+@validate_authorization(AUTH_TYPE_HEADER_VALUE_USER_AUTH, AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH, GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE)
+def index_search(index_name):
+    """API to search a vector index
+    ---
+    post:
+      summary: 'Vector Index APIs'
+      description: >
+        Returns the `k` ids of the named vector index closest to each query, by
+        cosine similarity, best first. Send `vectors` or `texts` as for upserts.
+        All the queries of a request are searched together.
+      operationId: 'IndexSearch'
+      x-snapser-auth-types:
+        - user
+        - api-key
+        - internal
+      parameters:
+        - in: path
+          name: index_name
+          schema:
+            type: string
+          required: true
+          description: 'Letters, digits, - and _'
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema: IndexSearchRequestSchema
+      responses:
+        200:
+          content:
+            application/json:
+              schema: IndexSearchResponseSchema
+          description: 'A successful response'
+        400:
+          content:
+            application/json:
+              schema: ErrorResponseSchema
+          description: 'Bad Request'
+        404:
+          content:
+            application/json:
+              schema: ErrorResponseSchema
+          description: 'Index not found'
+        500:
+          content:
+            application/json:
+              schema: ErrorResponseSchema
+          description: 'Server Error'
+    """
+    try:
+        data = request.get_json()
+        k = data.get("k", 10)
+        if not isinstance(k, int) or not 1 <= k <= VECTOR_INDEX_MAX_K:
+            return jsonify({"error_message": f"k must be 1 to {VECTOR_INDEX_MAX_K}"}), 400
+        results = vector_indexes.search(index_name, request_vectors(data), k)
+        return jsonify({"results": [
+            [{"id": id_, "score": score} for id_, score in matches] for matches in results
+        ]})
+    except KeyError:
+        return jsonify({"error_message": f"Index {index_name} not found"}), 404
+    except ValueError as e:
+        return jsonify({"error_message": str(e)}), 400
     except Exception as e:
         return jsonify({"error_message": str(e)}), 500
 
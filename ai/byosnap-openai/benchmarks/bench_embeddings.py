@@ -0,0 +1,164 @@
+'''
+Benchmark: `/embedding` for a list of texts, one request per text vs batched.
+
+Starts a local fake OpenAI provider whose `POST /embeddings` takes
+--call-latency seconds per call and returns --dimensions deterministic values
+per input. Then it embeds --texts texts, of which --repeat are repeats of
+earlier ones, through this BYOSnap's Flask app in-process:
+  - per-text: one `/embedding` request per text, with the embedding cache off
+  - batched: one `/embedding` request with the whole list, cold cache
+  - cached: the same request again, warm cache
+For each it reports the provider calls and inputs, the wall time, and the
+response size with `encoding_format` float and base64. The embeddings of every
+mode are checked against the fake's, in input order.
+
+Usage (from ai/byosnap-openai):
+    python benchmarks/bench_embeddings.py --texts 1000 --repeat 0.2
+'''
+import argparse
+import base64
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_vector(text, dimensions):
+    rng = random.Random(text)
+    return [rng.uniform(-1, 1) for _ in range(dimensions)]
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    '''
+    OpenAI-compatible `POST /embeddings`.
+    '''
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        texts = body['input'] if isinstance(body['input'], list) else [body['input']]
+        with server.stats_lock:
+            server.calls += 1
+            server.inputs += len(texts)
+        time.sleep(server.call_latency)
+        data = []
+        for index, text in enumerate(texts):
+            vector = fake_vector(text, server.dimensions)
+            if body.get('encoding_format') == 'base64':
+                vector = base64.b64encode(struct.pack('<%df' % len(vector), *vector)).decode()
+            data.append({'object': 'embedding', 'index': index, 'embedding': vector})
+        payload = json.dumps({'object': 'list', 'data': data, 'model': body['model'],
+                              'usage': {'prompt_tokens': 0, 'total_tokens': 0}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake(call_latency, dimensions):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeProviderHandler)
+    server.daemon_threads = True
+    server.stats_lock = threading.Lock()
+    server.call_latency = call_latency
+    server.dimensions = dimensions
+    server.calls = 0
+    server.inputs = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def check(texts, embeddings, dimensions):
+    for text, embedding in zip(texts, embeddings):
+        expected = struct.unpack('<%df' % dimensions,
+                                 struct.pack('<%df' % dimensions, *fake_vector(text, dimensions)))
+        if tuple(embedding) != expected:
+            raise SystemExit(f"wrong embedding for {text!r}")
+
+
+def post(client, body):
+    response = client.post('/v1/byosnap-openai/embedding', json=body,
+                           headers={'Gateway': 'internal'})
+    if response.status_code != 200:
+        raise SystemExit(response.get_data(as_text=True))
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--texts', type=int, default=1000)
+    parser.add_argument('--repeat', type=float, default=0.2)
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument('--call-latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    provider, provider_url = start_fake(args.call_latency, args.dimensions)
+    os.environ.update(OPENAI_BASE_URL=provider_url, OPENAI_API_KEY='bench')
+    sys.path.insert(0, APP_DIR)
+    import logging
+    from app import app
+    from embeddings import embedder
+    logging.disable(logging.INFO)
+    client = app.test_client()
+
+    rng = random.Random(0)
+    texts = []
+    for i in range(args.texts):
+        if texts and rng.random() < args.repeat:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(f"NPC line {i}: the {rng.choice(['dragon', 'knight', 'merchant'])} "
+                         f"waits by the {rng.choice(['gate', 'river', 'tower'])}.")
+
+    print(f"{args.texts} texts ({len(set(texts))} distinct), {args.dimensions} dimensions, "
+          f"{args.call_latency * 1000:.0f} ms per provider call")
+    print(f"{'mode':<10} {'calls':>6} {'inputs':>7} {'wall_ms':>9} {'float_kb':>9} {'base64_kb':>10}")
+
+    def row(mode, run):
+        provider.calls = provider.inputs = 0
+        start = time.perf_counter()
+        embeddings, float_bytes = run()
+        elapsed = time.perf_counter() - start
+        check(texts, embeddings, args.dimensions)
+        calls, inputs = provider.calls, provider.inputs
+        body = {'model': 'fake', 'input': texts, 'encoding_format': 'base64'}
+        encoded = post(client, body).get_json()['embeddings']
+        check(texts, [struct.unpack('<%df' % args.dimensions, base64.b64decode(e))
+                      for e in encoded], args.dimensions)
+        base64_bytes = len(json.dumps({'embeddings': encoded}))
+        print(f"{mode:<10} {calls:>6} {inputs:>7} {elapsed * 1000:>9.0f} "
+              f"{float_bytes / 1024:>9.0f} {base64_bytes / 1024:>10.0f}")
+
+    def per_text():
+        embedder.cache_max_entries = 0
+        responses = [post(client, {'model': 'fake', 'input': text}) for text in texts]
+        return ([r.get_json()['embedding'] for r in responses],
+                sum(len(r.get_data()) for r in responses))
+
+    def batched():
+        response = post(client, {'model': 'fake', 'input': texts})
+        return response.get_json()['embeddings'], len(response.get_data())
+
+    def cold_batched():
+        embedder.cache_max_entries = args.texts
+        embedder._entries.clear()
+        return batched()
+
+    row('per-text', per_text)
+    row('batched', cold_batched)
+    row('cached', batched)
+    provider.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+'''
+Benchmark: `/chat` hit rate and latency with the semantic cache, by threshold.
+
+Starts a local fake OpenAI provider. Its `POST /chat/completions` takes
+--chat-latency seconds and answers with the question it was asked. Its
+`POST /embeddings` takes --embed-latency seconds and embeds a text as the sum
+of a fixed random vector per word, so rephrasings that share most of their
+words are close. Then it sends --requests `/chat` requests through this
+BYOSnap's Flask app in-process, each a random question out of --questions,
+rephrased at random ("Where is the blacksmith?", "where's the blacksmith",
+"hey, where is the blacksmith please"), once with the semantic cache off and
+once per threshold in --thresholds.
+
+For each run it reports the hit rate, the wrong hits (answers to a different
+question), the provider calls, the mean request latency, and the saved_ms and
+lookup_ms stats of the cache.
+
+Usage (from ai/byosnap-openai):
+    python benchmarks/bench_semantic_cache.py --requests 300 --thresholds 0.99,0.9,0.8
+'''
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIMENSIONS = 256
+SUBJECTS = ['blacksmith', 'tavern', 'castle', 'harbor', 'temple', 'market', 'mine', 'forest',
+            'bridge', 'library', 'stables', 'barracks']
+TEMPLATES = ['Where is the {}?', 'How do I get to the {}?', 'Who runs the {}?',
+             'What is sold at the {}?']
+FILLERS = ['hey, ', 'excuse me, ', 'tell me, ']
+
+
+def word_vector(word):
+    seed = int.from_bytes(hashlib.sha256(word.encode()).digest()[:4], 'little')
+    return np.random.default_rng(seed).standard_normal(DIMENSIONS)
+
+
+def fake_embedding(text):
+    words = re.findall(r"[a-z]+", text.lower().replace("'s", " is"))
+    return sum(word_vector(word) for word in words).astype(np.float32).tolist()
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    '''
+    OpenAI-compatible `POST /chat/completions` and `POST /embeddings`.
+    '''
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        if self.path.endswith('/embeddings'):
+            time.sleep(server.embed_latency)
+            data = [{'object': 'embedding', 'index': i, 'embedding': fake_embedding(text)}
+                    for i, text in enumerate(body['input'])]
+            payload = {'object': 'list', 'data': data, 'model': body['model'],
+                       'usage': {'prompt_tokens': 0, 'total_tokens': 0}}
+        else:
+            with server.stats_lock:
+                server.chat_calls += 1
+            time.sleep(server.chat_latency)
+            question = body['messages'][-1]['content']
+            payload = {'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': 0,
+                       'model': body['model'],
+                       'choices': [{'index': 0, 'finish_reason': 'stop',
+                                    'message': {'role': 'assistant', 'content': question}}]}
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake(chat_latency, embed_latency):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeProviderHandler)
+    server.daemon_threads = True
+    server.stats_lock = threading.Lock()
+    server.chat_latency = chat_latency
+    server.embed_latency = embed_latency
+    server.chat_calls = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def rephrase(question, rng):
+    text = question
+    if rng.random() < 0.5:
+        text = text.replace('Where is', "Where's").replace('What is', "What's")
+    if rng.random() < 0.3:
+        text = rng.choice(FILLERS) + text[0].lower() + text[1:]
+    if rng.random() < 0.3:
+        text = text.rstrip('?') + ' please?'
+    if rng.random() < 0.5:
+        text = text.lower().rstrip('?')
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--thresholds', default='0.99,0.9,0.8')
+    parser.add_argument('--chat-latency', type=float, default=0.1)
+    parser.add_argument('--embed-latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    provider, provider_url = start_fake(args.chat_latency, args.embed_latency)
+    os.environ.update(OPENAI_BASE_URL=provider_url, OPENAI_API_KEY='bench')
+    sys.path.insert(0, APP_DIR)
+    from app import app
+    from semantic_cache import SEMANTIC_CACHE_STATUS_HEADER, SemanticCache, semantic_cache
+    logging.disable(logging.WARNING)
+    client = app.test_client()
+
+    rng = random.Random(0)
+    questions = [template.format(subject) for template in TEMPLATES for subject in SUBJECTS]
+    questions = rng.sample(questions, min(args.questions, len(questions)))
+    asked = [rng.choice(questions) for _ in range(args.requests)]
+    requests = [(question, rephrase(question, rng)) for question in asked]
+    print(f"{args.requests} requests, {len(questions)} questions, "
+          f"{len(set(text for _, text in requests))} distinct texts; "
+          f"{args.chat_latency * 1000:.0f} ms per chat call, "
+          f"{args.embed_latency * 1000:.0f} ms per embedding call")
+    print(f"{'threshold':<10} {'hit_rate':>9} {'wrong':>6} {'calls':>6} {'mean_ms':>8} "
+          f"{'saved_ms':>9} {'lookup_ms':>10}")
+
+    runs = [('off', None)] + [(t, float(t)) for t in args.thresholds.split(',')]
+    for label, threshold in runs:
+        # A fresh cache for each run
+        fresh = SemanticCache(enabled=threshold is not None, threshold=threshold or 1.0)
+        semantic_cache.__dict__.update(fresh.__dict__)
+        provider.chat_calls = 0
+        hits = wrong = 0
+        start = time.perf_counter()
+        for question, text in requests:
+            response = client.post(
+                '/v1/byosnap-openai/chat', headers={'Gateway': 'internal'},
+                json={'model': 'fake', 'messages': [
+                    {'role': 'system', 'content': 'You are the town guard.'},
+                    {'role': 'user', 'content': text}]})
+            if response.headers.get(SEMANTIC_CACHE_STATUS_HEADER) == 'hit':
+                hits += 1
+                answered = response.get_json()['response']
+                wrong += rephrase_of(answered, questions) != question
+        elapsed = time.perf_counter() - start
+        stats = semantic_cache.stats()
+        print(f"{label:<10} {hits / args.requests:>9.0%} {wrong:>6} {provider.chat_calls:>6} "
+              f"{elapsed * 1000 / args.requests:>8.0f} {stats['saved_ms']:>9} "
+              f"{stats['lookup_ms']:>10}")
+    provider.shutdown()
+
+
+def rephrase_of(text, questions):
+    # The question a rephrased text was made from
+    words = set(re.findall(r"[a-z]+", text.lower().replace("'s", " is")))
+    return max(questions, key=lambda q: len(words & set(re.findall(r"[a-z]+", q.lower()))))
+
+
+if __name__ == '__main__':
+    main()
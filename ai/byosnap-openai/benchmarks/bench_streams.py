@@ -0,0 +1,185 @@
+'''
+Benchmark: concurrent `/chat-stream` responses per pod, sync vs gthread workers.
+
+Starts a local fake OpenAI provider that streams --tokens chat chunks,
+--token-delay seconds apart. Then, for each worker mode, it boots this BYOSnap
+under gunicorn (`-w --workers`) pointed at the fake and opens --streams
+`/chat-stream` requests at once. For every stream it records the time to the
+first `data:` event (TTFB) and to `[DONE]`, and the fake reports how many
+generations it had open at the same time.
+
+With sync workers, only --workers streams are open at once and the others wait
+for a whole generation before their first byte. With gthread workers, every
+stream starts right away.
+
+Usage (from ai/byosnap-openai):
+    python benchmarks/bench_streams.py --streams 200 --modes sync,gthread
+'''
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    '''
+    OpenAI-compatible `POST /chat/completions` that always streams.
+    '''
+    protocol_version = 'HTTP/1.0'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        server = self.server
+        with server.stats_lock:
+            server.open_streams += 1
+            server.peak_streams = max(server.peak_streams, server.open_streams)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for i in range(server.tokens):
+                time.sleep(server.token_delay)
+                chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk",
+                         "created": 0, "model": "fake",
+                         "choices": [{"index": 0, "delta": {"content": "tok%d " % i},
+                                      "finish_reason": None}]}
+                self.wfile.write(b'data: ' + json.dumps(chunk).encode() + b'\n\n')
+            self.wfile.write(b'data: [DONE]\n\n')
+        finally:
+            with server.stats_lock:
+                server.open_streams -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeProvider(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_fake(tokens, token_delay):
+    server = FakeProvider(('127.0.0.1', 0), FakeProviderHandler)
+    server.stats_lock = threading.Lock()
+    server.tokens = tokens
+    server.token_delay = token_delay
+    server.open_streams = 0
+    server.peak_streams = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(provider_url, mode, workers):
+    port = free_port()
+    env = dict(os.environ, OPENAI_BASE_URL=provider_url, OPENAI_API_KEY='bench',
+               GUNICORN_WORKER_CLASS=mode)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b',
+         f'127.0.0.1:{port}', '--backlog', '2048', '--log-level', 'warning', 'app:app'],
+        # The app logs every provider request at DEBUG
+        cwd=APP_DIR, env=env, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 20
+    while True:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/healthz')
+            return proc, port
+        except OSError:
+            if time.time() > deadline:
+                proc.terminate()
+                raise
+            time.sleep(0.2)
+
+
+def one_stream(port, start_gate, results, index):
+    body = json.dumps({"model": "fake", "messages": [{"role": "user", "content": "hi"}]})
+    start_gate.wait()
+    start = time.perf_counter()
+    ttfb = None
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+        conn.request('POST', '/v1/byosnap-openai/chat-stream', body=body,
+                     headers={'Content-Type': 'application/json', 'Gateway': 'internal'})
+        response = conn.getresponse()
+        while True:
+            line = response.readline()
+            if not line:
+                break
+            if line.startswith(b'data:') and ttfb is None:
+                ttfb = time.perf_counter() - start
+            if line.startswith(b'data: [DONE]'):
+                break
+        conn.close()
+        results[index] = (ttfb, time.perf_counter() - start)
+    except OSError:
+        results[index] = None
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_mode(provider, provider_url, mode, workers, streams):
+    proc, port = start_gunicorn(provider_url, mode, workers)
+    try:
+        provider.peak_streams = 0
+        start_gate = threading.Event()
+        results = [None] * streams
+        threads = [threading.Thread(target=one_stream, args=(port, start_gate, results, i))
+                   for i in range(streams)]
+        for thread in threads:
+            thread.start()
+        start = time.perf_counter()
+        start_gate.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+    done = [r for r in results if r is not None and r[0] is not None]
+    ttfbs = [r[0] * 1000 for r in done]
+    totals = [r[1] * 1000 for r in done]
+    print(f"{mode:<8} {len(done):>4}/{streams:<4} {provider.peak_streams:>6} "
+          f"{statistics.median(ttfbs):>9.0f} {percentile(ttfbs, 0.95):>9.0f} "
+          f"{max(ttfbs):>9.0f} {statistics.median(totals):>9.0f} {elapsed:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--streams', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--modes', default='sync,gthread')
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--token-delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    provider, provider_url = start_fake(args.tokens, args.token_delay)
+    print(f"{args.streams} streams of {args.tokens} tokens, {args.token_delay * 1000:.0f} ms "
+          f"apart, gunicorn -w {args.workers}")
+    print(f"{'mode':<8} {'done':>9} {'peak':>6} {'ttfb_p50':>9} {'ttfb_p95':>9} "
+          f"{'ttfb_max':>9} {'total_p50':>9} {'wall_s':>7}")
+    for mode in args.modes.split(','):
+        run_mode(provider, provider_url, mode, args.workers, args.streams)
+    provider.shutdown()
+
+
+if __name__ == '__main__':
+    main()
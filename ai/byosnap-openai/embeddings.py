@@ -0,0 +1,177 @@
+'''
+Batched, cached embeddings for `/embedding`.
+
+`/embedding` takes one string or a list of strings. Each embedding comes back
+in the position of its input. The list is embedded in as few provider calls as
+possible:
+  1. each distinct text is looked up in an in-process LRU keyed by a SHA-256
+     of the model, the dimensions and the text. The same text with the same
+     model always gets the same embedding, so entries do not expire.
+  2. the distinct texts that are not cached go to the provider in chunks of at
+     most EMBEDDING_BATCH_MAX_INPUTS inputs and EMBEDDING_BATCH_MAX_TOKENS
+     estimated tokens. Tokens are estimated as UTF-8 bytes / 3, which is more
+     than the real count for most text, so the chunks stay under the
+     provider's per-request limits without a tokenizer.
+
+Embeddings are requested from the provider as base64 and kept as float32
+arrays, about 6 KB for 1536 dimensions. They are only turned into JSON floats
+when the client asks for `"encoding_format": "float"` (the default). With
+`"encoding_format": "base64"`, each embedding is the base64 of its
+little-endian float32 values, as in OpenAI's own API.
+
+Tuning (environment variables):
+  - EMBEDDING_BATCH_MAX_INPUTS: inputs per provider call (default 2048)
+  - EMBEDDING_BATCH_MAX_TOKENS: estimated tokens per provider call (default 250000)
+  - EMBEDDING_CACHE_MAX_ENTRIES: embeddings kept per worker, 0 turns the cache
+    off (default 4096)
+'''
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Constants
+EMBEDDING_BATCH_MAX_INPUTS = int(os.getenv('EMBEDDING_BATCH_MAX_INPUTS', '2048'))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv('EMBEDDING_BATCH_MAX_TOKENS', '250000'))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '4096'))
+ENCODING_FORMATS = ('float', 'base64')
+# Float32 in the byte order of OpenAI's base64 embeddings
+_SWAP_BYTES = sys.byteorder != 'little'
+
+
+def estimate_tokens(text: str) -> int:
+    '''
+    Upper estimate of the tokens in `text`, without a tokenizer.
+    '''
+    return len(text.encode('utf-8')) // 3 + 1
+
+
+def decode_base64(data: str) -> array:
+    '''
+    Float32 array from the base64 of little-endian float32 values.
+    '''
+    vector = array('f')
+    vector.frombytes(base64.b64decode(data))
+    if _SWAP_BYTES:
+        vector.byteswap()
+    return vector
+
+
+def encode_base64(vector: array) -> str:
+    '''
+    Base64 of the little-endian float32 values of `vector`.
+    '''
+    if _SWAP_BYTES:
+        vector = array('f', vector)
+        vector.byteswap()
+    return base64.b64encode(vector.tobytes()).decode('ascii')
+
+
+def _key(model: str, dimensions: Optional[int], text: str) -> str:
+    canonical = json.dumps([model, dimensions, text], separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class Embedder:
+    '''
+    Embeds lists of texts in chunked provider calls, behind a bounded LRU.
+    '''
+
+    def __init__(self, max_inputs: int = EMBEDDING_BATCH_MAX_INPUTS,
+                 max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+                 cache_max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.cache_max_entries = cache_max_entries
+        self._entries: 'OrderedDict[str, array]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'inputs': 0, 'cache_hits': 0, 'deduplicated': 0,
+                       'provider_inputs': 0, 'provider_calls': 0, 'evictions': 0}
+
+    def embed(self, create: Callable[..., Any], model: str, texts: List[str],
+              dimensions: Optional[int] = None) -> List[array]:
+        '''
+        One float32 embedding per text, in the order of `texts`. `create` is
+        the provider's `embeddings.create`.
+        '''
+        keys = [_key(model, dimensions, text) for text in texts]
+        found: Dict[str, array] = {}
+        missing: 'OrderedDict[str, str]' = OrderedDict()
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing[key] = text
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            self._stats['inputs'] += len(texts)
+            self._stats['cache_hits'] += len(found)
+            self._stats['deduplicated'] += len(texts) - len(found) - len(missing)
+        for chunk in self._chunks(list(missing.items())):
+            vectors = self._call(create, model, [text for _, text in chunk], dimensions)
+            for (key, _), vector in zip(chunk, vectors):
+                found[key] = vector
+            self._put(dict(zip((key for key, _ in chunk), vectors)))
+        return [found[key] for key in keys]
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters for /metrics.
+        '''
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def _chunks(self, items: List[Any]):
+        chunk: List[Any] = []
+        tokens = 0
+        for item in items:
+            cost = estimate_tokens(item[1])
+            if chunk and (len(chunk) >= self.max_inputs or tokens + cost > self.max_tokens):
+                yield chunk
+                chunk, tokens = [], 0
+            chunk.append(item)
+            tokens += cost
+        if chunk:
+            yield chunk
+
+    def _call(self, create: Callable[..., Any], model: str, texts: List[str],
+              dimensions: Optional[int]) -> List[array]:
+        kwargs: Dict[str, Any] = {'model': model, 'input': texts, 'encoding_format': 'base64'}
+        if dimensions is not None:
+            kwargs['dimensions'] = dimensions
+        response = create(**kwargs)
+        vectors: List[Optional[array]] = [None] * len(texts)
+        for item in response.data:
+            # Providers that ignore encoding_format answer with floats
+            vectors[item.index] = decode_base64(item.embedding) \
+                if isinstance(item.embedding, str) else array('f', item.embedding)
+        if any(vector is None for vector in vectors):
+            raise ValueError('Provider returned %d embeddings for %d inputs'
+                             % (len(response.data), len(texts)))
+        with self._lock:
+            self._stats['provider_calls'] += 1
+            self._stats['provider_inputs'] += len(texts)
+        return vectors
+
+    def _put(self, vectors: Dict[str, array]):
+        if self.cache_max_entries <= 0:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.cache_max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+
+embedder = Embedder()
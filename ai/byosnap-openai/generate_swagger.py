@@ -9,8 +9,10 @@ from apispec.ext.marshmallow import MarshmallowPlugin
 from apispec_webframeworks.flask import FlaskPlugin
 from models.schemas import ChatMessageSchema, ErrorResponseSchema, SuccessResponseSchema, \
     SuccessEmbeddingResponseSchema, OpenAIChatRequestSchema, OpenAICompletionRequestSchema, \
-    OpenAIEmbeddingRequestSchema
-from app import chat, chat_stream, completion, completion_stream, embedding
+    OpenAIEmbeddingRequestSchema, IndexUpsertRequestSchema, IndexUpsertResponseSchema, \
+    IndexSearchRequestSchema, IndexSearchResponseSchema
+from app import chat, chat_stream, completion, completion_stream, embedding, index_upsert, \
+    index_search
 
 # Constants
 RESOURCES_DIR = 'snapser-resources'
@@ -30,6 +32,10 @@ app.add_url_rule('/v1/byosnap-openai/completion-stream',
                  view_func=completion_stream, methods=['POST'])
 app.add_url_rule('/v1/byosnap-openai/embedding',
                  view_func=embedding, methods=['POST'])
+app.add_url_rule('/v1/byosnap-openai/index/<index_name>/upsert',
+                 view_func=index_upsert, methods=['POST'])
+app.add_url_rule('/v1/byosnap-openai/index/<index_name>/search',
+                 view_func=index_search, methods=['POST'])
 
 # Initialize APISpec
 spec = APISpec(
@@ -49,6 +55,10 @@ spec.components.schema("ErrorResponseSchema", schema=ErrorResponseSchema)
 spec.components.schema("SuccessResponseSchema", schema=SuccessResponseSchema)
 spec.components.schema("SuccessEmbeddingResponseSchema",
                        schema=SuccessEmbeddingResponseSchema)
+spec.components.schema("IndexUpsertRequestSchema", schema=IndexUpsertRequestSchema)
+spec.components.schema("IndexUpsertResponseSchema", schema=IndexUpsertResponseSchema)
+spec.components.schema("IndexSearchRequestSchema", schema=IndexSearchRequestSchema)
+spec.components.schema("IndexSearchResponseSchema", schema=IndexSearchResponseSchema)
 
 
 # Generate paths using the FlaskPlugin
@@ -58,6 +68,8 @@ with app.test_request_context():
     spec.path(view=completion)
     spec.path(view=completion_stream)
     spec.path(view=embedding)
+    spec.path(view=index_upsert)
+    spec.path(view=index_search)
 
 # Save to JSON
 if not os.path.exists(RESOURCES_DIR):
@@ -36,8 +36,11 @@ class OpenAIEmbeddingRequestSchema(Schema):
     OpenAI embedding request schema.
     '''
     model = fields.Str(required=True, example="text-embedding-ada-002")
-    input = fields.Str(
-        required=True, example="Turn this sentence into an embedding.")
+    input = fields.Raw(
+        required=True, example=["Turn this sentence into an embedding.", "And this one."])
+    encoding_format = fields.Str(
+        missing="float", validate=lambda x: x in ["float", "base64"])
+    dimensions = fields.Int()
 
 
 class SuccessResponseSchema(Schema):
@@ -51,7 +54,54 @@ class SuccessEmbeddingResponseSchema(Schema):
     '''
     Success response schema for OpenAI embedding API.
     '''
-    embedding = fields.List(fields.Float(), required=True)
+    # For a string input: a list of floats, or a base64 string
+    embedding = fields.Raw()
+    # For a list input: one embedding per input, in order
+    embeddings = fields.List(fields.Raw())
+
+
+class IndexUpsertRequestSchema(Schema):
+    '''
+    Vector index upsert request schema. Send either vectors or texts.
+    '''
+    ids = fields.List(fields.Str(), required=True, example=["sword-1", "shield-7"])
+    # Lists of floats, or base64 float32 strings from /embedding
+    vectors = fields.List(fields.Raw())
+    texts = fields.List(fields.Str(), example=["A rusty sword.", "A wooden shield."])
+    model = fields.Str(missing="text-embedding-ada-002")
+
+
+class IndexUpsertResponseSchema(Schema):
+    '''
+    Vector index upsert response schema.
+    '''
+    added = fields.Int(required=True)
+    count = fields.Int(required=True)
+
+
+class IndexSearchRequestSchema(Schema):
+    '''
+    Vector index search request schema. Send either vectors or texts.
+    '''
+    vectors = fields.List(fields.Raw())
+    texts = fields.List(fields.Str(), example=["Something to fight with."])
+    model = fields.Str(missing="text-embedding-ada-002")
+    k = fields.Int(missing=10)
+
+
+class IndexMatchSchema(Schema):
+    '''
+    One search result.
+    '''
+    id = fields.Str(required=True)
+    score = fields.Float(required=True)
+
+
+class IndexSearchResponseSchema(Schema):
+    '''
+    Vector index search response schema: the matches of each query, best first.
+    '''
+    results = fields.List(fields.List(fields.Nested(IndexMatchSchema)), required=True)
 
 
 class ErrorResponseSchema(Schema):
@@ -0,0 +1,237 @@
+'''
+Opt-in semantic cache of `/chat` answers, for near-duplicate questions.
+
+Players ask NPCs the same thing in many ways ("where is the blacksmith?",
+"Where's the blacksmith"), which the exact-match response cache (see
+response_cache.py) never matches. With this cache on, the last user message of
+a `/chat` request is embedded and compared with the cached prompts. When the
+closest one has a cosine similarity of at least SEMANTIC_CACHE_THRESHOLD, its
+answer is returned without calling the provider. `/chat` looks up the
+exact-match cache first. A semantic hit is not stored in it, so an approximate
+answer never becomes the exact answer of a prompt.
+
+Only prompts with the same context are compared: a namespace is a hash of the
+model, the generation parameters and every message before the last one (and
+the system prompt). Two NPCs with different system prompts, or two turns of
+different conversations, never share answers. A request whose last message is
+not a user text message is not cached. Unlike the exact-match cache, any
+temperature is cached, since a near-duplicate question gets a different answer
+anyway.
+
+Each namespace keeps up to SEMANTIC_CACHE_MAX_ENTRIES prompts as the rows of a
+unit-length float32 matrix, so a lookup is one matrix-vector product and an
+argmax. Entries expire after SEMANTIC_CACHE_TTL_SECONDS. When a namespace is
+full, an expired entry is replaced first, otherwise the least recently used
+one. The least recently used namespaces are dropped beyond
+SEMANTIC_CACHE_MAX_NAMESPACES. Every lookup costs an embedding call, so the
+cache pays off only when the hit rate is high enough. The `semantic_cache`
+stats in /metrics count the hits and misses, the time spent in lookups, and
+the provider time saved by hits (net of their lookup).
+
+`Cache-Control: no-cache` skips the lookup (the answer is still stored), and
+`Cache-Control: no-store` bypasses the cache. Responses say what happened in
+`X-Semantic-Cache`: `hit`, `miss` or `bypass`. An embedding error is logged
+and counted, and the request goes to the provider.
+
+Tuning (environment variables):
+  - SEMANTIC_CACHE_ENABLED: 'true' to turn the cache on (default 'false')
+  - SEMANTIC_CACHE_THRESHOLD: lowest cosine similarity of a hit (default 0.95).
+    It depends on the embedding model: measure it on your own prompts.
+  - SEMANTIC_CACHE_TTL_SECONDS: how long an answer is reused (default 3600)
+  - SEMANTIC_CACHE_MAX_ENTRIES: prompts kept per namespace (default 1000)
+  - SEMANTIC_CACHE_MAX_NAMESPACES: namespaces kept per worker (default 256)
+'''
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from response_cache import cache_key
+
+
+# Constants
+SEMANTIC_CACHE_STATUS_HEADER = 'X-Semantic-Cache'
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv('SEMANTIC_CACHE_TTL_SECONDS', '3600'))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '1000'))
+SEMANTIC_CACHE_MAX_NAMESPACES = int(os.getenv('SEMANTIC_CACHE_MAX_NAMESPACES', '256'))
+INITIAL_CAPACITY = 16
+
+
+def split_last_user_message(messages: Any) -> Tuple[Optional[str], Any]:
+    '''
+    The text of the last message, when it is a user text message, and the
+    messages before it.
+    '''
+    if not isinstance(messages, list) or not messages:
+        return None, messages
+    last = messages[-1]
+    if not isinstance(last, dict) or last.get('role') != 'user':
+        return None, messages
+    content = last.get('content')
+    if not isinstance(content, str) or not content.strip():
+        return None, messages
+    return content, messages[:-1]
+
+
+class _Namespace:
+    '''
+    The prompts of one namespace: unit-length rows, with their answers.
+    '''
+
+    def __init__(self, dim: int):
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.expires_at = np.empty(0)
+        self.used_at = np.empty(0)
+        # (payload, seconds the provider took for it), per row
+        self.answers: List[Tuple[Dict[str, Any], float]] = []
+
+    def closest(self, vector: np.ndarray, now: float) -> Tuple[int, float]:
+        count = len(self.answers)
+        if count == 0:
+            return -1, -1.0
+        scores = self.vectors[:count] @ vector
+        scores[self.expires_at[:count] <= now] = -np.inf
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def put(self, vector: np.ndarray, answer: Tuple[Dict[str, Any], float],
+            expires_at: float, now: float, max_entries: int) -> Tuple[bool, bool]:
+        '''
+        Store an answer. Returns whether it replaced an expired and a live row.
+        '''
+        count = len(self.answers)
+        expired = evicted = False
+        if count < max_entries:
+            if count == len(self.vectors):
+                self._grow(min(max_entries, max(INITIAL_CAPACITY, count * 2)))
+            row = count
+            self.answers.append(answer)
+        else:
+            stale = self.expires_at[:count] <= now
+            expired = bool(stale.any())
+            evicted = not expired
+            row = int(np.argmax(stale)) if expired else int(np.argmin(self.used_at[:count]))
+            self.answers[row] = answer
+        self.vectors[row] = vector
+        self.expires_at[row] = expires_at
+        self.used_at[row] = now
+        return expired, evicted
+
+    def _grow(self, capacity: int):
+        count = len(self.answers)
+        vectors = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:count] = self.vectors[:count]
+        self.vectors = vectors
+        self.expires_at = np.resize(self.expires_at, capacity)
+        self.used_at = np.resize(self.used_at, capacity)
+
+
+class SemanticCache:
+    '''
+    Answers of earlier prompts, found by the similarity of their embeddings.
+    '''
+
+    def __init__(self, enabled: bool = SEMANTIC_CACHE_ENABLED,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 max_namespaces: int = SEMANTIC_CACHE_MAX_NAMESPACES):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        self._namespaces: 'OrderedDict[Tuple[str, int], _Namespace]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'bypassed': 0,
+                       'embed_errors': 0, 'expired': 0, 'evictions': 0,
+                       'lookup_ms': 0, 'saved_ms': 0}
+
+    def cached_call(self, embed: Optional[Callable[[str], np.ndarray]],
+                    namespace: Dict[str, Any], prompt: Optional[str],
+                    call: Callable[[], Dict[str, Any]],
+                    cache_control: str = '') -> Tuple[Dict[str, Any], str]:
+        '''
+        Return `call()`'s payload, or the cached one of a prompt similar to
+        `prompt` in the same `namespace`, and the `X-Semantic-Cache` value.
+        `embed` returns the embedding of a text.
+        '''
+        cache_control = cache_control.lower()
+        if not self.enabled or embed is None or prompt is None or 'no-store' in cache_control:
+            with self._lock:
+                self._stats['bypassed'] += 1
+            return call(), 'bypass'
+        started = time.perf_counter()
+        try:
+            vector = np.asarray(embed(prompt), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if not norm > 0:
+                raise ValueError('the embedding has no direction')
+            vector = vector / norm
+        except Exception as e:
+            logging.warning('Semantic cache embedding failed: %s', e)
+            with self._lock:
+                self._stats['embed_errors'] += 1
+            return call(), 'bypass'
+        key = (cache_key('semantic', namespace), len(vector))
+        if 'no-cache' not in cache_control:
+            found = self._lookup(key, vector, time.perf_counter() - started)
+            if found is not None:
+                return found, 'hit'
+        lookup_seconds = time.perf_counter() - started
+        payload = call()
+        self._store(key, vector, payload, time.perf_counter() - started - lookup_seconds)
+        return payload, 'miss'
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters for /metrics.
+        '''
+        with self._lock:
+            return dict(self._stats, namespaces=len(self._namespaces),
+                        entries=sum(len(ns.answers) for ns in self._namespaces.values()))
+
+    def _lookup(self, key: Tuple[str, int], vector: np.ndarray,
+                embed_seconds: float) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        now = time.monotonic()
+        with self._lock:
+            self._stats['lookups'] += 1
+            namespace = self._namespaces.get(key)
+            row, score = namespace.closest(vector, now) if namespace else (-1, -1.0)
+            lookup_seconds = embed_seconds + time.perf_counter() - started
+            self._stats['lookup_ms'] += int(lookup_seconds * 1000)
+            if row < 0 or score < self.threshold:
+                self._stats['misses'] += 1
+                return None
+            self._namespaces.move_to_end(key)
+            namespace.used_at[row] = now
+            payload, cost_seconds = namespace.answers[row]
+            self._stats['hits'] += 1
+            self._stats['saved_ms'] += int((cost_seconds - lookup_seconds) * 1000)
+        logging.debug('Semantic cache hit, similarity %.3f', score)
+        return payload
+
+    def _store(self, key: Tuple[str, int], vector: np.ndarray, payload: Dict[str, Any],
+               cost_seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            namespace = self._namespaces.get(key)
+            if namespace is None:
+                namespace = self._namespaces[key] = _Namespace(len(vector))
+                while len(self._namespaces) > self.max_namespaces:
+                    self._namespaces.popitem(last=False)
+            self._namespaces.move_to_end(key)
+            expired, evicted = namespace.put(vector, (payload, cost_seconds),
+                                             now + self.ttl_seconds, now, self.max_entries)
+            self._stats['expired'] += expired
+            self._stats['evictions'] += evicted
+
+
+semantic_cache = SemanticCache()
@@ -48,3 +48,19 @@ curl -X POST  -H 'Gateway: internal' http://localhost:5003/v1/byosnap-openai/emb
     "model": "text-embedding-ada-002",
     "input": "Convert this sentence into an embedding."
   }'
+
+curl -X POST  -H 'Gateway: internal' http://localhost:5003/v1/byosnap-openai/index/items/upsert \
+  -H "Content-Type: application/json" \
+  -d '{
+    "model": "text-embedding-ada-002",
+    "ids": ["sword-1", "shield-7"],
+    "texts": ["A rusty iron sword.", "A round wooden shield."]
+  }'
+
+curl -X POST  -H 'Gateway: internal' http://localhost:5003/v1/byosnap-openai/index/items/search \
+  -H "Content-Type: application/json" \
+  -d '{
+    "model": "text-embedding-ada-002",
+    "texts": ["Something to fight with."],
+    "k": 5
+  }'
@@ -0,0 +1,315 @@
+'''
+Named vector indexes for `/index/<index_name>/upsert` and `/index/<index_name>/search`.
+
+An index holds vectors of one dimension, each under a string id, as the rows of
+one contiguous float32 matrix. Rows are scaled to unit length when they are
+added, so the cosine similarity of a batch of queries with every row is a
+single matrix product. `argpartition` then picks the top k of each query
+without sorting the other rows. Queries are scored in blocks, so the score
+matrix stays under VECTOR_INDEX_SEARCH_BLOCK_MB. Upserting an id that exists
+overwrites its row in place. New ids are appended, and the matrix doubles when
+it is full, so adding a row costs amortized O(dimensions).
+
+With VECTOR_INDEX_DIR set (the default), an index is stored in that directory:
+  - <index_name>.json: the dimension, written once when the index is created
+  - <index_name>.f32: the rows, float32, memory-mapped
+  - <index_name>.ids: the ids, one JSON string per line, in row order
+  - <index_name>.lock: held (flock) by upserts, across processes
+The gunicorn workers of a pod map the same file, so the rows are kept once in
+the page cache, and each worker sees the upserts of the others: before every
+search, a worker reads the ids appended since its last search. Rows are written
+before their ids, so a worker never sees an id without its row. The directory
+is on the container's disk unless a volume is mounted there. With
+VECTOR_INDEX_DIR set to '', indexes are kept in process memory instead, and
+each worker has its own.
+
+Tuning (environment variables):
+  - VECTOR_INDEX_DIR: directory of the index files (default
+    '/tmp/byosnap-vector-index'), '' for process memory
+  - VECTOR_INDEX_SEARCH_BLOCK_MB: memory for the scores of one block of
+    queries (default 64)
+'''
+import base64
+import fcntl
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Constants
+VECTOR_INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', '/tmp/byosnap-vector-index')
+VECTOR_INDEX_SEARCH_BLOCK_MB = int(os.getenv('VECTOR_INDEX_SEARCH_BLOCK_MB', '64'))
+VECTOR_INDEX_MAX_K = 1000
+INDEX_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+INITIAL_CAPACITY = 1024
+
+
+def normalize(vectors: Any) -> np.ndarray:
+    '''
+    Float32 copy of a 2-d array of vectors, each scaled to unit length.
+    '''
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    if matrix.ndim != 2 or matrix.shape[1] == 0:
+        raise ValueError('vectors must be a list of lists of numbers')
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    if not np.all(np.isfinite(norms) & (norms > 0)):
+        raise ValueError('vectors must be finite and not all zeros')
+    matrix /= norms
+    return matrix
+
+
+def parse_vectors(values: Any) -> np.ndarray:
+    '''
+    Matrix from a list of float lists, or of base64 float32 strings as
+    `/embedding` returns them with `"encoding_format": "base64"`.
+    '''
+    if not values or not isinstance(values, list):
+        raise ValueError('vectors must be a non-empty list')
+    if all(isinstance(value, str) for value in values):
+        values = [np.frombuffer(base64.b64decode(value), dtype='<f4') for value in values]
+    try:
+        matrix = np.array(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        matrix = None
+    if matrix is None or matrix.ndim != 2:
+        raise ValueError('vectors must be lists of numbers of the same length')
+    return matrix
+
+
+class VectorIndex:
+    '''
+    Cosine top-k search over unit-length float32 rows, kept in memory or in a
+    memory-mapped file.
+    '''
+
+    def __init__(self, dim: int, path: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix: np.ndarray = np.empty((0, dim), dtype=np.float32)
+        # Bytes of the ids file read so far
+        self._ids_offset = 0
+        self._lock = threading.Lock()
+        if path is not None:
+            for suffix in ('.f32', '.ids', '.lock'):
+                open(path + suffix, 'ab').close()
+            with self._lock:
+                self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, ids: List[str], vectors: np.ndarray) -> int:
+        '''
+        Add or overwrite the rows of `ids`. Returns how many ids were new.
+        '''
+        vectors = normalize(vectors)
+        if len(ids) != len(vectors):
+            raise ValueError('ids and vectors must have the same length')
+        if vectors.shape[1] != self.dim:
+            raise ValueError('vectors of this index have %d dimensions' % self.dim)
+        # The last vector of an id sent twice wins
+        latest = dict(zip(ids, range(len(ids))))
+        vectors = vectors[list(latest.values())]
+        with self._lock, self._file_lock():
+            self._refresh()
+            new_ids: List[str] = []
+            rows: List[int] = []
+            for id_ in latest:
+                row = self._rows.get(id_)
+                if row is None:
+                    row = len(self._ids) + len(new_ids)
+                    new_ids.append(id_)
+                rows.append(row)
+            self._reserve(len(self._ids) + len(new_ids))
+            # A search running now may read an overwritten row half-written
+            self._matrix[rows] = vectors
+            if self.path is not None and new_ids:
+                # Another process sees the rows through its own mapping as soon
+                # as they are written, so the ids can follow without a flush
+                data = ''.join(json.dumps(id_) + '\n' for id_ in new_ids).encode('utf-8')
+                with open(self.path + '.ids', 'ab') as f:
+                    f.write(data)
+                self._ids_offset += len(data)
+            for id_ in new_ids:
+                self._rows[id_] = len(self._ids)
+                self._ids.append(id_)
+        return len(new_ids)
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        '''
+        The k ids closest to each query, with their cosine similarity, best first.
+        '''
+        queries = normalize(queries)
+        if queries.shape[1] != self.dim:
+            raise ValueError('vectors of this index have %d dimensions' % self.dim)
+        with self._lock:
+            if self.path is not None:
+                self._refresh()
+            matrix, ids, count = self._matrix, self._ids, len(self._ids)
+        k = min(k, count)
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        rows = matrix[:count]
+        block = max(1, VECTOR_INDEX_SEARCH_BLOCK_MB * 2 ** 20 // (4 * count))
+        results: List[List[Tuple[str, float]]] = []
+        for start in range(0, len(queries), block):
+            scores = queries[start:start + block] @ rows.T
+            if k < count:
+                top = np.argpartition(scores, count - k, axis=1)[:, count - k:]
+            else:
+                top = np.broadcast_to(np.arange(count), scores.shape)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for row_ids, row_scores in zip(top.tolist(), top_scores.tolist()):
+                results.append([(ids[row], score) for row, score in zip(row_ids, row_scores)])
+        return results
+
+    @contextmanager
+    def _file_lock(self):
+        if self.path is None:
+            yield
+            return
+        with open(self.path + '.lock', 'rb') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        # Catch up with the ids appended by other processes
+        if self.path is None:
+            return
+        size = os.path.getsize(self.path + '.ids')
+        if size > self._ids_offset:
+            with open(self.path + '.ids', 'rb') as f:
+                f.seek(self._ids_offset)
+                data = f.read(size - self._ids_offset)
+            # Only whole lines, in case an append is still being written
+            data = data[:data.rfind(b'\n') + 1]
+            for line in data.splitlines():
+                id_ = json.loads(line)
+                self._rows[id_] = len(self._ids)
+                self._ids.append(id_)
+            self._ids_offset += len(data)
+        if len(self._ids) > len(self._matrix):
+            self._map()
+
+    def _map(self):
+        capacity = os.path.getsize(self.path + '.f32') // (4 * self.dim)
+        if capacity:
+            self._matrix = np.memmap(self.path + '.f32', dtype=np.float32, mode='r+',
+                                     shape=(capacity, self.dim))
+
+    def _reserve(self, count: int):
+        capacity = len(self._matrix)
+        if count <= capacity:
+            return
+        capacity = max(capacity, INITIAL_CAPACITY)
+        while capacity < count:
+            capacity *= 2
+        if self.path is None:
+            matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+            # A search running now keeps the old matrix
+            self._matrix = matrix
+            return
+        with open(self.path + '.f32', 'r+b') as f:
+            f.truncate(capacity * self.dim * 4)
+        self._map()
+
+
+class IndexRegistry:
+    '''
+    The vector indexes by name, created by their first upsert.
+    '''
+
+    def __init__(self, directory: str = VECTOR_INDEX_DIR):
+        self.directory = directory
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._lock = threading.Lock()
+        self._stats = {'upserts': 0, 'upserted_vectors': 0, 'searches': 0, 'queries': 0}
+
+    def upsert(self, name: str, ids: List[str], vectors: np.ndarray) -> Tuple[int, int]:
+        '''
+        Add or overwrite vectors. Returns how many ids were new and the size
+        of the index.
+        '''
+        index = self._get(name, create_dim=vectors.shape[1])
+        added = index.upsert(ids, vectors)
+        with self._lock:
+            self._stats['upserts'] += 1
+            self._stats['upserted_vectors'] += len(ids)
+        return added, len(index)
+
+    def search(self, name: str, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        '''
+        Top-k search of an index. Raises KeyError when it does not exist.
+        '''
+        index = self._get(name)
+        if index is None:
+            raise KeyError(name)
+        results = index.search(queries, k)
+        with self._lock:
+            self._stats['searches'] += 1
+            self._stats['queries'] += len(queries)
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters for /metrics.
+        '''
+        with self._lock:
+            return dict(self._stats, indexes=len(self._indexes),
+                        vectors=sum(len(index) for index in self._indexes.values()))
+
+    def _get(self, name: str, create_dim: Optional[int] = None) -> Optional[VectorIndex]:
+        if not INDEX_NAME_PATTERN.match(name):
+            raise ValueError('index names are 1 to 64 letters, digits, - or _')
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                dim = self._dim(name, create_dim)
+                if dim is None:
+                    return None
+                path = os.path.join(self.directory, name) if self.directory else None
+                index = self._indexes[name] = VectorIndex(dim, path)
+        if create_dim is not None and create_dim != index.dim:
+            raise ValueError('vectors of this index have %d dimensions' % index.dim)
+        return index
+
+    def _dim(self, name: str, create_dim: Optional[int]) -> Optional[int]:
+        # The dimension of an index, from its .json file, which the first
+        # upsert of any worker creates
+        if not self.directory:
+            return create_dim
+        path = os.path.join(self.directory, name + '.json')
+        if create_dim is not None and not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump({'dim': create_dim}, f)
+            try:
+                # Fails if another worker created the index first
+                os.link(tmp, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        try:
+            with open(path) as f:
+                return json.load(f)['dim']
+        except FileNotFoundError:
+            return None
+
+
+vector_indexes = IndexRegistry()
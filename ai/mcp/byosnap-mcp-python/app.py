@@ -1,14 +1,19 @@
 import logging
 import os
-import uuid
-import json
-from functools import wraps
+from functools import partial, wraps
 
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, g, request, jsonify, make_response
 from flask_cors import CORS, cross_origin
-import snapser_internal
 from snapser_internal.rest import ApiException
-from typing import Dict, List, Any, Optional
+from json_provider import CodecJSONProvider
+from todo_store import TodoStore, todos
+from todo_cache import todo_cache
+from jsonrpc_batch import MCP_BATCH_MAX_CALLS, run_batch
+from mcp_sessions import SESSION_HEADER, McpSession, SessionManager
+from mcp_streaming import accepts_event_stream, progress_token, report_progress, stream
+import metrics
+import request_deadlines
+from typing import Dict, List, Any, Optional, Tuple
 
 
 # -----------------------------------------------------------------------------
@@ -16,7 +21,12 @@ from typing import Dict, List, Any, Optional
 # -----------------------------------------------------------------------------
 
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 CORS(app, resources={r"/*": {"origins": "*"}})
+metrics.init_app(app)
+request_deadlines.init_app(app)
+metrics.register_stats('todo_store', todos.stats)
+metrics.register_stats('todo_cache', todo_cache.stats)
 
 AUTH_TYPE_HEADER_KEY = "Auth-Type"
 GATEWAY_HEADER_KEY = "Gateway"
@@ -26,8 +36,6 @@ AUTH_TYPE_HEADER_VALUE_USER_AUTH = "user"
 AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH = "api-key"
 GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE = "internal"
 
-TODOS_BLOB_KEY = 'todos'
-
 ALL_AUTH_TYPES = [
     AUTH_TYPE_HEADER_VALUE_USER_AUTH,
     AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH,
@@ -37,6 +45,9 @@ ALL_AUTH_TYPES = [
 # TODO: Replace with your MCP API key
 MCP_API_KEY = '171206450ee690fc4062bf3c4880d4b3'
 
+sessions = SessionManager(os.getenv('MCP_SESSION_SECRET', MCP_API_KEY))
+metrics.register_stats('mcp_sessions', sessions.stats)
+
 logging.basicConfig(
     level=logging.DEBUG,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -102,33 +113,27 @@ def validate_authorization(*allowed_auth_types, user_id_resource_key="user_id"):
     return decorator
 
 
-class TodoStore:
-    '''
-    Simple in-memory todo store structure.
-    '''
-
-    def __init__(self, tasks: List[Dict[str, Any]] = None, cas: str = '0'):
-        if tasks is None:
-            tasks = []
-        self.tasks = tasks
-        self.cas = cas
-
-    def to_dict(self):
-        '''
-        Convert to dict.
-        '''
-        return {"tasks": self.tasks, "cas": self.cas}
-
 # -----------------------------------------------------------------------------
 # In-memory Storage (per user)
 # -----------------------------------------------------------------------------
 
 
+def current_session() -> Optional[McpSession]:
+    '''
+    The MCP session of the current request, if it has one.
+    '''
+    return g.get("mcp_session")
+
+
 def get_user_id_for_request() -> str:
     """
     Helper to pick a user bucket.
     In real Snapser you’d map API key / tenant to user/workspace.
+    Inside a session, the user resolved at `initialize` is used.
     """
+    session = current_session()
+    if session is not None:
+        return session.user_id
     user_id = request.headers.get(USER_ID_HEADER_KEY)
     if not user_id:
         # Fallback bucket for demo
@@ -137,89 +142,29 @@ def get_user_id_for_request() -> str:
 
 
 def get_tasks_for_user(user_id: str) -> TodoStore:
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL")
-    )
     todos_store = TodoStore(tasks=[], cas="0")
-
-    with snapser_internal.ApiClient(configuration) as api_client:
-        api = snapser_internal.StorageServiceApi(api_client)
-        try:
-            api_response = api.storage_get_blob(
-                owner_id=user_id,
-                access_type='protected',
-                blob_key=TODOS_BLOB_KEY,
-                gateway=GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE
-            )
-            if api_response.value:
-                parsed = json.loads(api_response.value)
-                todos_store = TodoStore(
-                    tasks=parsed.get("tasks", []),
-                    cas=api_response.cas or "0"
-                )
-        except ApiException as e:
-            logging.warning("storage_get_blob ApiException: %s", e)
-        except Exception as e:
-            logging.exception("storage_get_blob Exception: %s", e)
+    try:
+        todos_store = todo_cache.read(user_id)
+    except ApiException as e:
+        logging.warning("storage_get_json_blob ApiException: %s", e)
+    except Exception as e:
+        logging.exception("storage_get_json_blob Exception: %s", e)
 
     return todos_store
 
 
-def save_tasks_for_user(user_id: str, new_store: TodoStore) -> TodoStore:
-    '''
-    Saves tasks for a given user from Snapser Storage Service.
-    '''
-    configuration = snapser_internal.Configuration(
-        host=os.getenv("SNAPEND_STORAGE_HTTP_URL"))
-    with snapser_internal.ApiClient(configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser_internal.StorageServiceApi(api_client)
-        body = snapser_internal.StorageReplaceBlobRequest(
-            access_type='protected', blob_key=TODOS_BLOB_KEY,
-            create=True, cas=new_store.cas,
-            owner_id=user_id, ttl=0,
-            value=json.dumps({"tasks": new_store.tasks})
-        )
-        try:
-            # Save Blob
-            api_response = api_instance.storage_replace_blob(
-                owner_id=user_id, access_type='protected',
-                blob_key=TODOS_BLOB_KEY, gateway=GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE,
-                body=body
-            )
-            if api_response.cas:
-                new_store.cas = api_response.cas
-        except ApiException as e:
-            print(
-                f"ApiException when calling StorageServiceApi->storage_get_blob: {e}\n")
-        except Exception as e:
-            print(
-                f"Exception when calling StorageServiceApi->storage_get_blob: {e}\n")
-    return new_store
-
-
 def add_task_for_user(user_id: str, title: str) -> Dict:
     '''
-    Add a new task for a given user.
+    Add a new task for a given user. It is written to Storage shortly after.
     '''
-    store = get_tasks_for_user(user_id)
-    task = {"id": str(uuid.uuid4()), "title": title, "completed": False}
-    store.tasks.append(task)
-    save_tasks_for_user(user_id, store)
-    return task
+    return todo_cache.add(user_id, title)
 
 
 def complete_task_for_user(user_id: str, task_id: str) -> Optional[Dict[str, Any]]:
     '''
-    Mark a task as completed for a given user.
+    Mark a task as completed for a given user. It is written to Storage shortly after.
     '''
-    store = get_tasks_for_user(user_id)
-    for task in store.tasks:
-        if task["id"] == task_id:
-            task["completed"] = True
-            save_tasks_for_user(user_id, store)
-            return task
-    return None
+    return todo_cache.complete(user_id, task_id)
 
 
 # -----------------------------------------------------------------------------
@@ -234,10 +179,13 @@ METHOD_NOT_FOUND = -32601
 INVALID_PARAMS = -32602
 INTERNAL_ERROR = -32603
 
+# Tools that only read the todo store; batch entries calling them may run together
+TODO_READ_TOOLS = {"list_todos"}
 
-def jsonrpc_error_response(_id, code, message, data=None):
+
+def jsonrpc_error(_id, code, message, data=None):
     '''
-    Create a JSON-RPC error response.
+    Create a JSON-RPC error payload.
     '''
     payload = {
         "jsonrpc": JSONRPC_VERSION,
@@ -246,14 +194,28 @@ def jsonrpc_error_response(_id, code, message, data=None):
     }
     if data is not None:
         payload["error"]["data"] = data
-    return jsonify(payload)
+    return payload
+
+
+def jsonrpc_result(_id, result):
+    '''
+    Create a JSON-RPC result payload.
+    '''
+    return {"jsonrpc": JSONRPC_VERSION, "id": _id, "result": result}
+
+
+def jsonrpc_error_response(_id, code, message, data=None):
+    '''
+    Create a JSON-RPC error response.
+    '''
+    return jsonify(jsonrpc_error(_id, code, message, data))
 
 
 def jsonrpc_result_response(_id, result):
     '''
     Create a JSON-RPC result response.
     '''
-    return jsonify({"jsonrpc": JSONRPC_VERSION, "id": _id, "result": result})
+    return jsonify(jsonrpc_result(_id, result))
 
 
 # -----------------------------------------------------------------------------
@@ -277,7 +239,7 @@ def handle_initialize(_id, params):
             "version": "0.1.0",
         },
     }
-    return jsonrpc_result_response(_id, result)
+    return jsonrpc_result(_id, result)
 
 
 def handle_tools_list(_id, params):
@@ -326,7 +288,7 @@ def handle_tools_list(_id, params):
         },
     ]
 
-    return jsonrpc_result_response(_id, {"tools": tools})
+    return jsonrpc_result(_id, {"tools": tools})
 
 
 def _mcp_todo_response(user_id: str, message: Optional[str] = None):
@@ -375,45 +337,49 @@ def handle_tools_call(_id, params):
         if name == "list_todos":
             result = _mcp_todo_response(
                 user_id, "Here are your current tasks.")
-            return jsonrpc_result_response(_id, result)
+            return jsonrpc_result(_id, result)
 
         if name == "add_todo":
             title = arguments.get("title")
             if not isinstance(title, str) or not title.strip():
-                return jsonrpc_error_response(
+                return jsonrpc_error(
                     _id,
                     INVALID_PARAMS,
                     "add_todo requires a non-empty 'title' string.",
                 )
 
+            report_progress(0, 2, "Adding todo")
             task = add_task_for_user(user_id, title.strip())
+            report_progress(1, 2, "Reading todos")
             msg = f"Added todo: '{task['title']}'."
             result = _mcp_todo_response(user_id, msg)
-            return jsonrpc_result_response(_id, result)
+            return jsonrpc_result(_id, result)
 
         if name == "complete_todo":
             task_id = arguments.get("id")
             if not isinstance(task_id, str):
-                return jsonrpc_error_response(
+                return jsonrpc_error(
                     _id,
                     INVALID_PARAMS,
                     "complete_todo requires an 'id' string.",
                 )
 
+            report_progress(0, 2, "Completing todo")
             task = complete_task_for_user(user_id, task_id)
             if task is None:
-                return jsonrpc_error_response(
+                return jsonrpc_error(
                     _id,
                     INVALID_PARAMS,
                     f"No todo found with id {task_id!r}.",
                 )
 
+            report_progress(1, 2, "Reading todos")
             msg = f"Marked todo '{task['title']}' as completed."
             result = _mcp_todo_response(user_id, msg)
-            return jsonrpc_result_response(_id, result)
+            return jsonrpc_result(_id, result)
 
         # Unknown tool name
-        return jsonrpc_error_response(
+        return jsonrpc_error(
             _id,
             METHOD_NOT_FOUND,
             f"Unknown tool: {name}",
@@ -421,7 +387,101 @@ def handle_tools_call(_id, params):
 
     except Exception:  # defensive
         logging.exception("Unhandled error in tools/call")
-        return jsonrpc_error_response(_id, INTERNAL_ERROR, "Internal server error")
+        return jsonrpc_error(_id, INTERNAL_ERROR, "Internal server error")
+
+
+def handle_jsonrpc(body) -> Optional[Dict[str, Any]]:
+    '''
+    Run one JSON-RPC request. Returns the response payload, or None for a
+    notification.
+    '''
+    if not isinstance(body, dict):
+        return jsonrpc_error(None, INVALID_REQUEST, "Request must be an object")
+
+    method = body.get("method")
+    _id = body.get("id", None)
+    params = body.get("params") or {}
+
+    # Notifications (no id) – just swallow
+    if _id is None and isinstance(method, str) and method.startswith(
+        "notifications/"
+    ):
+        logging.debug("Received notification: %s", method)
+        return None
+
+    if method is None:
+        return jsonrpc_error(_id, INVALID_REQUEST, "Missing 'method' field")
+    if not isinstance(params, dict):
+        return jsonrpc_error(_id, INVALID_PARAMS, "'params' must be an object")
+
+    # Route MCP methods
+    if method == "initialize":
+        return handle_initialize(_id, params)
+    if method == "tools/list":
+        return handle_tools_list(_id, params)
+    if method == "tools/call":
+        meta = params.get("_meta")
+        token = meta.get("progressToken") if isinstance(meta, dict) else None
+        with progress_token(token):
+            return handle_tools_call(_id, params)
+
+    logging.warning("Unknown MCP method: %s", method)
+    return jsonrpc_error(
+        _id, METHOD_NOT_FOUND, f"Unknown method: {method}"
+    )
+
+
+def todo_store_access(body) -> Optional[Tuple[str, bool]]:
+    '''
+    Order key of a batch entry: (user id, writes) for the todo tools, which
+    must run in batch order against the same todo store.
+    '''
+    if not isinstance(body, dict) or body.get("method") != "tools/call":
+        return None
+    params = body.get("params")
+    name = params.get("name") if isinstance(params, dict) else None
+    return get_user_id_for_request(), name not in TODO_READ_TOOLS
+
+
+def handle_jsonrpc_batch(batch: List[Any]):
+    '''
+    Run a JSON-RPC batch. Returns the array of responses, an error payload, or
+    None when no entry gets a response.
+    '''
+    if not batch:
+        return jsonrpc_error(None, INVALID_REQUEST, "Empty batch")
+    if len(batch) > MCP_BATCH_MAX_CALLS:
+        return jsonrpc_error(
+            None, INVALID_REQUEST, f"A batch takes at most {MCP_BATCH_MAX_CALLS} calls"
+        )
+
+    logging.debug("MCP batch request of %d calls", len(batch))
+
+    results = run_batch(batch, handle_jsonrpc, todo_store_access)
+    # Requests without an id are notifications and get no response
+    responses = [
+        result for body, result in zip(batch, results)
+        if result is not None and not (isinstance(body, dict) and "id" not in body)
+    ]
+    return responses or None
+
+
+def is_tool_call(body) -> bool:
+    '''
+    Whether a JSON-RPC request is a tools/call that expects a response.
+    '''
+    return isinstance(body, dict) and body.get("method") == "tools/call" and "id" in body
+
+
+def mcp_response(payload, headers: Dict[str, str]):
+    '''
+    Respond with a JSON-RPC payload, or 202 Accepted when there is none.
+    '''
+    if payload is None:
+        return ("", 202, headers)
+    response = jsonify(payload)
+    response.headers.update(headers)
+    return response
 
 
 # -----------------------------------------------------------------------------
@@ -433,7 +493,7 @@ def handle_tools_call(_id, params):
 #     AUTH_TYPE_HEADER_VALUE_API_KEY_AUTH,
 #     GATEWAY_HEADER_INTERNAL_ORIGIN_VALUE,
 # )
-@cross_origin()
+@cross_origin(expose_headers=[SESSION_HEADER])
 def mcp_entrypoint():
     """
     API that is accessible by Api-Key and internal auth. User auth is not allowed.
@@ -444,7 +504,12 @@ def mcp_entrypoint():
       summary: MCP JSON-RPC endpoint
       description: >
         Snapser-hosted MCP endpoint that speaks JSON-RPC 2.0 and exposes
-        initialize, tools/list, and tools/call.
+        initialize, tools/list, and tools/call. A JSON-RPC batch (an array of
+        requests) gets one array of responses. The response to initialize
+        carries an Mcp-Session-Id header to send with later requests. When the
+        Accept header includes text/event-stream, tools/call is answered with
+        an SSE stream of progress notifications followed by the response.
+        Requests that are only notifications get 202 Accepted.
       operationId: McpRpc
       parameters:
         - in: query
@@ -453,6 +518,12 @@ def mcp_entrypoint():
             type: string
           required: true
           description: API key used for authentication
+        - in: header
+          name: Mcp-Session-Id
+          schema:
+            type: string
+          required: false
+          description: Session id returned by initialize
       requestBody:
         required: true
         content:
@@ -474,6 +545,11 @@ def mcp_entrypoint():
           content:
             application/json:
               schema: ErrorResponseSchema
+        404:
+          description: Unknown or expired Mcp-Session-Id
+          content:
+            application/json:
+              schema: ErrorResponseSchema
     """
     try:
         # Get query param api-key
@@ -491,39 +567,34 @@ def mcp_entrypoint():
         logging.exception("Failed to parse JSON body")
         return jsonrpc_error_response(None, PARSE_ERROR, "Invalid JSON")
 
-    if not isinstance(body, dict):
+    session_id = request.headers.get(SESSION_HEADER)
+    if session_id:
+        g.mcp_session = sessions.get(session_id)
+        if g.mcp_session is None:
+            # The client must start over with initialize
+            return make_response(
+                jsonrpc_error_response(None, INVALID_REQUEST, "Unknown or expired session"), 404
+            )
+
+    headers: Dict[str, str] = {}
+    if isinstance(body, list):
+        run = partial(handle_jsonrpc_batch, body)
+        streams = any(is_tool_call(entry) for entry in body)
+    elif isinstance(body, dict):
+        logging.debug("MCP request body: %s", body)
+        if body.get("method") == "initialize" and current_session() is None:
+            g.mcp_session = sessions.create(get_user_id_for_request())
+            headers[SESSION_HEADER] = g.mcp_session.session_id
+        run = partial(handle_jsonrpc, body)
+        streams = is_tool_call(body)
+    else:
         return jsonrpc_error_response(
-            None, INVALID_REQUEST, "Request body must be an object"
+            None, INVALID_REQUEST, "Request body must be an object or an array"
         )
 
-    logging.debug("MCP request body: %s", body)
-
-    method = body.get("method")
-    _id = body.get("id", None)
-    params = body.get("params") or {}
-
-    # Notifications (no id) – just swallow and 204
-    if _id is None and isinstance(method, str) and method.startswith(
-        "notifications/"
-    ):
-        logging.debug("Received notification: %s", method)
-        return ("", 204)
-
-    if method is None:
-        return jsonrpc_error_response(_id, INVALID_REQUEST, "Missing 'method' field")
-
-    # Route MCP methods
-    if method == "initialize":
-        return handle_initialize(_id, params)
-    if method == "tools/list":
-        return handle_tools_list(_id, params)
-    if method == "tools/call":
-        return handle_tools_call(_id, params)
-
-    logging.warning("Unknown MCP method: %s", method)
-    return jsonrpc_error_response(
-        _id, METHOD_NOT_FOUND, f"Unknown method: {method}"
-    )
+    if streams and accepts_event_stream():
+        return stream(run, headers)
+    return mcp_response(run(), headers)
 
 
 # -----------------------------------------------------------------------------
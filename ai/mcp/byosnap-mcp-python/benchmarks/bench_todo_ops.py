@@ -0,0 +1,195 @@
+'''
+Benchmark: latency of one todo change as the list grows.
+
+Starts a local stub Storage Snap, seeds a user with --tasks todos and times,
+through the SDK:
+  1. `blob`: the old whole-blob read-modify-write. `storage_get_blob`, parse,
+     change one task, `storage_replace_blob` of the whole list.
+  2. `subdoc`: `todo_store`. An add is one `storage_append_arr_sub_document`,
+     and a complete is `storage_get_sub_document` + `storage_upsert_sub_document`
+     of one task.
+  3. `cached`: `todo_cache`, as the app uses it. Ops change memory only, and
+     the burst is written by one append and one upsert when it is flushed.
+With sub-documents the per-op time stays flat as the list grows, while the
+whole-blob path grows with the size of the list. `writes` counts the Storage
+writes each path made for its --ops adds and --ops completes.
+
+Usage (from ai/mcp/byosnap-mcp-python):
+    python benchmarks/bench_todo_ops.py --tasks 10,100,1000,5000 --ops 50
+'''
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+BLOB_PATH = re.compile(r'^/v1/storage/owner/([^/]+)/[^/]+/blobs/[^/]+$')
+JSON_BLOB_PATH = re.compile(
+    r'^/v1/storage/owner/([^/]+)/[^/]+/json-blobs/[^/:]+(/sub-documents(?::append)?)?(?:/(.+))?$')
+TASK_PATH = re.compile(r'^tasks\[(\d+)\]$')
+
+
+class StubStorageHandler(BaseHTTPRequestHandler):
+    '''
+    Keep-alive Storage stub with plain blobs and the `tasks` sub-documents of
+    JSON blobs. JSON blobs are kept parsed, so a sub-document change costs the
+    stub the same whatever the size of the list.
+    '''
+    protocol_version = 'HTTP/1.1'
+    # Small responses would otherwise wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _send(self, status, obj):
+        data = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        path = urlparse(self.path).path
+        store = self.server.store
+        if method == 'PUT':
+            self.server.writes += 1
+        match = BLOB_PATH.match(path)
+        if match:
+            owner = unquote(match.group(1))
+            if method == 'GET':
+                return self._send(200, {'cas': '1', 'value': store['blobs'][owner]})
+            store['blobs'][owner] = body['value']
+            return self._send(200, {'cas': '2'})
+        match = JSON_BLOB_PATH.match(path)
+        if not match:
+            return self._send(404, {'message': 'not found'})
+        owner, sub, sub_path = unquote(match.group(1)), match.group(2), match.group(3)
+        with self.server.lock:
+            doc = store['json_blobs'][owner]
+            if sub is None:
+                return self._send(200, {'cas': '1', 'value': doc})
+            if method == 'GET':
+                task = TASK_PATH.match(unquote(sub_path))
+                return self._send(200, {'value': doc['tasks'][int(task.group(1))]})
+            for fragment in body['updates']:
+                if sub.endswith(':append'):
+                    doc['tasks'].append(fragment['value'])
+                else:
+                    task = TASK_PATH.match(fragment['path'])
+                    doc['tasks'][int(task.group(1))] = fragment['value']
+        return self._send(200, {'cas': '2'})
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubStorageHandler)
+    server.daemon_threads = True
+    server.store = {'blobs': {}, 'json_blobs': {}}
+    server.writes = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def new_task(i):
+    return {"id": str(uuid.uuid4()), "title": "todo number %d" % i, "completed": False}
+
+
+def blob_add(api, user_id, title):
+    response = api.storage_get_blob(owner_id=user_id, access_type='protected',
+                                    blob_key='todos', gateway='internal')
+    tasks = json.loads(response.value)['tasks']
+    tasks.append({"id": str(uuid.uuid4()), "title": title, "completed": False})
+    api.storage_replace_blob(owner_id=user_id, access_type='protected', blob_key='todos',
+                             gateway='internal', body={
+                                 "value": json.dumps({"tasks": tasks}), "ttl": 0,
+                                 "create": True, "cas": response.cas})
+
+
+def blob_complete(api, user_id, task_id):
+    response = api.storage_get_blob(owner_id=user_id, access_type='protected',
+                                    blob_key='todos', gateway='internal')
+    tasks = json.loads(response.value)['tasks']
+    for task in tasks:
+        if task['id'] == task_id:
+            task['completed'] = True
+    api.storage_replace_blob(owner_id=user_id, access_type='protected', blob_key='todos',
+                             gateway='internal', body={
+                                 "value": json.dumps({"tasks": tasks}), "ttl": 0,
+                                 "create": True, "cas": response.cas})
+
+
+def per_op_ms(fn, args_list):
+    times = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', default='10,100,1000,5000')
+    parser.add_argument('--ops', type=int, default=50)
+    args = parser.parse_args()
+
+    server = start_stub()
+    os.environ['SNAPEND_STORAGE_HTTP_URL'] = 'http://127.0.0.1:%d' % server.server_address[1]
+    os.environ.setdefault('TODO_WRITE_BEHIND_DELAY_SECONDS', '60')
+    import snapser_clients
+    from todo_cache import todo_cache
+    from todo_store import todos
+    api = snapser_clients.storage_api()
+
+    def row(size, path, add, complete, ops, done, flush=None):
+        writes = server.writes
+        add_ms, complete_ms = per_op_ms(add, ops), per_op_ms(complete, done)
+        if flush is not None:
+            flush()
+        print(f"{size:>7} {path:<7} {add_ms:>8.2f} {complete_ms:>12.2f} "
+              f"{server.writes - writes:>7}")
+
+    print(f"{'tasks':>7} {'path':<7} {'add_ms':>8} {'complete_ms':>12} {'writes':>7}")
+    for size in [int(n) for n in args.tasks.split(',')]:
+        user_id = 'bench-%d' % size
+        tasks = [new_task(i) for i in range(size)]
+        targets = [t['id'] for t in tasks[:: max(1, size // args.ops)]][:args.ops]
+        server.store['blobs'][user_id] = json.dumps({"tasks": tasks})
+        server.store['json_blobs'][user_id] = {"tasks": [dict(t) for t in tasks]}
+        # Learn the positions once, as the first list_todos of a session does
+        todos.read(user_id)
+
+        ops = [(user_id, 'new todo %d' % i) for i in range(args.ops)]
+        done = [(user_id, task_id) for task_id in targets]
+        row(size, 'blob', lambda *a: blob_add(api, *a), lambda *a: blob_complete(api, *a),
+            ops, done)
+        row(size, 'subdoc', todos.add, todos.complete, ops, done)
+        # Tasks not completed yet, so the completes are not no-ops
+        done = [(user_id, t['id']) for t in todo_cache.read(user_id).tasks
+                if not t['completed']][:args.ops]
+        row(size, 'cached', todo_cache.add, todo_cache.complete, ops, done,
+            flush=lambda: todo_cache.flush(user_id))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+'''
+Concurrent execution of JSON-RPC 2.0 batch requests.
+
+A batch is an array of JSON-RPC requests sent in one HTTP request. The reply is
+one array, with the response of every request that has an id, in request
+order. Calls run concurrently on a bounded pool, except where order matters:
+calls on the same todo store (the same key from `order_key`) keep their batch
+order. A write waits for every earlier call with its key. A read only waits for
+earlier writes, so reads in a row run together.
+
+The batch runs in waves. A call goes in the wave after the last call it has to
+wait for, the calls of a wave run at once, and the next wave starts when they
+are done. Pool threads never wait on each other, so a full pool cannot
+deadlock.
+
+Tuning (environment variables):
+  - MCP_BATCH_MAX_CALLS: most calls accepted in one batch (default 50)
+  - MCP_BATCH_MAX_WORKERS: calls run at once per worker process (default 8)
+'''
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Constants
+MCP_BATCH_MAX_CALLS = int(os.getenv('MCP_BATCH_MAX_CALLS', '50'))
+MCP_BATCH_MAX_WORKERS = int(os.getenv('MCP_BATCH_MAX_WORKERS', '8'))
+
+# (key, writes) for calls that must keep their order, None for the others
+OrderKey = Optional[Tuple[str, bool]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    '''
+    Lazily create the pool for batch calls, once per worker process.
+    '''
+    global _executor, _executor_lock, _owner_pid
+    if _owner_pid != os.getpid():
+        # Forked: the parent's pool threads do not exist in this process
+        _executor = None
+        _executor_lock = threading.Lock()
+        _owner_pid = os.getpid()
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MCP_BATCH_MAX_WORKERS, thread_name_prefix='jsonrpc-batch')
+    return _executor
+
+
+def plan_waves(order_keys: List[OrderKey]) -> List[List[int]]:
+    '''
+    Group call indexes into waves that can each run concurrently.
+    '''
+    # key -> wave of the last write, and of the last call of any kind
+    last_write: Dict[str, int] = {}
+    last_call: Dict[str, int] = {}
+    waves: List[List[int]] = []
+    for index, order_key in enumerate(order_keys):
+        if order_key is None:
+            wave = 0
+        else:
+            key, writes = order_key
+            wave = (last_call if writes else last_write).get(key, -1) + 1
+            if writes:
+                last_write[key] = wave
+            last_call[key] = max(last_call.get(key, -1), wave)
+        while len(waves) <= wave:
+            waves.append([])
+        waves[wave].append(index)
+    return waves
+
+
+def run_batch(calls: List[Any], dispatch: Callable[[Any], Optional[dict]],
+              order_key: Callable[[Any], OrderKey]) -> List[Optional[dict]]:
+    '''
+    Return `dispatch(call)` for every call, in batch order. `dispatch` must
+    not raise.
+    '''
+    results: List[Optional[dict]] = [None] * len(calls)
+    for wave in plan_waves([order_key(call) for call in calls]):
+        if len(wave) == 1:
+            results[wave[0]] = dispatch(calls[wave[0]])
+            continue
+        # Each call runs with a copy of the request's context, so it keeps
+        # the Flask request and the request deadline
+        futures = [(index, _get_executor().submit(contextvars.copy_context().run,
+                                                  dispatch, calls[index]))
+                   for index in wave]
+        for index, future in futures:
+            results[index] = future.result()
+    return results
@@ -0,0 +1,134 @@
+'''
+MCP sessions for the streamable HTTP transport.
+
+A session starts with `initialize`. The response carries an `Mcp-Session-Id`
+header, which the client sends back with every later request. The session
+keeps the user id that was resolved at `initialize`, so a tool call does not
+re-resolve the user on every POST. The user's todos are cached per user by
+`todo_cache`, which every session of that user shares.
+
+Gunicorn may route each POST of a session to a different worker, and workers
+share no memory. The session id therefore carries the user id and the time
+it was issued, signed with HMAC-SHA256. Any worker can check it and rebuild the
+session without a lookup.
+
+Requests without the header are served as before, for the user in `User-Id`.
+
+Tuning (environment variables):
+  - MCP_SESSION_SECRET: HMAC key for session ids (defaults to the MCP API
+    key). Must be the same in every worker and replica.
+  - MCP_SESSION_MAX_AGE_SECONDS: a session id is rejected after this long
+    (default 86400). The client then starts a new session.
+  - MCP_SESSION_CACHE_MAX_SESSIONS: sessions kept per worker (default 1024)
+'''
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+# Constants
+SESSION_HEADER = 'Mcp-Session-Id'
+MCP_SESSION_MAX_AGE_SECONDS = int(os.getenv('MCP_SESSION_MAX_AGE_SECONDS', '86400'))
+MCP_SESSION_CACHE_MAX_SESSIONS = int(os.getenv('MCP_SESSION_CACHE_MAX_SESSIONS', '1024'))
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class McpSession:
+    '''
+    What one worker knows about a session.
+    '''
+
+    def __init__(self, session_id: str, user_id: str, issued_at: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.issued_at = issued_at
+
+
+class SessionManager:
+    '''
+    Issues and checks session ids, and keeps a bounded LRU of sessions.
+    '''
+
+    def __init__(self, secret: str, max_sessions: int = MCP_SESSION_CACHE_MAX_SESSIONS):
+        self._secret = secret.encode('utf-8')
+        self.max_sessions = max_sessions
+        self._sessions: 'OrderedDict[str, McpSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'resumed': 0, 'rejected': 0}
+
+    def create(self, user_id: str) -> McpSession:
+        '''
+        Start a session for `user_id`.
+        '''
+        issued_at = int(time.time())
+        claims = '{0}.{1}.{2}'.format(_b64(user_id.encode('utf-8')),
+                                      issued_at, uuid.uuid4().hex)
+        session = McpSession(claims + '.' + self._sign(claims), user_id, issued_at)
+        with self._lock:
+            self._stats['created'] += 1
+            self._remember(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[McpSession]:
+        '''
+        Return the session, or None if the id is forged, malformed or expired.
+        '''
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+        if session is None:
+            session = self._verify(session_id)
+        elif time.time() - session.issued_at > MCP_SESSION_MAX_AGE_SECONDS:
+            session = None
+        with self._lock:
+            if session is None:
+                self._stats['rejected'] += 1
+                self._sessions.pop(session_id, None)
+            elif session_id not in self._sessions:
+                # Started by another worker
+                self._stats['resumed'] += 1
+                self._remember(session)
+        return session
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters for /metrics.
+        '''
+        with self._lock:
+            return dict(self._stats, sessions=len(self._sessions))
+
+    def _sign(self, claims: str) -> str:
+        return _b64(hmac.new(self._secret, claims.encode('utf-8'), hashlib.sha256).digest())
+
+    def _verify(self, session_id: str) -> Optional[McpSession]:
+        claims, _, signature = session_id.rpartition('.')
+        if not claims or not hmac.compare_digest(signature.encode('utf-8'),
+                                                 self._sign(claims).encode('ascii')):
+            return None
+        try:
+            user_id, issued_at, _nonce = claims.split('.')
+            if time.time() - int(issued_at) > MCP_SESSION_MAX_AGE_SECONDS:
+                return None
+            return McpSession(session_id, _unb64(user_id).decode('utf-8'), int(issued_at))
+        except ValueError:
+            return None
+
+    def _remember(self, session: McpSession):
+        # Called with self._lock held
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
@@ -0,0 +1,157 @@
+'''
+Server-Sent Events responses for the MCP streamable HTTP transport.
+
+A client that lists `text/event-stream` in its Accept header may get the answer
+to a POST as an SSE stream instead of one JSON body. The stream carries
+`notifications/progress` messages while the call runs, then the JSON-RPC
+response, and then it closes.
+
+Tool code reports progress with `report_progress(progress, total, message)`.
+It only sends something when the call is streamed and the request asked for
+progress with `params._meta.progressToken`. Otherwise it does nothing, so tools
+can call it unconditionally.
+
+The call runs on a pool thread in a copy of the request's context, so it keeps
+the Flask request and the request deadline, while the request thread writes the
+stream. Under gunicorn sync workers the worker is busy until the stream ends,
+as it is for a plain response.
+
+Tuning (environment variables):
+  - MCP_STREAM_MAX_WORKERS: streamed calls run at once per worker process (default 8)
+  - MCP_STREAM_KEEPALIVE_SECONDS: interval of the SSE comments sent while a
+    call is quiet, so proxies keep the stream open (default 15)
+'''
+import contextvars
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from flask import Response, current_app, request, stream_with_context
+
+
+# Constants
+EVENT_STREAM_MIMETYPE = 'text/event-stream'
+MCP_STREAM_MAX_WORKERS = int(os.getenv('MCP_STREAM_MAX_WORKERS', '8'))
+MCP_STREAM_KEEPALIVE_SECONDS = float(os.getenv('MCP_STREAM_KEEPALIVE_SECONDS', '15'))
+
+# Where notifications of the current streamed call go
+_sink: contextvars.ContextVar = contextvars.ContextVar('mcp_stream_sink', default=None)
+# Progress token of the JSON-RPC request being handled
+_progress_token: contextvars.ContextVar = contextvars.ContextVar(
+    'mcp_progress_token', default=None)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+class _Done:
+    '''
+    Queued after the call: the payload to send last.
+    '''
+    __slots__ = ('payload',)
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    '''
+    Lazily create the pool for streamed calls, once per worker process.
+    '''
+    global _executor, _executor_lock, _owner_pid
+    if _owner_pid != os.getpid():
+        # Forked: the parent's pool threads do not exist in this process
+        _executor = None
+        _executor_lock = threading.Lock()
+        _owner_pid = os.getpid()
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MCP_STREAM_MAX_WORKERS, thread_name_prefix='mcp-stream')
+    return _executor
+
+
+def accepts_event_stream() -> bool:
+    '''
+    Whether the client of the current request can read an SSE response.
+    '''
+    return EVENT_STREAM_MIMETYPE in request.headers.get('Accept', '')
+
+
+@contextmanager
+def progress_token(token: Any):
+    '''
+    Send the progress reported inside the block under `token`.
+    '''
+    reset = _progress_token.set(token)
+    try:
+        yield
+    finally:
+        _progress_token.reset(reset)
+
+
+def report_progress(progress: float, total: Optional[float] = None,
+                    message: Optional[str] = None):
+    '''
+    Send a `notifications/progress` message on the current stream, if any.
+    '''
+    send = _sink.get()
+    token = _progress_token.get()
+    if send is None or token is None:
+        return
+    params: Dict[str, Any] = {'progressToken': token, 'progress': progress}
+    if total is not None:
+        params['total'] = total
+    if message is not None:
+        params['message'] = message
+    send({'jsonrpc': '2.0', 'method': 'notifications/progress', 'params': params})
+
+
+def _event(payload: Any) -> str:
+    return 'event: message\ndata: ' + current_app.json.dumps(payload) + '\n\n'
+
+
+def stream(run: Callable[[], Any], headers: Optional[Dict[str, str]] = None) -> Response:
+    '''
+    Respond with an SSE stream of the progress `run()` reports, followed by
+    what it returns (skipped when None).
+    '''
+    events: 'queue.Queue' = queue.Queue()
+
+    def call():
+        _sink.set(events.put)
+        try:
+            payload = run()
+        except Exception:  # defensive
+            logging.exception("Streamed MCP call failed")
+            payload = None
+        events.put(_Done(payload))
+
+    _get_executor().submit(contextvars.copy_context().run, call)
+
+    def generate():
+        while True:
+            try:
+                item = events.get(timeout=MCP_STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if isinstance(item, _Done):
+                if item.payload is not None:
+                    yield _event(item.payload)
+                return
+            yield _event(item)
+
+    response = Response(stream_with_context(generate()), mimetype=EVENT_STREAM_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the events
+    response.headers['X-Accel-Buffering'] = 'no'
+    if headers:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,169 @@
+'''
+Prometheus metrics, served at /metrics.
+
+Like /healthz, /metrics is a root-level path without the BYOSnap prefix. It
+exports:
+  - byosnap_http_request_duration_seconds{route, method, status}: inbound
+    request latency, measured from before_request to after_request
+  - byosnap_http_request_bytes_total / byosnap_http_response_bytes_total{route}
+  - byosnap_snap_operation_duration_seconds{operation, status}: every
+    `snapser_internal` API call, e.g. operation="storage_get_blob", including
+    retries and response decoding. status is 'error' when no response came back
+  - byosnap_snap_connections_total{host, reused}: request attempts that reused a
+    pooled keep-alive connection ("true") or opened a new one ("false")
+  - byosnap_snap_bytes_sent_total / byosnap_snap_bytes_received_total{host}
+  - byosnap_snap_breaker_state{host, state}: 1 for the current circuit breaker
+    state of each Snap host (worst state across workers)
+  - byosnap_component_stat{component, stat}: the in-process counters of the
+    helpers passed to `register_stats`, such as the settings cache, the retry
+    budget and the deadline-exceeded counts, summed across workers
+
+Under gunicorn every worker has its own memory. When PROMETHEUS_MULTIPROC_DIR
+is set (gunicorn.conf.py sets it), each worker writes its samples to files in
+that directory, and a scrape served by any worker merges all of them. Without
+it, e.g. under `flask run`, the metrics of the serving process are exported.
+
+Tuning (environment variables):
+  - PROMETHEUS_MULTIPROC_DIR: directory shared by the gunicorn workers
+  - METRICS_STATS_INTERVAL_SECONDS: how often a worker republishes the
+    component stats and breaker states (default 5)
+'''
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from flask import Flask, Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest, multiprocess)
+
+from snapser_internal import instrumentation, resilience
+import request_deadlines
+
+
+# Constants
+METRICS_PATH = '/metrics'
+METRICS_STATS_INTERVAL_SECONDS = float(os.getenv('METRICS_STATS_INTERVAL_SECONDS', '5'))
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+BREAKER_STATES = (resilience.CLOSED, resilience.HALF_OPEN, resilience.OPEN)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'byosnap_http_request_duration_seconds', 'Inbound request latency',
+    ['route', 'method', 'status'], buckets=LATENCY_BUCKETS)
+HTTP_REQUEST_BYTES = Counter(
+    'byosnap_http_request_bytes', 'Inbound request body bytes', ['route'])
+HTTP_RESPONSE_BYTES = Counter(
+    'byosnap_http_response_bytes', 'Response body bytes', ['route'])
+SNAP_OPERATION_DURATION = Histogram(
+    'byosnap_snap_operation_duration_seconds', 'Snap SDK call latency',
+    ['operation', 'status'], buckets=LATENCY_BUCKETS)
+SNAP_CONNECTIONS = Counter(
+    'byosnap_snap_connections', 'Snap request attempts by connection reuse',
+    ['host', 'reused'])
+SNAP_BYTES_SENT = Counter(
+    'byosnap_snap_bytes_sent', 'Bytes sent to Snaps', ['host'])
+SNAP_BYTES_RECEIVED = Counter(
+    'byosnap_snap_bytes_received', 'Bytes received from Snaps', ['host'])
+SNAP_BREAKER_STATE = Gauge(
+    'byosnap_snap_breaker_state', 'Circuit breaker state per Snap host',
+    ['host', 'state'], multiprocess_mode='livemax')
+COMPONENT_STAT = Gauge(
+    'byosnap_component_stat', 'In-process counters of the BYOSnap helpers',
+    ['component', 'stat'], multiprocess_mode='livesum')
+
+_stats_sources: List[Tuple[str, Callable[[], Dict[str, int]]]] = []
+_stats_lock = threading.Lock()
+_stats_published_at = 0.0
+
+
+class _SnapObserver(instrumentation.Observer):
+    '''
+    Records the SDK's Snap calls.
+    '''
+
+    def operation(self, operation_id, status, seconds):
+        SNAP_OPERATION_DURATION.labels(operation_id, status).observe(seconds)
+
+    def connection(self, host, reused):
+        SNAP_CONNECTIONS.labels(host, 'true' if reused else 'false').inc()
+
+    def transfer(self, host, bytes_sent, bytes_received):
+        if bytes_sent:
+            SNAP_BYTES_SENT.labels(host).inc(bytes_sent)
+        if bytes_received:
+            SNAP_BYTES_RECEIVED.labels(host).inc(bytes_received)
+
+
+def register_stats(component: str, stats: Callable[[], Dict[str, int]]):
+    '''
+    Export `stats()` (a dict of numbers) as byosnap_component_stat gauges.
+    '''
+    _stats_sources.append((component, stats))
+
+
+def _publish_stats(force: bool = False):
+    '''
+    Copy the component stats and breaker states of this worker into gauges.
+    '''
+    global _stats_published_at
+    now = time.monotonic()
+    if not force and now - _stats_published_at < METRICS_STATS_INTERVAL_SECONDS:
+        return
+    with _stats_lock:
+        _stats_published_at = now
+        for component, stats in _stats_sources:
+            for stat, value in stats().items():
+                COMPONENT_STAT.labels(component, stat).set(value)
+        for host, breaker in resilience.breaker_states().items():
+            for state in BREAKER_STATES:
+                SNAP_BREAKER_STATE.labels(host, state).set(
+                    1 if breaker['state'] == state else 0)
+
+
+def _route() -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        route = _route()
+        HTTP_REQUEST_DURATION.labels(route, request.method, str(response.status_code)) \
+            .observe(time.perf_counter() - started)
+        if request.content_length:
+            HTTP_REQUEST_BYTES.labels(route).inc(request.content_length)
+        # Streamed responses have no length until they are sent
+        if response.content_length:
+            HTTP_RESPONSE_BYTES.labels(route).inc(response.content_length)
+    _publish_stats()
+    return response
+
+
+def _metrics():
+    _publish_stats(force=True)
+    if MULTIPROCESS:
+        # Built per scrape, as the files of new workers may have appeared
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        data = generate_latest(registry)
+    else:
+        data = generate_latest()
+    return Response(data, mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app: Flask):
+    '''
+    Register the request hooks, the SDK observer and the /metrics endpoint.
+    '''
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule(METRICS_PATH, 'metrics', _metrics, methods=['GET'])
+    instrumentation.add_observer(_SnapObserver())
+    register_stats('snap_retries', resilience.retry_stats)
+    register_stats('deadline_exceeded', request_deadlines.stats)
@@ -155,6 +155,31 @@ class ServiceException(ApiException):
         super(ServiceException, self).__init__(status, reason, http_resp)
 
 
+class CircuitOpenException(ServiceException):
+    """The circuit breaker for the host is open; the request was not sent."""
+
+    def __init__(self, host) -> None:
+        super(CircuitOpenException, self).__init__(
+            status=503, reason="Circuit breaker open for {0}".format(host))
+        self.host = host
+
+
+class DeadlineExceededException(OpenApiException):
+    """The deadline of the current request has passed; the call was stopped.
+
+    Not an ApiException, so handlers that catch ApiException and carry on
+    with default data let it through to the 504 error handler.
+    """
+
+    def __init__(self, reason="Deadline exceeded") -> None:
+        super(DeadlineExceededException, self).__init__(reason)
+        self.status = 504
+        self.reason = reason
+
+    def __str__(self):
+        return "({0})\nReason: {1}\n".format(self.status, self.reason)
+
+
 def render_path(path_to_item):
     """Returns a string representation of a path"""
     result = ""
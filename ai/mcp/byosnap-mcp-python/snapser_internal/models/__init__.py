@@ -12,158 +12,177 @@
     Do not edit the class manually.
 """  # noqa: E501
 
+import importlib
 
-# import models into model package
-from snapser_internal.models.api_http_body import ApiHttpBody
-from snapser_internal.models.append_arr_sub_document_request import AppendArrSubDocumentRequest
-from snapser_internal.models.auth_anon_login_request import AuthAnonLoginRequest
-from snapser_internal.models.auth_anon_login_response import AuthAnonLoginResponse
-from snapser_internal.models.auth_apple_login_request import AuthAppleLoginRequest
-from snapser_internal.models.auth_apple_login_response import AuthAppleLoginResponse
-from snapser_internal.models.auth_associate_logins_request import AuthAssociateLoginsRequest
-from snapser_internal.models.auth_discord_login_request import AuthDiscordLoginRequest
-from snapser_internal.models.auth_discord_login_response import AuthDiscordLoginResponse
-from snapser_internal.models.auth_email_login_request import AuthEmailLoginRequest
-from snapser_internal.models.auth_email_login_response import AuthEmailLoginResponse
-from snapser_internal.models.auth_email_password_login_request import AuthEmailPasswordLoginRequest
-from snapser_internal.models.auth_email_password_login_response import AuthEmailPasswordLoginResponse
-from snapser_internal.models.auth_epic_login_request import AuthEpicLoginRequest
-from snapser_internal.models.auth_epic_login_response import AuthEpicLoginResponse
-from snapser_internal.models.auth_facebook_login_request import AuthFacebookLoginRequest
-from snapser_internal.models.auth_facebook_login_response import AuthFacebookLoginResponse
-from snapser_internal.models.auth_get_user_ids_by_login_ids_response import AuthGetUserIdsByLoginIdsResponse
-from snapser_internal.models.auth_get_username_availability_response import AuthGetUsernameAvailabilityResponse
-from snapser_internal.models.auth_google_login_request import AuthGoogleLoginRequest
-from snapser_internal.models.auth_google_login_response import AuthGoogleLoginResponse
-from snapser_internal.models.auth_login_id import AuthLoginId
-from snapser_internal.models.auth_login_metadata import AuthLoginMetadata
-from snapser_internal.models.auth_login_type_type import AuthLoginTypeType
-from snapser_internal.models.auth_otp_request import AuthOtpRequest
-from snapser_internal.models.auth_recover_email_account_request import AuthRecoverEmailAccountRequest
-from snapser_internal.models.auth_refresh_request import AuthRefreshRequest
-from snapser_internal.models.auth_refresh_response import AuthRefreshResponse
-from snapser_internal.models.auth_steam_login_request import AuthSteamLoginRequest
-from snapser_internal.models.auth_steam_login_response import AuthSteamLoginResponse
-from snapser_internal.models.auth_steam_open_id_login_request import AuthSteamOpenIdLoginRequest
-from snapser_internal.models.auth_steam_session_ticket_login_request import AuthSteamSessionTicketLoginRequest
-from snapser_internal.models.auth_suspend_user_response import AuthSuspendUserResponse
-from snapser_internal.models.auth_update_email_password_request import AuthUpdateEmailPasswordRequest
-from snapser_internal.models.auth_update_username_password_request import AuthUpdateUsernamePasswordRequest
-from snapser_internal.models.auth_user import AuthUser
-from snapser_internal.models.auth_username_password_login_request import AuthUsernamePasswordLoginRequest
-from snapser_internal.models.auth_username_password_login_response import AuthUsernamePasswordLoginResponse
-from snapser_internal.models.auth_validate_request import AuthValidateRequest
-from snapser_internal.models.auth_validate_response import AuthValidateResponse
-from snapser_internal.models.auth_verify_email_request import AuthVerifyEmailRequest
-from snapser_internal.models.auth_verify_email_response import AuthVerifyEmailResponse
-from snapser_internal.models.auth_x_login_request import AuthXLoginRequest
-from snapser_internal.models.auth_x_login_response import AuthXLoginResponse
-from snapser_internal.models.auth_xbox_login_request import AuthXboxLoginRequest
-from snapser_internal.models.auth_xbox_login_response import AuthXboxLoginResponse
-from snapser_internal.models.byosnap_mcp_handle_mcp200_response import ByosnapMcpHandleMcp200Response
-from snapser_internal.models.disassociate_login_request import DisassociateLoginRequest
-from snapser_internal.models.error_response import ErrorResponse
-from snapser_internal.models.increment_counter_request import IncrementCounterRequest
-from snapser_internal.models.insert_blob_request import InsertBlobRequest
-from snapser_internal.models.insert_json_blob_request import InsertJsonBlobRequest
-from snapser_internal.models.json_rpc_error import JsonRpcError
-from snapser_internal.models.json_rpc_error_response import JsonRpcErrorResponse
-from snapser_internal.models.json_rpc_id import JsonRpcId
-from snapser_internal.models.json_rpc_request import JsonRpcRequest
-from snapser_internal.models.json_rpc_success_response import JsonRpcSuccessResponse
-from snapser_internal.models.prepend_arr_sub_document_request import PrependArrSubDocumentRequest
-from snapser_internal.models.protobuf_any import ProtobufAny
-from snapser_internal.models.protobuf_null_value import ProtobufNullValue
-from snapser_internal.models.replace_blob_request import ReplaceBlobRequest
-from snapser_internal.models.replace_json_blob_request import ReplaceJsonBlobRequest
-from snapser_internal.models.storage_append_arr_sub_document_request import StorageAppendArrSubDocumentRequest
-from snapser_internal.models.storage_append_arr_sub_document_response import StorageAppendArrSubDocumentResponse
-from snapser_internal.models.storage_append_blob_and_owner import StorageAppendBlobAndOwner
-from snapser_internal.models.storage_batch_append_arr_sub_document_single_response import StorageBatchAppendArrSubDocumentSingleResponse
-from snapser_internal.models.storage_batch_append_arr_sub_documents_request import StorageBatchAppendArrSubDocumentsRequest
-from snapser_internal.models.storage_batch_append_arr_sub_documents_response import StorageBatchAppendArrSubDocumentsResponse
-from snapser_internal.models.storage_batch_delete_json_blobs_request import StorageBatchDeleteJsonBlobsRequest
-from snapser_internal.models.storage_batch_delete_json_blobs_response import StorageBatchDeleteJsonBlobsResponse
-from snapser_internal.models.storage_batch_delete_json_blobs_single_response import StorageBatchDeleteJsonBlobsSingleResponse
-from snapser_internal.models.storage_batch_delete_sub_document_single_response import StorageBatchDeleteSubDocumentSingleResponse
-from snapser_internal.models.storage_batch_delete_sub_documents_request import StorageBatchDeleteSubDocumentsRequest
-from snapser_internal.models.storage_batch_delete_sub_documents_response import StorageBatchDeleteSubDocumentsResponse
-from snapser_internal.models.storage_batch_get_append_blobs_response import StorageBatchGetAppendBlobsResponse
-from snapser_internal.models.storage_batch_get_append_blobs_single_response import StorageBatchGetAppendBlobsSingleResponse
-from snapser_internal.models.storage_batch_get_blobs_response import StorageBatchGetBlobsResponse
-from snapser_internal.models.storage_batch_get_blobs_single_response import StorageBatchGetBlobsSingleResponse
-from snapser_internal.models.storage_batch_get_counters_response import StorageBatchGetCountersResponse
-from snapser_internal.models.storage_batch_get_counters_single_response import StorageBatchGetCountersSingleResponse
-from snapser_internal.models.storage_batch_get_json_blobs_request import StorageBatchGetJsonBlobsRequest
-from snapser_internal.models.storage_batch_get_json_blobs_response import StorageBatchGetJsonBlobsResponse
-from snapser_internal.models.storage_batch_get_json_blobs_single_response import StorageBatchGetJsonBlobsSingleResponse
-from snapser_internal.models.storage_batch_get_sub_documents_request import StorageBatchGetSubDocumentsRequest
-from snapser_internal.models.storage_batch_get_sub_documents_response import StorageBatchGetSubDocumentsResponse
-from snapser_internal.models.storage_batch_get_sub_documents_single_response import StorageBatchGetSubDocumentsSingleResponse
-from snapser_internal.models.storage_batch_increment_counter_request import StorageBatchIncrementCounterRequest
-from snapser_internal.models.storage_batch_increment_counter_response import StorageBatchIncrementCounterResponse
-from snapser_internal.models.storage_batch_insert_blob_request import StorageBatchInsertBlobRequest
-from snapser_internal.models.storage_batch_insert_blob_response import StorageBatchInsertBlobResponse
-from snapser_internal.models.storage_batch_insert_json_blob_single_response import StorageBatchInsertJsonBlobSingleResponse
-from snapser_internal.models.storage_batch_insert_json_blobs_request import StorageBatchInsertJsonBlobsRequest
-from snapser_internal.models.storage_batch_insert_json_blobs_response import StorageBatchInsertJsonBlobsResponse
-from snapser_internal.models.storage_batch_prepend_arr_sub_document_single_response import StorageBatchPrependArrSubDocumentSingleResponse
-from snapser_internal.models.storage_batch_prepend_arr_sub_documents_request import StorageBatchPrependArrSubDocumentsRequest
-from snapser_internal.models.storage_batch_prepend_arr_sub_documents_response import StorageBatchPrependArrSubDocumentsResponse
-from snapser_internal.models.storage_batch_replace_blob_request import StorageBatchReplaceBlobRequest
-from snapser_internal.models.storage_batch_replace_blob_response import StorageBatchReplaceBlobResponse
-from snapser_internal.models.storage_batch_replace_json_blob_single_response import StorageBatchReplaceJsonBlobSingleResponse
-from snapser_internal.models.storage_batch_replace_json_blobs_request import StorageBatchReplaceJsonBlobsRequest
-from snapser_internal.models.storage_batch_replace_json_blobs_response import StorageBatchReplaceJsonBlobsResponse
-from snapser_internal.models.storage_batch_single_blob_response import StorageBatchSingleBlobResponse
-from snapser_internal.models.storage_batch_single_increment_counter_response import StorageBatchSingleIncrementCounterResponse
-from snapser_internal.models.storage_batch_single_replace_blob_response import StorageBatchSingleReplaceBlobResponse
-from snapser_internal.models.storage_batch_single_update_append_blob_response import StorageBatchSingleUpdateAppendBlobResponse
-from snapser_internal.models.storage_batch_update_append_blob_request import StorageBatchUpdateAppendBlobRequest
-from snapser_internal.models.storage_batch_update_append_blob_response import StorageBatchUpdateAppendBlobResponse
-from snapser_internal.models.storage_batch_upsert_sub_document_single_response import StorageBatchUpsertSubDocumentSingleResponse
-from snapser_internal.models.storage_batch_upsert_sub_documents_request import StorageBatchUpsertSubDocumentsRequest
-from snapser_internal.models.storage_batch_upsert_sub_documents_response import StorageBatchUpsertSubDocumentsResponse
-from snapser_internal.models.storage_blob_and_owner import StorageBlobAndOwner
-from snapser_internal.models.storage_counter_and_owner import StorageCounterAndOwner
-from snapser_internal.models.storage_delete_append_blob_response import StorageDeleteAppendBlobResponse
-from snapser_internal.models.storage_delete_blob_response import StorageDeleteBlobResponse
-from snapser_internal.models.storage_delete_json_blob_request import StorageDeleteJsonBlobRequest
-from snapser_internal.models.storage_delete_json_blob_response import StorageDeleteJsonBlobResponse
-from snapser_internal.models.storage_delete_sub_document_request import StorageDeleteSubDocumentRequest
-from snapser_internal.models.storage_delete_sub_document_response import StorageDeleteSubDocumentResponse
-from snapser_internal.models.storage_get_append_blob_request import StorageGetAppendBlobRequest
-from snapser_internal.models.storage_get_append_blob_response import StorageGetAppendBlobResponse
-from snapser_internal.models.storage_get_blob_request import StorageGetBlobRequest
-from snapser_internal.models.storage_get_blob_response import StorageGetBlobResponse
-from snapser_internal.models.storage_get_cas_response import StorageGetCasResponse
-from snapser_internal.models.storage_get_counter_request import StorageGetCounterRequest
-from snapser_internal.models.storage_get_counter_response import StorageGetCounterResponse
-from snapser_internal.models.storage_get_json_blob_request import StorageGetJsonBlobRequest
-from snapser_internal.models.storage_get_json_blob_response import StorageGetJsonBlobResponse
-from snapser_internal.models.storage_get_sub_document_request import StorageGetSubDocumentRequest
-from snapser_internal.models.storage_get_sub_document_response import StorageGetSubDocumentResponse
-from snapser_internal.models.storage_increment_counter_request import StorageIncrementCounterRequest
-from snapser_internal.models.storage_increment_counter_response import StorageIncrementCounterResponse
-from snapser_internal.models.storage_insert_blob_request import StorageInsertBlobRequest
-from snapser_internal.models.storage_insert_blob_response import StorageInsertBlobResponse
-from snapser_internal.models.storage_insert_json_blob_request import StorageInsertJsonBlobRequest
-from snapser_internal.models.storage_insert_json_blob_response import StorageInsertJsonBlobResponse
-from snapser_internal.models.storage_json_fragment import StorageJsonFragment
-from snapser_internal.models.storage_prepend_arr_sub_document_request import StoragePrependArrSubDocumentRequest
-from snapser_internal.models.storage_prepend_arr_sub_document_response import StoragePrependArrSubDocumentResponse
-from snapser_internal.models.storage_replace_blob_request import StorageReplaceBlobRequest
-from snapser_internal.models.storage_replace_blob_response import StorageReplaceBlobResponse
-from snapser_internal.models.storage_replace_json_blob_request import StorageReplaceJsonBlobRequest
-from snapser_internal.models.storage_replace_json_blob_response import StorageReplaceJsonBlobResponse
-from snapser_internal.models.storage_reset_counter_response import StorageResetCounterResponse
-from snapser_internal.models.storage_update_append_blob_request import StorageUpdateAppendBlobRequest
-from snapser_internal.models.storage_update_append_blob_response import StorageUpdateAppendBlobResponse
-from snapser_internal.models.storage_upsert_sub_document_request import StorageUpsertSubDocumentRequest
-from snapser_internal.models.storage_upsert_sub_document_response import StorageUpsertSubDocumentResponse
-from snapser_internal.models.storage_user_append_blob_response import StorageUserAppendBlobResponse
-from snapser_internal.models.storage_user_blob_response import StorageUserBlobResponse
-from snapser_internal.models.storage_user_counter_response import StorageUserCounterResponse
-from snapser_internal.models.suspend_user_request import SuspendUserRequest
-from snapser_internal.models.update_append_blob_request import UpdateAppendBlobRequest
-from snapser_internal.models.upsert_sub_document_request import UpsertSubDocumentRequest
+# Imported on first access by `__getattr__` below
+_LAZY_IMPORTS = {
+    # models
+    'ApiHttpBody': 'snapser_internal.models.api_http_body',
+    'AppendArrSubDocumentRequest': 'snapser_internal.models.append_arr_sub_document_request',
+    'AuthAnonLoginRequest': 'snapser_internal.models.auth_anon_login_request',
+    'AuthAnonLoginResponse': 'snapser_internal.models.auth_anon_login_response',
+    'AuthAppleLoginRequest': 'snapser_internal.models.auth_apple_login_request',
+    'AuthAppleLoginResponse': 'snapser_internal.models.auth_apple_login_response',
+    'AuthAssociateLoginsRequest': 'snapser_internal.models.auth_associate_logins_request',
+    'AuthDiscordLoginRequest': 'snapser_internal.models.auth_discord_login_request',
+    'AuthDiscordLoginResponse': 'snapser_internal.models.auth_discord_login_response',
+    'AuthEmailLoginRequest': 'snapser_internal.models.auth_email_login_request',
+    'AuthEmailLoginResponse': 'snapser_internal.models.auth_email_login_response',
+    'AuthEmailPasswordLoginRequest': 'snapser_internal.models.auth_email_password_login_request',
+    'AuthEmailPasswordLoginResponse': 'snapser_internal.models.auth_email_password_login_response',
+    'AuthEpicLoginRequest': 'snapser_internal.models.auth_epic_login_request',
+    'AuthEpicLoginResponse': 'snapser_internal.models.auth_epic_login_response',
+    'AuthFacebookLoginRequest': 'snapser_internal.models.auth_facebook_login_request',
+    'AuthFacebookLoginResponse': 'snapser_internal.models.auth_facebook_login_response',
+    'AuthGetUserIdsByLoginIdsResponse': 'snapser_internal.models.auth_get_user_ids_by_login_ids_response',
+    'AuthGetUsernameAvailabilityResponse': 'snapser_internal.models.auth_get_username_availability_response',
+    'AuthGoogleLoginRequest': 'snapser_internal.models.auth_google_login_request',
+    'AuthGoogleLoginResponse': 'snapser_internal.models.auth_google_login_response',
+    'AuthLoginId': 'snapser_internal.models.auth_login_id',
+    'AuthLoginMetadata': 'snapser_internal.models.auth_login_metadata',
+    'AuthLoginTypeType': 'snapser_internal.models.auth_login_type_type',
+    'AuthOtpRequest': 'snapser_internal.models.auth_otp_request',
+    'AuthRecoverEmailAccountRequest': 'snapser_internal.models.auth_recover_email_account_request',
+    'AuthRefreshRequest': 'snapser_internal.models.auth_refresh_request',
+    'AuthRefreshResponse': 'snapser_internal.models.auth_refresh_response',
+    'AuthSteamLoginRequest': 'snapser_internal.models.auth_steam_login_request',
+    'AuthSteamLoginResponse': 'snapser_internal.models.auth_steam_login_response',
+    'AuthSteamOpenIdLoginRequest': 'snapser_internal.models.auth_steam_open_id_login_request',
+    'AuthSteamSessionTicketLoginRequest': 'snapser_internal.models.auth_steam_session_ticket_login_request',
+    'AuthSuspendUserResponse': 'snapser_internal.models.auth_suspend_user_response',
+    'AuthUpdateEmailPasswordRequest': 'snapser_internal.models.auth_update_email_password_request',
+    'AuthUpdateUsernamePasswordRequest': 'snapser_internal.models.auth_update_username_password_request',
+    'AuthUser': 'snapser_internal.models.auth_user',
+    'AuthUsernamePasswordLoginRequest': 'snapser_internal.models.auth_username_password_login_request',
+    'AuthUsernamePasswordLoginResponse': 'snapser_internal.models.auth_username_password_login_response',
+    'AuthValidateRequest': 'snapser_internal.models.auth_validate_request',
+    'AuthValidateResponse': 'snapser_internal.models.auth_validate_response',
+    'AuthVerifyEmailRequest': 'snapser_internal.models.auth_verify_email_request',
+    'AuthVerifyEmailResponse': 'snapser_internal.models.auth_verify_email_response',
+    'AuthXLoginRequest': 'snapser_internal.models.auth_x_login_request',
+    'AuthXLoginResponse': 'snapser_internal.models.auth_x_login_response',
+    'AuthXboxLoginRequest': 'snapser_internal.models.auth_xbox_login_request',
+    'AuthXboxLoginResponse': 'snapser_internal.models.auth_xbox_login_response',
+    'ByosnapMcpHandleMcp200Response': 'snapser_internal.models.byosnap_mcp_handle_mcp200_response',
+    'DisassociateLoginRequest': 'snapser_internal.models.disassociate_login_request',
+    'ErrorResponse': 'snapser_internal.models.error_response',
+    'IncrementCounterRequest': 'snapser_internal.models.increment_counter_request',
+    'InsertBlobRequest': 'snapser_internal.models.insert_blob_request',
+    'InsertJsonBlobRequest': 'snapser_internal.models.insert_json_blob_request',
+    'JsonRpcError': 'snapser_internal.models.json_rpc_error',
+    'JsonRpcErrorResponse': 'snapser_internal.models.json_rpc_error_response',
+    'JsonRpcId': 'snapser_internal.models.json_rpc_id',
+    'JsonRpcRequest': 'snapser_internal.models.json_rpc_request',
+    'JsonRpcSuccessResponse': 'snapser_internal.models.json_rpc_success_response',
+    'PrependArrSubDocumentRequest': 'snapser_internal.models.prepend_arr_sub_document_request',
+    'ProtobufAny': 'snapser_internal.models.protobuf_any',
+    'ProtobufNullValue': 'snapser_internal.models.protobuf_null_value',
+    'ReplaceBlobRequest': 'snapser_internal.models.replace_blob_request',
+    'ReplaceJsonBlobRequest': 'snapser_internal.models.replace_json_blob_request',
+    'StorageAppendArrSubDocumentRequest': 'snapser_internal.models.storage_append_arr_sub_document_request',
+    'StorageAppendArrSubDocumentResponse': 'snapser_internal.models.storage_append_arr_sub_document_response',
+    'StorageAppendBlobAndOwner': 'snapser_internal.models.storage_append_blob_and_owner',
+    'StorageBatchAppendArrSubDocumentSingleResponse': 'snapser_internal.models.storage_batch_append_arr_sub_document_single_response',
+    'StorageBatchAppendArrSubDocumentsRequest': 'snapser_internal.models.storage_batch_append_arr_sub_documents_request',
+    'StorageBatchAppendArrSubDocumentsResponse': 'snapser_internal.models.storage_batch_append_arr_sub_documents_response',
+    'StorageBatchDeleteJsonBlobsRequest': 'snapser_internal.models.storage_batch_delete_json_blobs_request',
+    'StorageBatchDeleteJsonBlobsResponse': 'snapser_internal.models.storage_batch_delete_json_blobs_response',
+    'StorageBatchDeleteJsonBlobsSingleResponse': 'snapser_internal.models.storage_batch_delete_json_blobs_single_response',
+    'StorageBatchDeleteSubDocumentSingleResponse': 'snapser_internal.models.storage_batch_delete_sub_document_single_response',
+    'StorageBatchDeleteSubDocumentsRequest': 'snapser_internal.models.storage_batch_delete_sub_documents_request',
+    'StorageBatchDeleteSubDocumentsResponse': 'snapser_internal.models.storage_batch_delete_sub_documents_response',
+    'StorageBatchGetAppendBlobsResponse': 'snapser_internal.models.storage_batch_get_append_blobs_response',
+    'StorageBatchGetAppendBlobsSingleResponse': 'snapser_internal.models.storage_batch_get_append_blobs_single_response',
+    'StorageBatchGetBlobsResponse': 'snapser_internal.models.storage_batch_get_blobs_response',
+    'StorageBatchGetBlobsSingleResponse': 'snapser_internal.models.storage_batch_get_blobs_single_response',
+    'StorageBatchGetCountersResponse': 'snapser_internal.models.storage_batch_get_counters_response',
+    'StorageBatchGetCountersSingleResponse': 'snapser_internal.models.storage_batch_get_counters_single_response',
+    'StorageBatchGetJsonBlobsRequest': 'snapser_internal.models.storage_batch_get_json_blobs_request',
+    'StorageBatchGetJsonBlobsResponse': 'snapser_internal.models.storage_batch_get_json_blobs_response',
+    'StorageBatchGetJsonBlobsSingleResponse': 'snapser_internal.models.storage_batch_get_json_blobs_single_response',
+    'StorageBatchGetSubDocumentsRequest': 'snapser_internal.models.storage_batch_get_sub_documents_request',
+    'StorageBatchGetSubDocumentsResponse': 'snapser_internal.models.storage_batch_get_sub_documents_response',
+    'StorageBatchGetSubDocumentsSingleResponse': 'snapser_internal.models.storage_batch_get_sub_documents_single_response',
+    'StorageBatchIncrementCounterRequest': 'snapser_internal.models.storage_batch_increment_counter_request',
+    'StorageBatchIncrementCounterResponse': 'snapser_internal.models.storage_batch_increment_counter_response',
+    'StorageBatchInsertBlobRequest': 'snapser_internal.models.storage_batch_insert_blob_request',
+    'StorageBatchInsertBlobResponse': 'snapser_internal.models.storage_batch_insert_blob_response',
+    'StorageBatchInsertJsonBlobSingleResponse': 'snapser_internal.models.storage_batch_insert_json_blob_single_response',
+    'StorageBatchInsertJsonBlobsRequest': 'snapser_internal.models.storage_batch_insert_json_blobs_request',
+    'StorageBatchInsertJsonBlobsResponse': 'snapser_internal.models.storage_batch_insert_json_blobs_response',
+    'StorageBatchPrependArrSubDocumentSingleResponse': 'snapser_internal.models.storage_batch_prepend_arr_sub_document_single_response',
+    'StorageBatchPrependArrSubDocumentsRequest': 'snapser_internal.models.storage_batch_prepend_arr_sub_documents_request',
+    'StorageBatchPrependArrSubDocumentsResponse': 'snapser_internal.models.storage_batch_prepend_arr_sub_documents_response',
+    'StorageBatchReplaceBlobRequest': 'snapser_internal.models.storage_batch_replace_blob_request',
+    'StorageBatchReplaceBlobResponse': 'snapser_internal.models.storage_batch_replace_blob_response',
+    'StorageBatchReplaceJsonBlobSingleResponse': 'snapser_internal.models.storage_batch_replace_json_blob_single_response',
+    'StorageBatchReplaceJsonBlobsRequest': 'snapser_internal.models.storage_batch_replace_json_blobs_request',
+    'StorageBatchReplaceJsonBlobsResponse': 'snapser_internal.models.storage_batch_replace_json_blobs_response',
+    'StorageBatchSingleBlobResponse': 'snapser_internal.models.storage_batch_single_blob_response',
+    'StorageBatchSingleIncrementCounterResponse': 'snapser_internal.models.storage_batch_single_increment_counter_response',
+    'StorageBatchSingleReplaceBlobResponse': 'snapser_internal.models.storage_batch_single_replace_blob_response',
+    'StorageBatchSingleUpdateAppendBlobResponse': 'snapser_internal.models.storage_batch_single_update_append_blob_response',
+    'StorageBatchUpdateAppendBlobRequest': 'snapser_internal.models.storage_batch_update_append_blob_request',
+    'StorageBatchUpdateAppendBlobResponse': 'snapser_internal.models.storage_batch_update_append_blob_response',
+    'StorageBatchUpsertSubDocumentSingleResponse': 'snapser_internal.models.storage_batch_upsert_sub_document_single_response',
+    'StorageBatchUpsertSubDocumentsRequest': 'snapser_internal.models.storage_batch_upsert_sub_documents_request',
+    'StorageBatchUpsertSubDocumentsResponse': 'snapser_internal.models.storage_batch_upsert_sub_documents_response',
+    'StorageBlobAndOwner': 'snapser_internal.models.storage_blob_and_owner',
+    'StorageCounterAndOwner': 'snapser_internal.models.storage_counter_and_owner',
+    'StorageDeleteAppendBlobResponse': 'snapser_internal.models.storage_delete_append_blob_response',
+    'StorageDeleteBlobResponse': 'snapser_internal.models.storage_delete_blob_response',
+    'StorageDeleteJsonBlobRequest': 'snapser_internal.models.storage_delete_json_blob_request',
+    'StorageDeleteJsonBlobResponse': 'snapser_internal.models.storage_delete_json_blob_response',
+    'StorageDeleteSubDocumentRequest': 'snapser_internal.models.storage_delete_sub_document_request',
+    'StorageDeleteSubDocumentResponse': 'snapser_internal.models.storage_delete_sub_document_response',
+    'StorageGetAppendBlobRequest': 'snapser_internal.models.storage_get_append_blob_request',
+    'StorageGetAppendBlobResponse': 'snapser_internal.models.storage_get_append_blob_response',
+    'StorageGetBlobRequest': 'snapser_internal.models.storage_get_blob_request',
+    'StorageGetBlobResponse': 'snapser_internal.models.storage_get_blob_response',
+    'StorageGetCasResponse': 'snapser_internal.models.storage_get_cas_response',
+    'StorageGetCounterRequest': 'snapser_internal.models.storage_get_counter_request',
+    'StorageGetCounterResponse': 'snapser_internal.models.storage_get_counter_response',
+    'StorageGetJsonBlobRequest': 'snapser_internal.models.storage_get_json_blob_request',
+    'StorageGetJsonBlobResponse': 'snapser_internal.models.storage_get_json_blob_response',
+    'StorageGetSubDocumentRequest': 'snapser_internal.models.storage_get_sub_document_request',
+    'StorageGetSubDocumentResponse': 'snapser_internal.models.storage_get_sub_document_response',
+    'StorageIncrementCounterRequest': 'snapser_internal.models.storage_increment_counter_request',
+    'StorageIncrementCounterResponse': 'snapser_internal.models.storage_increment_counter_response',
+    'StorageInsertBlobRequest': 'snapser_internal.models.storage_insert_blob_request',
+    'StorageInsertBlobResponse': 'snapser_internal.models.storage_insert_blob_response',
+    'StorageInsertJsonBlobRequest': 'snapser_internal.models.storage_insert_json_blob_request',
+    'StorageInsertJsonBlobResponse': 'snapser_internal.models.storage_insert_json_blob_response',
+    'StorageJsonFragment': 'snapser_internal.models.storage_json_fragment',
+    'StoragePrependArrSubDocumentRequest': 'snapser_internal.models.storage_prepend_arr_sub_document_request',
+    'StoragePrependArrSubDocumentResponse': 'snapser_internal.models.storage_prepend_arr_sub_document_response',
+    'StorageReplaceBlobRequest': 'snapser_internal.models.storage_replace_blob_request',
+    'StorageReplaceBlobResponse': 'snapser_internal.models.storage_replace_blob_response',
+    'StorageReplaceJsonBlobRequest': 'snapser_internal.models.storage_replace_json_blob_request',
+    'StorageReplaceJsonBlobResponse': 'snapser_internal.models.storage_replace_json_blob_response',
+    'StorageResetCounterResponse': 'snapser_internal.models.storage_reset_counter_response',
+    'StorageUpdateAppendBlobRequest': 'snapser_internal.models.storage_update_append_blob_request',
+    'StorageUpdateAppendBlobResponse': 'snapser_internal.models.storage_update_append_blob_response',
+    'StorageUpsertSubDocumentRequest': 'snapser_internal.models.storage_upsert_sub_document_request',
+    'StorageUpsertSubDocumentResponse': 'snapser_internal.models.storage_upsert_sub_document_response',
+    'StorageUserAppendBlobResponse': 'snapser_internal.models.storage_user_append_blob_response',
+    'StorageUserBlobResponse': 'snapser_internal.models.storage_user_blob_response',
+    'StorageUserCounterResponse': 'snapser_internal.models.storage_user_counter_response',
+    'SuspendUserRequest': 'snapser_internal.models.suspend_user_request',
+    'UpdateAppendBlobRequest': 'snapser_internal.models.update_append_blob_request',
+    'UpsertSubDocumentRequest': 'snapser_internal.models.upsert_sub_document_request',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    # Cache it so later lookups do not come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
@@ -0,0 +1,348 @@
+'''
+Write-behind cache of each user's todo list.
+
+Each worker keeps the todo lists of recently active users in memory, with the
+CAS of the last full read. Listing todos is served from memory while that read
+is younger than TODO_CACHE_TTL_SECONDS. Adding or completing a task changes
+the cached list right away and queues the change. A background thread writes
+it to Storage TODO_WRITE_BEHIND_DELAY_SECONDS later. The whole burst is written
+at once:
+  - one `storage_append_arr_sub_document` with every new task,
+  - one `storage_upsert_sub_document` with every completed task.
+A task completed before its add was written goes out once, already completed.
+
+Sub-document writes never replace the whole document, so writes from other
+workers are not lost and no CAS-guarded retry loop is needed. The CAS is used
+when the cache reloads: if it moved, someone else changed the list, and the
+changes still queued here are reapplied on top of the fresh copy. Completing a
+task needs its position in the array. Positions of tasks this worker appended
+are only known after a full read, so the flush does one when it has to. An
+append that failed may have been written anyway (a timeout), so the retry
+reloads the list first and only appends the tasks that are not in it.
+
+Other workers see this worker's changes once they are written, after at most
+the delay. Each worker flushes everything still queued when it shuts down
+(atexit), including on a graceful gunicorn restart. Changes still queued when a
+worker is killed (SIGKILL, or a timeout abort) are lost.
+
+Tuning (environment variables):
+  - TODO_CACHE_TTL_SECONDS: how long a full read is served from memory (default 2)
+  - TODO_CACHE_MAX_USERS: users kept per worker (default 1024)
+  - TODO_WRITE_BEHIND_DELAY_SECONDS: how long changes wait to be coalesced (default 0.2)
+  - TODO_WRITE_BEHIND_MAX_PENDING: queued changes per user that make the
+    request flush right away (default 50)
+'''
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from todo_store import TodoStore, new_task, todos
+
+
+# Constants
+TODO_CACHE_TTL_SECONDS = float(os.getenv('TODO_CACHE_TTL_SECONDS', '2'))
+TODO_CACHE_MAX_USERS = int(os.getenv('TODO_CACHE_MAX_USERS', '1024'))
+TODO_WRITE_BEHIND_DELAY_SECONDS = float(os.getenv('TODO_WRITE_BEHIND_DELAY_SECONDS', '0.2'))
+TODO_WRITE_BEHIND_MAX_PENDING = int(os.getenv('TODO_WRITE_BEHIND_MAX_PENDING', '50'))
+# Delay before retrying a flush that failed
+RETRY_SECONDS = 1.0
+
+
+class _Entry:
+    '''
+    One user's cached list and the changes not yet written.
+    '''
+
+    def __init__(self):
+        self.tasks: List[Dict[str, Any]] = []
+        self.cas: Optional[str] = None
+        # id -> position, only for positions known from a full read
+        self.positions: Dict[str, int] = {}
+        self.loaded_at: Optional[float] = None
+        self.pending_adds: List[Dict[str, Any]] = []
+        self.pending_completes: Dict[str, Dict[str, Any]] = {}
+        self.flush_at: Optional[float] = None
+        # Set while an append is unconfirmed: it may be stored even if it failed
+        self.append_unsure = False
+        # Serializes loads and flushes of this user
+        self.io_lock = threading.RLock()
+
+    def pending(self) -> int:
+        return len(self.pending_adds) + len(self.pending_completes)
+
+    def find(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return next((t for t in self.tasks if t.get('id') == task_id), None)
+
+
+class WriteBehindTodos:
+    '''
+    The todo operations of the MCP tools, on top of a bounded LRU of `_Entry`.
+    '''
+
+    def __init__(self, ttl_seconds: float = TODO_CACHE_TTL_SECONDS,
+                 max_users: int = TODO_CACHE_MAX_USERS,
+                 delay_seconds: float = TODO_WRITE_BEHIND_DELAY_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.delay_seconds = delay_seconds
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid = os.getpid()
+        self._stats = {'hits': 0, 'misses': 0, 'queued': 0, 'flushes': 0,
+                       'flush_errors': 0, 'reconciliations': 0, 'evictions': 0}
+
+    def read(self, user_id: str) -> TodoStore:
+        '''
+        Return all of the user's todos, including changes not yet written.
+        Raises ApiException on Storage errors.
+        '''
+        entry = self._load(user_id)
+        with self._lock:
+            return TodoStore(tasks=[dict(t) for t in entry.tasks], cas=entry.cas or '0')
+
+    def add(self, user_id: str, title: str) -> Dict[str, Any]:
+        '''
+        Add a new task to the user's list and return it.
+        '''
+        entry = self._load(user_id)
+        task = new_task(title)
+        with self._lock:
+            entry.tasks.append(task)
+            entry.pending_adds.append(task)
+            self._queued(entry)
+        self._flush_if_full(user_id, entry)
+        return dict(task)
+
+    def complete(self, user_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+        '''
+        Mark a task as completed. Returns the task, or None if there is no such task.
+        '''
+        entry = self._load(user_id)
+        for reload in (False, True):
+            if reload:
+                # Maybe added through another worker since the last read
+                entry = self._load(user_id, force=True)
+            with self._lock:
+                task = entry.find(task_id)
+                if task is not None:
+                    break
+        else:
+            return None
+        with self._lock:
+            # The list may have been reloaded in between
+            task = entry.find(task_id) or task
+            if not task.get('completed'):
+                task['completed'] = True
+                # A queued add already carries the change
+                if not any(t is task for t in entry.pending_adds):
+                    entry.pending_completes[task_id] = task
+                    self._queued(entry)
+            result = dict(task)
+        self._flush_if_full(user_id, entry)
+        return result
+
+    def flush(self, user_id: str):
+        '''
+        Write the user's queued changes now. Raises ApiException on Storage errors.
+        '''
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None:
+            with entry.io_lock:
+                self._flush_locked(user_id, entry)
+
+    def flush_all(self):
+        '''
+        Write every queued change. Registered with atexit.
+        '''
+        with self._lock:
+            users = [user_id for user_id, entry in self._entries.items() if entry.pending()]
+        for user_id in users:
+            try:
+                self.flush(user_id)
+            except Exception as e:
+                logging.warning('Todo flush failed for %s: %s', user_id, e)
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters for /metrics.
+        '''
+        with self._lock:
+            return dict(self._stats, users=len(self._entries),
+                        pending=sum(entry.pending() for entry in self._entries.values()))
+
+    def _load(self, user_id: str, force: bool = False) -> _Entry:
+        '''
+        Return the user's entry, reloaded from Storage if it is missing, too
+        old or `force` is set.
+        '''
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                entry = self._entries[user_id] = _Entry()
+                self._evict(keep=user_id)
+            self._entries.move_to_end(user_id)
+            if not force and self._is_fresh(entry):
+                self._stats['hits'] += 1
+                return entry
+            self._stats['misses'] += 1
+        with entry.io_lock:
+            if force or not self._is_fresh(entry):
+                self._reload(user_id, entry)
+        return entry
+
+    def _is_fresh(self, entry: _Entry) -> bool:
+        return entry.loaded_at is not None and \
+            time.monotonic() - entry.loaded_at < self.ttl_seconds
+
+    def _reload(self, user_id: str, entry: _Entry):
+        '''
+        Replace the cached list with a full read, and reapply the changes
+        still queued. Called with entry.io_lock held.
+        '''
+        store = todos.read(user_id)
+        tasks = [dict(t) for t in store.tasks]
+        with self._lock:
+            if entry.cas is not None and store.cas != entry.cas and entry.pending():
+                self._stats['reconciliations'] += 1
+            index = {t.get('id'): i for i, t in enumerate(tasks)}
+            adds = []
+            for task in entry.pending_adds:
+                position = index.get(task['id'])
+                if position is not None:
+                    # Written after all; keep our copy, which may be completed since
+                    if task.get('completed') != tasks[position].get('completed'):
+                        entry.pending_completes[task['id']] = task
+                        self._queued(entry)
+                    tasks[position] = task
+                else:
+                    adds.append(task)
+            tasks.extend(adds)
+            entry.pending_adds = adds
+            for task_id, task in list(entry.pending_completes.items()):
+                if task_id in index:
+                    tasks[index[task_id]] = task
+                else:
+                    # Gone from Storage; nothing left to complete
+                    del entry.pending_completes[task_id]
+            entry.tasks = tasks
+            entry.cas = store.cas
+            entry.positions = {t.get('id'): i for i, t in enumerate(store.tasks)}
+            entry.loaded_at = time.monotonic()
+
+    def _flush_locked(self, user_id: str, entry: _Entry):
+        '''
+        Write the queued changes. Called with entry.io_lock held, so flushes
+        and reloads of one user never overlap.
+        '''
+        with self._lock:
+            if not entry.pending():
+                entry.flush_at = None
+                return
+            recheck = entry.append_unsure and bool(entry.pending_adds)
+        try:
+            if recheck:
+                # The last append failed but may have been written: drop the
+                # tasks that are already stored before appending again
+                self._reload(user_id, entry)
+        except Exception:
+            with self._lock:
+                self._stats['flush_errors'] += 1
+                entry.flush_at = time.monotonic() + RETRY_SECONDS
+            raise
+        with self._lock:
+            entry.append_unsure = False
+            adds = [dict(t) for t in entry.pending_adds]
+            completes = {task_id: dict(t) for task_id, t in entry.pending_completes.items()}
+            unplaced = [task_id for task_id in completes if task_id not in entry.positions]
+        try:
+            if adds:
+                entry.append_unsure = True
+                entry.cas = todos.append(user_id, adds)
+                entry.append_unsure = False
+                with self._lock:
+                    written = entry.pending_adds[:len(adds)]
+                    del entry.pending_adds[:len(adds)]
+                    for task, sent in zip(written, adds):
+                        # Completed while the append was in flight: the
+                        # written copy is stale, so queue the change
+                        if task.get('completed') != sent.get('completed'):
+                            entry.pending_completes[task['id']] = task
+                            self._queued(entry)
+            if unplaced:
+                # Appended by this worker: learn the positions from a full read
+                self._reload(user_id, entry)
+            with self._lock:
+                placed = {entry.positions[task_id]: task for task_id, task in completes.items()
+                          if task_id in entry.positions}
+            if placed:
+                entry.cas = todos.upsert(user_id, placed)
+            with self._lock:
+                for task_id in completes:
+                    entry.pending_completes.pop(task_id, None)
+                entry.flush_at = time.monotonic() + self.delay_seconds if entry.pending() else None
+                self._stats['flushes'] += 1
+        except Exception:
+            with self._lock:
+                self._stats['flush_errors'] += 1
+                entry.flush_at = time.monotonic() + RETRY_SECONDS
+            raise
+
+    def _flush_if_full(self, user_id: str, entry: _Entry):
+        if entry.pending() >= TODO_WRITE_BEHIND_MAX_PENDING:
+            # Writes outpace the flusher: make this request wait for them
+            self.flush(user_id)
+
+    def _queued(self, entry: _Entry):
+        # Called with self._lock held
+        self._stats['queued'] += 1
+        if entry.flush_at is None:
+            entry.flush_at = time.monotonic() + self.delay_seconds
+        self._ensure_thread()
+
+    def _evict(self, keep: str):
+        # Called with self._lock held. Users with queued changes stay until
+        # flushed, and so does `keep`, the user being loaded.
+        excess = len(self._entries) - self.max_users
+        candidates = [u for u, entry in self._entries.items() if u != keep and not entry.pending()]
+        for user_id in candidates[:max(0, excess)]:
+            del self._entries[user_id]
+            self._stats['evictions'] += 1
+
+    def _ensure_thread(self):
+        # Called with self._lock held
+        if self._owner_pid != os.getpid():
+            # Forked: the parent's flusher thread does not exist in this process
+            self._thread = None
+            self._owner_pid = os.getpid()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='todo-write-behind', daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                due = [user_id for user_id, entry in self._entries.items()
+                       if entry.flush_at is not None and entry.flush_at <= now]
+                waits = [entry.flush_at - now for entry in self._entries.values()
+                         if entry.flush_at is not None and entry.flush_at > now]
+            for user_id in due:
+                try:
+                    self.flush(user_id)
+                except Exception as e:
+                    logging.warning('Todo flush failed for %s: %s', user_id, e)
+            if not due:
+                self._wakeup.wait(min(waits) if waits else None)
+                self._wakeup.clear()
+
+
+todo_cache = WriteBehindTodos()
+atexit.register(todo_cache.flush_all)
@@ -0,0 +1,262 @@
+'''
+Todo lists stored as Storage JSON blobs and changed with sub-document operations.
+
+Each user's todos are one JSON blob, `{"tasks": [task, ...]}`. Adding a task
+appends one element to the `tasks` array and completing a task upserts one
+element, so a change sends one task over the wire whatever the size of the
+list. Only listing the todos reads the whole document.
+
+Tasks are never removed or reordered, so a task keeps its position in the
+array. Each worker keeps an id -> position map per user, learned from the last
+full read and from its own appends. Completing a task reads the element at the
+remembered position and checks its id before writing it back. When another
+worker appended in between and the position is unknown or wrong, the map is
+rebuilt from one full read.
+
+Users whose todos are still in the old plain blob are moved to the JSON blob
+on their first access.
+
+Tuning (environment variables):
+  - TODO_INDEX_MAX_USERS: users whose id -> position map is kept (default 1024)
+'''
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from snapser_internal.exceptions import NotFoundException
+from snapser_internal.models import (AppendArrSubDocumentRequest, InsertJsonBlobRequest,
+                                     StorageJsonFragment, UpsertSubDocumentRequest)
+from snapser_internal.rest import ApiException
+import blob_codec
+import snapser_clients
+
+
+# Constants
+TODOS_BLOB_KEY = 'todos'
+TODOS_ACCESS_TYPE = 'protected'
+TODOS_GATEWAY = 'internal'
+TASKS_PATH = 'tasks'
+TODO_INDEX_MAX_USERS = int(os.getenv('TODO_INDEX_MAX_USERS', '1024'))
+# Storage reports an existing JSON blob on insert as ALREADY_EXISTS
+ALREADY_EXISTS_STATUS = 409
+
+
+class TodoStore:
+    '''
+    Simple in-memory todo store structure.
+    '''
+
+    def __init__(self, tasks: List[Dict[str, Any]] = None, cas: str = '0'):
+        if tasks is None:
+            tasks = []
+        self.tasks = tasks
+        self.cas = cas
+
+    def to_dict(self):
+        '''
+        Convert to dict.
+        '''
+        return {"tasks": self.tasks, "cas": self.cas}
+
+
+def new_task(title: str) -> Dict[str, Any]:
+    '''
+    A new, not yet completed task.
+    '''
+    return {"id": str(uuid.uuid4()), "title": title, "completed": False}
+
+
+def task_path(position: int) -> str:
+    '''
+    Sub-document path of the task at `position`.
+    '''
+    return '{0}[{1}]'.format(TASKS_PATH, position)
+
+
+class SubDocumentTodos:
+    '''
+    The todo operations, plus a bounded LRU of id -> position maps per user.
+    '''
+
+    def __init__(self, max_users: int = TODO_INDEX_MAX_USERS):
+        self.max_users = max_users
+        self._positions: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'full_reads': 0, 'appends': 0, 'upserts': 0,
+                       'index_hits': 0, 'index_rebuilds': 0, 'migrations': 0}
+
+    def read(self, user_id: str) -> TodoStore:
+        '''
+        Return all of the user's todos. Raises ApiException on Storage errors.
+        '''
+        try:
+            api_response = snapser_clients.storage_api().storage_get_json_blob(
+                owner_id=user_id,
+                access_type=TODOS_ACCESS_TYPE,
+                json_blob_key=TODOS_BLOB_KEY,
+                gateway=TODOS_GATEWAY
+            )
+        except NotFoundException:
+            return self._migrate(user_id)
+        tasks = (api_response.value or {}).get(TASKS_PATH, [])
+        self._remember(user_id, tasks)
+        return TodoStore(tasks=tasks, cas=api_response.cas or '0')
+
+    def add(self, user_id: str, title: str) -> Dict[str, Any]:
+        '''
+        Append a new task to the user's list and return it.
+        '''
+        task = new_task(title)
+        self.append(user_id, [task])
+        return task
+
+    def append(self, user_id: str, tasks: List[Dict[str, Any]]) -> Optional[str]:
+        '''
+        Append tasks to the user's list in one call. Returns the new CAS.
+        '''
+        try:
+            cas = self._append(user_id, tasks)
+        except NotFoundException:
+            # First task of this user: create the document, then append
+            self._migrate(user_id)
+            cas = self._append(user_id, tasks)
+        with self._lock:
+            positions = self._positions.get(user_id)
+            if positions is not None:
+                # A guess: another worker may have appended first. `complete`
+                # checks the id before trusting it.
+                for task in tasks:
+                    positions[task['id']] = len(positions)
+        return cas
+
+    def upsert(self, user_id: str, tasks: Dict[int, Dict[str, Any]]) -> Optional[str]:
+        '''
+        Rewrite the tasks at the given positions in one call. Returns the new CAS.
+        '''
+        api_response = snapser_clients.storage_api().storage_upsert_sub_document(
+            owner_id=user_id,
+            access_type=TODOS_ACCESS_TYPE,
+            json_blob_key=TODOS_BLOB_KEY,
+            gateway=TODOS_GATEWAY,
+            body=UpsertSubDocumentRequest(updates=[
+                StorageJsonFragment(path=task_path(position), value=task)
+                for position, task in tasks.items()])
+        )
+        with self._lock:
+            self._stats['upserts'] += 1
+        return api_response.cas if api_response is not None else None
+
+    def complete(self, user_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+        '''
+        Mark a task as completed. Returns the task, or None if there is no such task.
+        '''
+        with self._lock:
+            position = self._positions.get(user_id, {}).get(task_id)
+        task = self._get_task(user_id, position) if position is not None else None
+        if task is None or task.get('id') != task_id:
+            # Unknown or moved position: look the task up in a full read
+            with self._lock:
+                self._stats['index_rebuilds'] += 1
+            tasks = self.read(user_id).tasks
+            position = next((i for i, t in enumerate(tasks) if t.get('id') == task_id), None)
+            if position is None:
+                return None
+            task = tasks[position]
+        else:
+            with self._lock:
+                self._stats['index_hits'] += 1
+        if task.get('completed'):
+            return task
+        task['completed'] = True
+        self.upsert(user_id, {position: task})
+        return task
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters for /metrics.
+        '''
+        with self._lock:
+            return dict(self._stats, users=len(self._positions))
+
+    def _append(self, user_id: str, tasks: List[Dict[str, Any]]) -> Optional[str]:
+        api_response = snapser_clients.storage_api().storage_append_arr_sub_document(
+            owner_id=user_id,
+            access_type=TODOS_ACCESS_TYPE,
+            json_blob_key=TODOS_BLOB_KEY,
+            gateway=TODOS_GATEWAY,
+            body=AppendArrSubDocumentRequest(updates=[
+                StorageJsonFragment(path=TASKS_PATH, value=task) for task in tasks])
+        )
+        with self._lock:
+            self._stats['appends'] += 1
+        return api_response.cas if api_response is not None else None
+
+    @staticmethod
+    def _get_task(user_id: str, position: int) -> Optional[Dict[str, Any]]:
+        try:
+            api_response = snapser_clients.storage_api().storage_get_sub_document(
+                owner_id=user_id,
+                access_type=TODOS_ACCESS_TYPE,
+                json_blob_key=TODOS_BLOB_KEY,
+                path=task_path(position),
+                gateway=TODOS_GATEWAY
+            )
+        except NotFoundException:
+            return None
+        return api_response.value
+
+    def _remember(self, user_id: str, tasks: List[Dict[str, Any]]):
+        with self._lock:
+            self._stats['full_reads'] += 1
+            self._positions[user_id] = {task.get('id'): i for i, task in enumerate(tasks)}
+            self._positions.move_to_end(user_id)
+            while len(self._positions) > self.max_users:
+                self._positions.popitem(last=False)
+
+    def _migrate(self, user_id: str) -> TodoStore:
+        '''
+        Create the user's JSON blob, seeded from the old plain `todos` blob if
+        there is one, and return its contents.
+        '''
+        storage_api = snapser_clients.storage_api()
+        tasks: List[Dict[str, Any]] = []
+        try:
+            api_response = storage_api.storage_get_blob(
+                owner_id=user_id,
+                access_type=TODOS_ACCESS_TYPE,
+                blob_key=TODOS_BLOB_KEY,
+                gateway=TODOS_GATEWAY
+            )
+            if api_response.value:
+                tasks = blob_codec.loads(api_response.value).get(TASKS_PATH, [])
+        except NotFoundException:
+            pass
+        try:
+            api_response = storage_api.storage_insert_json_blob(
+                owner_id=user_id,
+                access_type=TODOS_ACCESS_TYPE,
+                json_blob_key=TODOS_BLOB_KEY,
+                gateway=TODOS_GATEWAY,
+                body=InsertJsonBlobRequest(value={TASKS_PATH: tasks}, ttl=0)
+            )
+        except ApiException as e:
+            if e.status != ALREADY_EXISTS_STATUS:
+                raise
+            # Another request created it first
+            return self.read(user_id)
+        if tasks:
+            with self._lock:
+                self._stats['migrations'] += 1
+            storage_api.storage_delete_blob(
+                owner_id=user_id,
+                access_type=TODOS_ACCESS_TYPE,
+                blob_key=TODOS_BLOB_KEY,
+                gateway=TODOS_GATEWAY
+            )
+        self._remember(user_id, tasks)
+        return TodoStore(tasks=tasks, cas=api_response.cas or '0')
+
+
+todos = SubDocumentTodos()
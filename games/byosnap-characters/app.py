@@ -9,8 +9,17 @@ from apispec_webframeworks.flask import FlaskPlugin
 from marshmallow import Schema, fields
 from flask import Flask, request, make_response, jsonify, send_file
 from flask_cors import CORS, cross_origin
-import snapser
 from snapser.rest import ApiException
+import snapser_clients
+import token_refresh
+from character_activations import ActivationError, activations
+from token_scheduler import token_scheduler
+from settings_cache import settings_cache
+from blob_loader import request_blob_loader
+from json_provider import CodecJSONProvider, raw_json_response
+import blob_codec
+import metrics
+import request_deadlines
 
 
 class TokenHeaderSchema(Schema):
@@ -89,7 +98,14 @@ logging.basicConfig(level=logging.DEBUG,
 # Extensions initialization
 # =========================
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 CORS(app, resources={r'/*': {'origins': '*'}})
+metrics.init_app(app)
+request_deadlines.init_app(app)
+metrics.register_stats('settings_cache', settings_cache.stats)
+metrics.register_stats('character_activations', activations.stats)
+metrics.register_stats('token_scheduler', token_scheduler.stats)
+metrics.register_stats('blob_codec', blob_codec.stats)
 
 
 @app.route('/v1/byosnap-characters/openapispec', methods=["OPTIONS"])
@@ -183,27 +199,23 @@ def settings_export():
             }
         }
     }
-    configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    with snapser.ApiClient(configuration=configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser.StorageServiceApi(api_client)
-        try:
-            # Storage Settings
-            api_response = api_instance.storage_internal_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id='byosnap_characters',
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if api_response is None:
-                return make_response(jsonify(response), 200)
-            response['data']['character_settings'] = json.loads(
-                api_response.value)
+    # Create an instance of the API class
+    api_instance = snapser_clients.storage_api()
+    try:
+        # Storage Settings
+        api_response = api_instance.storage_internal_get_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id='byosnap_characters',
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+        )
+        if api_response is None:
             return make_response(jsonify(response), 200)
-        except ApiException as e:
-            pass
+        response['data']['character_settings'] = json.loads(
+            api_response.value)
+        return make_response(jsonify(response), 200)
+    except ApiException as e:
+        pass
     return make_response(jsonify(response), 200)
 
 
@@ -288,48 +300,45 @@ def settings_import():
                 'error_message': 'Duplicate characters found'
             }), 400)
         # Save the characters to the storage
-        configuration = snapser.Configuration(
-            host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-        )
-        with snapser.ApiClient(configuration=configuration) as api_client:
-            cas = '12345'
-            # Create an instance of the API class
-            api_instance = snapser.StorageServiceApi(api_client)
-            try:
-                # Get Storage CAS
-                api_response = api_instance.storage_internal_get_blob(
-                    access_type='private',
-                    blob_key='character_settings',
-                    owner_id='byosnap_characters',
-                    gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-                )
-                if api_response is not None:
-                    cas = api_response.cas
-            except ApiException:
-                # You come here when the doc is not even present
-                pass
-            try:
-                api_response = api_instance.storage_internal_replace_blob(
-                    access_type='private',
-                    blob_key='character_settings',
-                    owner_id='byosnap_characters',
-                    gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-                    body={
-                        "value": json.dumps(settings),
-                        "ttl": 0,
-                        "create": True,
-                        "cas": cas
-                    }
-                )
-                if api_response is None:
-                    return make_response(jsonify({
-                        'error_message': 'Server Error'
-                    }), 500)
-                return make_response(jsonify(settings), 200)
-            except ApiException as e:
+        cas = '12345'
+        # Create an instance of the API class
+        api_instance = snapser_clients.storage_api()
+        try:
+            # Get Storage CAS
+            api_response = api_instance.storage_internal_get_blob(
+                access_type='private',
+                blob_key='character_settings',
+                owner_id='byosnap_characters',
+                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+            )
+            if api_response is not None:
+                cas = api_response.cas
+        except ApiException:
+            # You come here when the doc is not even present
+            pass
+        try:
+            api_response = api_instance.storage_internal_replace_blob(
+                access_type='private',
+                blob_key='character_settings',
+                owner_id='byosnap_characters',
+                gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+                body={
+                    "value": json.dumps(settings),
+                    "ttl": 0,
+                    "create": True,
+                    "cas": cas
+                }
+            )
+            if api_response is None:
                 return make_response(jsonify({
-                    'error_message': 'Server Exception: ' + str(e)
+                    'error_message': 'Server Error'
                 }), 500)
+            settings_cache.invalidate('byosnap_characters', 'character_settings')
+            return make_response(jsonify(settings), 200)
+        except ApiException as e:
+            return make_response(jsonify({
+                'error_message': 'Server Exception: ' + str(e)
+            }), 500)
     except Exception as e:
         return make_response(jsonify({
             'error_message': 'Server Exception' + str(e)
@@ -378,30 +387,26 @@ def validate_settings():
                      ]
                  }}
     }
-    configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    with snapser.ApiClient(configuration=configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser.StorageServiceApi(api_client)
-        try:
-            # Storage Settings
-            api_response = api_instance.storage_internal_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id='byosnap_characters',
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if api_response is None:
-                return make_response(jsonify(response), 200)
-            # Load storage data
-            response['data']['character_settings'] = json.loads(
-                api_response.value)
-            # Update the characters with the imported characters
-            response['data']['character_settings']['sections'][0]['components'][0]['value'] = settings['sections'][0]['components'][0]['value']
+    # Create an instance of the API class
+    api_instance = snapser_clients.storage_api()
+    try:
+        # Storage Settings
+        api_response = api_instance.storage_internal_get_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id='byosnap_characters',
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+        )
+        if api_response is None:
             return make_response(jsonify(response), 200)
-        except ApiException as e:
-            pass
+        # Load storage data
+        response['data']['character_settings'] = json.loads(
+            api_response.value)
+        # Update the characters with the imported characters
+        response['data']['character_settings']['sections'][0]['components'][0]['value'] = settings['sections'][0]['components'][0]['value']
+        return make_response(jsonify(response), 200)
+    except ApiException as e:
+        pass
     return make_response(jsonify(response), 200)
 
 # End: SYSTEM: Used by Snapser's built-in configuration import export system
@@ -417,25 +422,21 @@ def delete_user_data(user_id):
             'error_message': 'Unauthorized'
         }), 401)
     # Delete the character blob from storage
-    storage_configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    with snapser.ApiClient(configuration=storage_configuration) as storage_api_client:
-        storage_api_instance = snapser.StorageServiceApi(storage_api_client)
-        try:
-            # Get blob
-            storage_api_response = storage_api_instance.storage_internal_delete_blob(
-                access_type='private',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if storage_api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'No blob'
-                }), 400)
-        except ApiException:
-            pass
+    storage_api_instance = snapser_clients.storage_api()
+    try:
+        # Get blob
+        storage_api_response = storage_api_instance.storage_internal_delete_blob(
+            access_type='private',
+            blob_key='characters',
+            owner_id=user_id,
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+        )
+        if storage_api_response is None:
+            return make_response(jsonify({
+                'error_message': 'No blob'
+            }), 400)
+    except ApiException:
+        pass
     return make_response(jsonify({}), 200)
 
 # End: SYSTEM: User Tool: Delete and Reset User data
@@ -467,25 +468,15 @@ def get_settings():
             }
         ]
     }
-    configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    with snapser.ApiClient(configuration=configuration) as api_client:
-        # Create an instance of the API class
-        api_instance = snapser.StorageServiceApi(api_client)
-        try:
-            # Anonymous Login
-            api_response = api_instance.storage_internal_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id='byosnap_characters',
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if api_response is None:
-                return make_response(jsonify(default_settings), 200)
-            return make_response(jsonify(json.loads(api_response.value)), 200)
-        except ApiException as e:
-            pass
+    try:
+        # Served from the worker's read-through settings cache
+        value = settings_cache.get('byosnap_characters', 'character_settings')
+        if value is None:
+            return make_response(jsonify(default_settings), 200)
+        # The blob is already JSON; send it without re-encoding
+        return raw_json_response(value)
+    except ApiException as e:
+        pass
     return make_response(jsonify(default_settings), 200)
 
    # return make_response(jsonify(), 200)
@@ -516,48 +507,45 @@ def update_settings():
             'error_message': 'Invalid JSON ' + str(e)
         }), 500)
 
-    configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    with snapser.ApiClient(configuration=configuration) as api_client:
-        cas = '12345'
-        # Create an instance of the API class
-        api_instance = snapser.StorageServiceApi(api_client)
-        try:
-            # Anonymous Login
-            api_response = api_instance.storage_internal_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id='byosnap_characters',
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if api_response is not None:
-                cas = api_response.cas
-        except ApiException:
-            # You come here when the doc is not even present
-            pass
-        try:
-            api_response = api_instance.storage_internal_replace_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id='byosnap_characters',
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-                body={
-                    "value": json.dumps(blob_data),
-                    "ttl": 0,
-                    "create": True,
-                    "cas": cas
-                }
-            )
-            if api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'Server Error'
-                }), 500)
-            return make_response(jsonify(blob_data), 200)
-        except ApiException as e:
+    cas = '12345'
+    # Create an instance of the API class
+    api_instance = snapser_clients.storage_api()
+    try:
+        # Anonymous Login
+        api_response = api_instance.storage_internal_get_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id='byosnap_characters',
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+        )
+        if api_response is not None:
+            cas = api_response.cas
+    except ApiException:
+        # You come here when the doc is not even present
+        pass
+    try:
+        api_response = api_instance.storage_internal_replace_blob(
+            access_type='private',
+            blob_key='character_settings',
+            owner_id='byosnap_characters',
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+            body={
+                "value": json.dumps(blob_data),
+                "ttl": 0,
+                "create": True,
+                "cas": cas
+            }
+        )
+        if api_response is None:
             return make_response(jsonify({
-                'error_message': 'Server Exception: ' + str(e)
+                'error_message': 'Server Error'
             }), 500)
+        settings_cache.invalidate('byosnap_characters', 'character_settings')
+        return make_response(jsonify(blob_data), 200)
+    except ApiException as e:
+        return make_response(jsonify({
+            'error_message': 'Server Exception: ' + str(e)
+        }), 500)
 
 # End: SYSTEM: Used by the Snap Configuration Tool
 
@@ -588,105 +576,64 @@ def get_characters(user_id):
               schema: CharactersResponseSchema
           description: 'Characters retrieved successfully'
     """
-    storage_configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    auth_configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_AUTH_HTTP_URL']
-    )
-    with snapser.ApiClient(configuration=storage_configuration) as storage_api_client:
-        # Create an instance of the API class
-        storage_api_instance = snapser.StorageServiceApi(storage_api_client)
+    # Create an instance of the API class
+    storage_api_instance = snapser_clients.storage_api()
+    try:
+        # Get blob
+        storage_api_response = storage_api_instance.storage_internal_get_blob(
+            access_type='private',
+            blob_key='characters',
+            owner_id=user_id,
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+        )
+        if storage_api_response is None:
+            return make_response(jsonify({'characters': {}}), 200)
+        cas = storage_api_response.cas
+        characters: CharactersResponseSchema = blob_codec.loads(
+            storage_api_response.value)
+        # Refresh every token that is near expiry. The anon-logins run
+        # concurrently and are bounded by a per-request deadline.
+        refreshed, failed = token_refresh.refresh_expiring(
+            user_id, characters['characters'])
+        if failed and not refreshed:
+            return make_response(jsonify({
+                'error_message': 'Server Exception: ' + next(iter(failed.values()))
+            }), 500)
+        # Characters that failed keep their current token until the next call
+        characters['characters'].update(refreshed)
+        # With the background scheduler on, tokens are normally renewed ahead
+        # of time and this is a pure read
+        token_scheduler.track(user_id, characters['characters'])
+        if not refreshed:
+            return make_response(jsonify(characters), 200)
+
+        # Now save the characters back to the storage
         try:
-            # Get blob
-            storage_api_response = storage_api_instance.storage_internal_get_blob(
+            storage_api_response = storage_api_instance.storage_internal_replace_blob(
                 access_type='private',
                 blob_key='characters',
                 owner_id=user_id,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+                gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+                body={
+                    "value": blob_codec.dumps(characters),
+                    "ttl": 0,
+                    "create": True,
+                    "cas": cas
+                }
             )
             if storage_api_response is None:
-                return make_response(jsonify({'characters': {}}), 200)
-            cas = storage_api_response.cas
-            characters: CharactersResponseSchema = json.loads(
-                storage_api_response.value)
-            # What we want to do is go over every character and check if their token is near expiry
-            # If it is, we want to refresh the token
-            for character_id, character in characters['characters'].items():
-                # Get last refresh time + token validity and compare with current time
-                # If it is less than 24 hours, refresh the token
-                # Call the Auth Anon Login API to refresh the token
-                # Update the token in the characters dict
-                refreshed_at = int(character['refreshed_at'])
-                token_validity_seconds = int(
-                    character['token_validity_seconds'])
-
-                # Calculate expiry time
-                expiry_time = refreshed_at + token_validity_seconds
-
-                # Get current time in seconds since epoch
-                current_time = int(time.time())
-
-                # Check if the expiry is within the next 12 hours
-                # 12 hours in seconds = 12 * 60 * 60 = 43200 seconds
-                expires_in_24_hours = expiry_time - current_time <= 86400
-                if expires_in_24_hours:
-                    with snapser.ApiClient(configuration=auth_configuration) as auth_api_client:
-                        # Create an instance of the API class
-                        auth_api_instance = snapser.AuthServiceApi(
-                            auth_api_client)
-                        body = snapser.AuthAnonLoginRequest(
-                            create_user=True,
-                            username=f"{user_id}-{character_id}"
-                        )
-
-                        try:
-                            # Anonymous Login
-                            auth_api_response = auth_api_instance.auth_internal_anon_login(
-                                body)
-                            if auth_api_response is None:
-                                return make_response(jsonify({
-                                    'error_message': 'Server Error'
-                                }), 500)
-
-                            characters['characters'][character_id] = {
-                                'id': auth_api_response.user.id,
-                                'session_token': auth_api_response.user.session_token,
-                                'refreshed_at': auth_api_response.user.refreshed_at,
-                                'token_validity_seconds': auth_api_response.user.token_validity_seconds
-                            }
-                        except ApiException as e:
-                            return make_response(jsonify({
-                                'error_message': 'Server Exception: ' + str(e)
-                            }), 500)
-
-            # Now save the characters back to the storage
-            try:
-                storage_api_response = storage_api_instance.storage_internal_replace_blob(
-                    access_type='private',
-                    blob_key='characters',
-                    owner_id=user_id,
-                    gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-                    body={
-                        "value": json.dumps(characters),
-                        "ttl": 0,
-                        "create": True,
-                        "cas": cas
-                    }
-                )
-                if storage_api_response is None:
-                    return make_response(jsonify({
-                        'error_message': 'Server Error'
-                    }), 500)
-            except ApiException as e:
                 return make_response(jsonify({
-                    'error_message': 'Server Exception: ' + str(e)
+                    'error_message': 'Server Error'
                 }), 500)
-            return make_response(jsonify(characters), 200)
-
-            # return make_response(jsonify(json.loads(api_response.value)), 200)
         except ApiException as e:
-            pass
+            return make_response(jsonify({
+                'error_message': 'Server Exception: ' + str(e)
+            }), 500)
+        return make_response(jsonify(characters), 200)
+
+        # return make_response(jsonify(json.loads(api_response.value)), 200)
+    except ApiException as e:
+        pass
     return make_response(jsonify({'characters': {}}), 200)
 
 
@@ -716,25 +663,21 @@ def reset_characters(user_id):
             'error_message': 'Unauthorized'
         }), 401)
     # Delete the character blob from storage
-    storage_configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    with snapser.ApiClient(configuration=storage_configuration) as storage_api_client:
-        storage_api_instance = snapser.StorageServiceApi(storage_api_client)
-        try:
-            # Get blob
-            storage_api_response = storage_api_instance.storage_internal_delete_blob(
-                access_type='private',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if storage_api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'No blob'
-                }), 400)
-        except ApiException:
-            pass
+    storage_api_instance = snapser_clients.storage_api()
+    try:
+        # Get blob
+        storage_api_response = storage_api_instance.storage_internal_delete_blob(
+            access_type='private',
+            blob_key='characters',
+            owner_id=user_id,
+            gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+        )
+        if storage_api_response is None:
+            return make_response(jsonify({
+                'error_message': 'No blob'
+            }), 400)
+    except ApiException:
+        pass
     return make_response(jsonify({'characters': {}}), 200)
 
 
@@ -775,110 +718,34 @@ def activate_character(user_id, character_id):
               schema: ErrorResponseSchema
           description: 'Server error'
     """
-    storage_configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_STORAGE_HTTP_URL']
-    )
-    auth_configuration = snapser.Configuration(
-        host=os.environ['SNAPEND_AUTH_HTTP_URL']
-    )
-    # Validate if the character is in the list of characters
-    with snapser.ApiClient(configuration=storage_configuration) as storage_api_client:
-        # Create an instance of the API class
-        storage_api_instance = snapser.StorageServiceApi(storage_api_client)
-        try:
-            api_response = storage_api_instance.storage_internal_get_blob(
-                access_type='private',
-                blob_key='character_settings',
-                owner_id='byosnap_characters',
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if api_response is not None:
-                characters = json.loads(api_response.value)
-                if character_id not in characters['sections'][0]['components'][0]['value']:
-                    return make_response(jsonify({
-                        'error_message': 'Character not found'
-                    }), 400)
-        except ApiException:
-            pass
-    logging.debug("Went past settings validation")
-    # Get the characters for the user
-    characters: CharactersResponseSchema = {'characters': {}}
-    cas = '12345'
-    # Get the characters for the user
-    with snapser.ApiClient(configuration=storage_configuration) as storage_api_client:
-        storage_api_instance = snapser.StorageServiceApi(storage_api_client)
-        try:
-            # Get blob
-            storage_api_response = storage_api_instance.storage_internal_get_blob(
-                access_type='private',
-                blob_key='characters',
-                owner_id=user_id,
-                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
-            )
-            if storage_api_response is None:
+    # Queue the read of the user's characters blob. If the settings cache has
+    # to go to Storage, both blobs are fetched in the same round trip.
+    loader = request_blob_loader()
+    user_characters = loader.load(user_id, 'characters')
+    # Validate if the character is in the list of characters. The settings blob
+    # rarely changes, so this is normally answered by the settings cache.
+    try:
+        settings_value = settings_cache.get(
+            'byosnap_characters', 'character_settings', loader=loader)
+        if settings_value is not None:
+            characters = json.loads(settings_value)
+            if character_id not in characters['sections'][0]['components'][0]['value']:
                 return make_response(jsonify({
-                    'error_message': 'No blob'
+                    'error_message': 'Character not found'
                 }), 400)
-            cas = storage_api_response.cas
-            characters = json.loads(storage_api_response.value)
-            # return make_response(jsonify(json.loads(api_response.value)), 200)
-        except ApiException:
-            # You come here when the doc is not even present
-            pass
-
-    # For the character, we want to renew the token
-    with snapser.ApiClient(configuration=auth_configuration) as auth_api_client:
-        # Create an instance of the API class
-        auth_api_instance = snapser.AuthServiceApi(
-            auth_api_client)
-        body = snapser.AuthAnonLoginRequest(
-            create_user=True,
-            username=f"{user_id}-{character_id}"
-        )
-
-        try:
-            # Anonymous Login
-            auth_api_response = auth_api_instance.auth_internal_anon_login(
-                body)
-            if auth_api_response is None:
-                return make_response(jsonify({
-                    'error_message': 'Server Error'
-                }), 500)
-            if 'characters' not in characters:
-                characters['characters'] = {}
-            characters['characters'][character_id] = {
-                'id': auth_api_response.user.id,
-                'session_token': auth_api_response.user.session_token,
-                'refreshed_at': auth_api_response.user.refreshed_at,
-                'token_validity_seconds': auth_api_response.user.token_validity_seconds
-            }
-        except ApiException as e:
-            return make_response(jsonify({
-                'error_message': 'Server Exception: ' + str(e)
-            }), 500)
-
-    # Now save the characters back to the storage
+    except ApiException:
+        pass
+    logging.debug("Went past settings validation")
+    # Concurrent activations for the same user are merged into one
+    # read-modify-write of the characters blob
     try:
-        storage_api_response = storage_api_instance.storage_internal_replace_blob(
-            access_type='private',
-            blob_key='characters',
-            owner_id=user_id,
-            gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
-            body={
-                "value": json.dumps(characters),
-                "ttl": 0,
-                "create": True,
-                "cas": cas
-            }
-        )
-        if storage_api_response is None:
-            return make_response(jsonify({
-                'error_message': 'Server Error'
-            }), 500)
-    except ApiException as e:
+        characters: CharactersResponseSchema = activations.activate(
+            user_id, character_id, prefetched=user_characters)
+    except ActivationError as e:
         return make_response(jsonify({
-            'error_message': 'Server Exception: ' + str(e)
-        }), 500)
+            'error_message': e.message
+        }), e.status)
+    token_scheduler.track(user_id, characters['characters'])
     return make_response(jsonify(characters), 200)
 # End: Regular API Endpoints exposed by the Snap
 
@@ -0,0 +1,132 @@
+'''
+Benchmark: one storage_internal_get_blob per blob vs. the request blob loader.
+
+Starts a local stub Storage Snap whose blob reads take --latency-ms, then times
+two read patterns:
+  1. `settings+user`: the `character_settings` blob and a user's `characters`
+     blob, as `activate_character` reads them on a settings cache miss.
+  2. `N owners`: the same blob key for N owners.
+
+Each is read with single `storage_internal_get_blob` calls in sequence, and
+through `blob_loader.BlobLoader`, which sends one batch call per blob key and
+runs the batch calls in parallel.
+
+Usage (from games/byosnap-characters):
+    python benchmarks/bench_blob_loader.py --latency-ms 20 --owners 1,10,50
+'''
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+BLOB_PATH = re.compile(r'^/v1/storage/owner/([^/]+)/([^/]+)/blobs/([^/]+)$')
+
+
+def blob_value(owner_id, blob_key):
+    return json.dumps({"owner": owner_id, "key": blob_key, "characters": {}})
+
+
+class StubStorageHandler(BaseHTTPRequestHandler):
+    '''
+    Keep-alive Storage stub for single and batch blob reads. Every blob exists.
+    '''
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        match = BLOB_PATH.match(url.path)
+        if match:
+            owner_id, _access_type, blob_key = match.groups()
+            payload = {"cas": "1", "value": blob_value(owner_id, blob_key)}
+        else:
+            query = parse_qs(url.query)
+            blob_key = query['blob_key'][0]
+            payload = {"results": [{
+                "success": True,
+                "response": {"owner_id": owner_id, "cas": "1",
+                             "value": blob_value(owner_id, blob_key)}
+            } for owner_id in query['owner_id']]}
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency):
+    '''
+    Start the stub Storage server on a free port.
+    '''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubStorageHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def single_reads(keys):
+    import snapser_clients
+    api = snapser_clients.storage_api()
+    return [api.storage_internal_get_blob(
+        owner_id=owner_id, access_type='private', blob_key=blob_key,
+        gateway='internal').value for owner_id, blob_key in keys]
+
+
+def loader_reads(keys):
+    from blob_loader import BlobLoader
+    loader = BlobLoader()
+    refs = [loader.load(owner_id, blob_key) for owner_id, blob_key in keys]
+    return [ref.get()[1] for ref in refs]
+
+
+def timed(fn, keys, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(keys)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--owners', default='1,10,50')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    server, host = start_stub(args.latency_ms / 1000)
+    os.environ['SNAPEND_STORAGE_HTTP_URL'] = host
+    os.environ['SNAPEND_INTERNAL_HEADER'] = 'internal'
+
+    cases = [('settings+user', [('byosnap_characters', 'character_settings'),
+                                ('user-0', 'characters')])]
+    for n in [int(n) for n in args.owners.split(',')]:
+        cases.append((f'{n} owners', [(f'user-{i}', 'characters') for i in range(n)]))
+
+    # Warm up the pooled client and the loader pool
+    loader_reads(cases[0][1])
+    print(f"{'reads':<14} {'single_ms':>10} {'loader_ms':>10} {'speedup':>8}")
+    for name, keys in cases:
+        assert single_reads(keys) == loader_reads(keys)
+        single = timed(single_reads, keys, args.rounds)
+        batched = timed(loader_reads, keys, args.rounds)
+        print(f"{name:<14} {single * 1000:>10.1f} {batched * 1000:>10.1f} "
+              f"{single / batched:>7.1f}x")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
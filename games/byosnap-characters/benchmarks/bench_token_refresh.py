@@ -0,0 +1,115 @@
+'''
+Benchmark: serial vs. concurrent character token refresh.
+
+Starts a local stub Auth Snap whose anon-login takes --latency-ms. For each
+character count it measures the time to refresh every character token, in two ways:
+  1. `serial`: one anon-login after another (the old `get_characters` loop).
+  2. `concurrent`: `token_refresh.refresh_expiring` on the bounded pool.
+
+Serial latency grows linearly with the number of characters. Concurrent
+latency grows in steps of TOKEN_REFRESH_MAX_WORKERS.
+
+Usage (from games/byosnap-characters):
+    python benchmarks/bench_token_refresh.py --latency-ms 20 --counts 1,2,4,8,16,32
+'''
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+class StubAuthHandler(BaseHTTPRequestHandler):
+    '''
+    Minimal keep-alive Auth stub. Every anon login sleeps for the configured latency.
+    '''
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_PUT(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.server.latency)
+        payload = json.dumps({'user': {
+            'id': f"uid-{body.get('username')}",
+            'session_token': uuid.uuid4().hex,
+            'refreshed_at': int(time.time()),
+            'token_validity_seconds': 7 * 86400
+        }}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency):
+    '''
+    Start the stub Auth server on a free port.
+    '''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubAuthHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def expiring_characters(n):
+    # Refreshed a week ago with a one week validity: every token needs a refresh
+    refreshed_at = int(time.time()) - 7 * 86400
+    return {f"character-{i}": {
+        'id': f"uid-{i}", 'session_token': 'stale',
+        'refreshed_at': refreshed_at, 'token_validity_seconds': 7 * 86400
+    } for i in range(n)}
+
+
+def bench(counts, rounds):
+    import token_refresh
+
+    # Warm up the pooled Auth client and the refresh pool
+    token_refresh.refresh_expiring('warmup', expiring_characters(
+        token_refresh.TOKEN_REFRESH_MAX_WORKERS))
+
+    print(f"{'characters':>10} {'serial_ms':>10} {'concurrent_ms':>14} {'speedup':>8}")
+    for n in counts:
+        characters = expiring_characters(n)
+        serial = concurrent = 0.0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for character_id in characters:
+                token_refresh.anon_login('bench', character_id)
+            serial += time.perf_counter() - start
+
+            start = time.perf_counter()
+            refreshed, failed = token_refresh.refresh_expiring('bench', characters)
+            concurrent += time.perf_counter() - start
+            assert len(refreshed) == n and not failed, failed
+        serial, concurrent = serial / rounds, concurrent / rounds
+        print(f"{n:>10} {serial * 1000:>10.1f} {concurrent * 1000:>14.1f} "
+              f"{serial / concurrent:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--counts', default='1,2,4,8,16,32')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    server, host = start_stub(args.latency_ms / 1000)
+    os.environ['SNAPEND_AUTH_HTTP_URL'] = host
+    bench([int(n) for n in args.counts.split(',')], args.rounds)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+'''
+Request-scoped batching of Storage blob reads.
+
+Handlers often need several blobs, e.g. the `character_settings` blob and the
+user's `characters` blob. Read one after another, each blob costs its own
+Storage round trip. `BlobLoader` works like a DataLoader. `load()` only queues
+a key and returns a `BlobRef`. The first `BlobRef.get()` sends every queued key
+at once:
+  - keys that share an access type and blob key become one
+    `storage_internal_batch_get_blobs` call with all their owner ids,
+  - different blob keys need separate batch calls, which are sent in parallel,
+  - a key that is loaded twice is fetched once, and later loads of it in the
+    same request are answered from memory.
+
+Use `request_blob_loader()` to get the loader of the current Flask request.
+
+Tuning (environment variables):
+  - BLOB_LOADER_MAX_BATCH_SIZE: owner ids per batch call (default 100)
+  - BLOB_LOADER_MAX_WORKERS: parallel batch calls per worker process (default 4)
+'''
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from flask import g
+
+from snapser.rest import ApiException
+import snapser_clients
+
+
+# Constants
+BLOB_LOADER_MAX_BATCH_SIZE = int(os.getenv('BLOB_LOADER_MAX_BATCH_SIZE', '100'))
+BLOB_LOADER_MAX_WORKERS = int(os.getenv('BLOB_LOADER_MAX_WORKERS', '4'))
+
+# (owner_id, blob_key, access_type)
+BlobKey = Tuple[str, str, str]
+# Result placeholder for a key that is queued but not sent yet
+_PENDING = object()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    '''
+    Lazily create the pool for parallel batch calls, once per worker process.
+    '''
+    global _executor, _executor_lock, _owner_pid
+    if _owner_pid != os.getpid():
+        # Forked: the parent's pool threads do not exist in this process
+        _executor = None
+        _executor_lock = threading.Lock()
+        _owner_pid = os.getpid()
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=BLOB_LOADER_MAX_WORKERS,
+                    thread_name_prefix='blob-loader')
+    return _executor
+
+
+class BlobRef:
+    '''
+    A queued blob read. `get()` sends the pending batch if needed.
+    '''
+    __slots__ = ('_loader', 'key')
+
+    def __init__(self, loader: 'BlobLoader', key: BlobKey):
+        self._loader = loader
+        self.key = key
+
+    def get(self) -> Optional[Tuple[str, str]]:
+        '''
+        Return (cas, value) or None if the blob does not exist. Raises the
+        ApiException of the batch call if it failed.
+        '''
+        return self._loader.result(self.key)
+
+
+class BlobLoader:
+    '''
+    Collects blob reads and sends them as batch calls.
+    '''
+
+    def __init__(self, max_batch_size: int = BLOB_LOADER_MAX_BATCH_SIZE):
+        self.max_batch_size = max_batch_size
+        # (access_type, blob_key) -> owner ids waiting for the next dispatch
+        self._pending: Dict[Tuple[str, str], List[str]] = {}
+        self._results: Dict[BlobKey, object] = {}
+        self.batch_calls = 0
+
+    def load(self, owner_id: str, blob_key: str, access_type: str = 'private') -> BlobRef:
+        '''
+        Queue a blob read.
+        '''
+        key = (owner_id, blob_key, access_type)
+        if key not in self._results:
+            # Placeholder so a repeated load is not queued twice
+            self._results[key] = _PENDING
+            self._pending.setdefault((access_type, blob_key), []).append(owner_id)
+        return BlobRef(self, key)
+
+    def load_many(self, owner_ids: List[str], blob_key: str,
+                  access_type: str = 'private') -> List[BlobRef]:
+        '''
+        Queue the same blob key for several owners.
+        '''
+        return [self.load(owner_id, blob_key, access_type) for owner_id in owner_ids]
+
+    def prime(self, owner_id: str, blob_key: str, cas: Optional[str],
+              value: Optional[str], access_type: str = 'private'):
+        '''
+        Record a value this request already has, e.g. right after writing it.
+        '''
+        self._results[(owner_id, blob_key, access_type)] = \
+            (cas, value) if value is not None else None
+
+    def clear(self, owner_id: str, blob_key: str, access_type: str = 'private'):
+        '''
+        Forget a blob so the next load reads it again.
+        '''
+        if self._results.get((owner_id, blob_key, access_type)) is not _PENDING:
+            self._results.pop((owner_id, blob_key, access_type), None)
+
+    def result(self, key: BlobKey) -> Optional[Tuple[str, str]]:
+        if self._results.get(key) is _PENDING:
+            self.dispatch()
+        result = self._results[key]
+        if isinstance(result, ApiException):
+            raise result
+        return result
+
+    def dispatch(self):
+        '''
+        Send every queued read now.
+        '''
+        pending, self._pending = self._pending, {}
+        calls = []
+        for (access_type, blob_key), owner_ids in pending.items():
+            for start in range(0, len(owner_ids), self.max_batch_size):
+                calls.append((access_type, blob_key,
+                              owner_ids[start:start + self.max_batch_size]))
+        if not calls:
+            return
+        self.batch_calls += len(calls)
+        if len(calls) == 1:
+            outcomes = [_batch_get(*calls[0])]
+        else:
+            # Each call runs with a copy of the request's context, so it
+            # keeps the request deadline
+            futures = [_get_executor().submit(contextvars.copy_context().run,
+                                              _batch_get, *call)
+                       for call in calls]
+            outcomes = [future.result() for future in futures]
+        for (access_type, blob_key, owner_ids), outcome in zip(calls, outcomes):
+            for owner_id in owner_ids:
+                key = (owner_id, blob_key, access_type)
+                if isinstance(outcome, ApiException):
+                    self._results[key] = outcome
+                else:
+                    self._results[key] = outcome.get(owner_id)
+
+
+def _batch_get(access_type: str, blob_key: str, owner_ids: List[str]):
+    '''
+    One batch call. Returns {owner_id: (cas, value)} for the blobs found, or
+    the ApiException raised by the call.
+    '''
+    try:
+        api_response = snapser_clients.storage_api().storage_internal_batch_get_blobs(
+            access_type=access_type,
+            owner_id=owner_ids,
+            blob_key=blob_key,
+            gateway=os.environ.get('SNAPEND_INTERNAL_HEADER', 'internal')
+        )
+    except ApiException as e:
+        return e
+    found = {}
+    if api_response is None:
+        return found
+    # Owners without a blob come back as unsuccessful results
+    for result in api_response.results or []:
+        if result.success and result.response is not None and \
+                result.response.value is not None:
+            found[result.response.owner_id] = (result.response.cas, result.response.value)
+    return found
+
+
+def request_blob_loader() -> BlobLoader:
+    '''
+    The BlobLoader of the current Flask request, created on first use.
+    '''
+    loader = g.get('blob_loader')
+    if loader is None:
+        loader = g.blob_loader = BlobLoader()
+    return loader
@@ -0,0 +1,259 @@
+'''
+Single-flight character activation.
+
+Every activation is a read-modify-write of the user's `characters` blob. When a
+client activates several characters at once, or retries during a login storm,
+the concurrent requests for one user would each read the blob, log in, and
+then race on the CAS write. Most of them failed or redid the whole chain.
+
+This module coalesces them per `user_id` with a group commit. The first request
+becomes the leader for its batch. Requests that arrive while a batch for the
+same user is running join the next one. A batch logs in each of its characters
+once and then writes them all in one CAS update. If the write hits a CAS
+conflict, the blob is re-read and only the batch's new character records (the
+delta) are applied again. The anon-logins are never repeated.
+
+This only coalesces within one worker process. Requests served by other gunicorn
+workers are handled by the CAS retry loop.
+
+Tuning (environment variables):
+  - ACTIVATION_MAX_CAS_RETRIES: extra write attempts after a CAS conflict (default 3)
+'''
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from snapser import deadline
+from snapser.exceptions import NotFoundException
+from snapser.rest import ApiException
+from blob_loader import BlobRef
+import blob_codec
+import snapser_clients
+import token_refresh
+
+
+# Constants
+ACTIVATION_MAX_CAS_RETRIES = int(os.getenv('ACTIVATION_MAX_CAS_RETRIES', '3'))
+# Storage sits behind grpc-gateway: a CAS mismatch surfaces as ABORTED (409) or
+# FAILED_PRECONDITION (400/412) depending on the Snap version
+CAS_CONFLICT_STATUSES = (400, 409, 412)
+# CAS used to create the blob when the user has no characters yet
+NEW_BLOB_CAS = '12345'
+
+
+class ActivationError(Exception):
+    '''
+    The activation of one character failed. `message` is safe to return to the
+    client, with the HTTP `status`.
+    '''
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class NoBlobError(Exception):
+    '''
+    Storage answered the characters blob read with an empty response.
+    '''
+
+
+class _Batch:
+    '''
+    Activations for one user that are committed together.
+    '''
+    __slots__ = ('character_ids', 'done', 'characters', 'failed', 'error', 'error_status',
+                 'prefetched')
+
+    def __init__(self, prefetched: Optional[BlobRef] = None):
+        self.character_ids: Set[str] = set()
+        # The leader's queued read of the characters blob, if it made one
+        self.prefetched = prefetched
+        self.done = threading.Event()
+        self.characters: Optional[dict] = None
+        self.failed: Dict[str, str] = {}
+        self.error: Optional[str] = None
+        self.error_status = 500
+
+
+class ActivationCoalescer:
+    '''
+    Per-user group commit of character activations.
+    '''
+
+    def __init__(self, max_cas_retries: int = ACTIVATION_MAX_CAS_RETRIES):
+        self.max_cas_retries = max_cas_retries
+        self._lock = threading.Lock()
+        # Batch per user that is still accepting activations
+        self._open: Dict[str, _Batch] = {}
+        # Per-user commit lock and the number of batches holding a reference to it
+        self._user_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+        self._stats = {'activations': 0, 'batches': 0, 'cas_conflicts': 0}
+
+    def activate(self, user_id: str, character_id: str,
+                 prefetched: Optional[BlobRef] = None) -> dict:
+        '''
+        Log the character in and store its token in the user's characters blob.
+        Returns the characters blob as written. Raises ActivationError on failure.
+
+        `prefetched` is the request's queued load of the characters blob. A
+        leader uses it for its first write attempt instead of reading again.
+        '''
+        leader = False
+        with self._lock:
+            self._stats['activations'] += 1
+            batch = self._open.get(user_id)
+            if batch is None:
+                batch = _Batch(prefetched)
+                self._open[user_id] = batch
+                user_lock, refs = self._user_locks.get(
+                    user_id, (threading.Lock(), 0))
+                self._user_locks[user_id] = (user_lock, refs + 1)
+                leader = True
+            batch.character_ids.add(character_id)
+        if leader:
+            self._lead(user_id, batch, user_lock)
+        else:
+            # The leader's Snap calls are bounded by its own deadline; stop
+            # waiting for them once this request's deadline has passed
+            while not batch.done.wait(deadline.remaining()):
+                deadline.check()
+
+        if batch.error is not None:
+            raise ActivationError(batch.error, batch.error_status)
+        if character_id in batch.failed:
+            raise ActivationError('Server Exception: ' + batch.failed[character_id])
+        return batch.characters
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _lead(self, user_id: str, batch: _Batch, user_lock: threading.Lock):
+        try:
+            if not user_lock.acquire(blocking=False):
+                # An earlier batch for this user is still writing, so a blob
+                # read before it finishes would only cause a CAS conflict
+                batch.prefetched = None
+                user_lock.acquire()
+            try:
+                with self._lock:
+                    # Seal the batch; later activations start the next one
+                    if self._open.get(user_id) is batch:
+                        del self._open[user_id]
+                    self._stats['batches'] += 1
+                try:
+                    self._commit(user_id, batch)
+                except NoBlobError:
+                    batch.error = 'No blob'
+                    batch.error_status = 400
+                except ApiException as e:
+                    batch.error = 'Server Exception: ' + str(e)
+                except Exception as e:
+                    batch.error = 'Server Error: ' + str(e)
+            finally:
+                user_lock.release()
+        finally:
+            batch.done.set()
+            with self._lock:
+                user_lock, refs = self._user_locks[user_id]
+                if refs <= 1:
+                    del self._user_locks[user_id]
+                else:
+                    self._user_locks[user_id] = (user_lock, refs - 1)
+
+    def _commit(self, user_id: str, batch: _Batch):
+        # Read the blob before logging in, so a failed read costs no login
+        current = None
+        if batch.prefetched is not None:
+            try:
+                blob = batch.prefetched.get()
+                if blob is not None:
+                    current = self.decode(blob)
+            except ApiException:
+                pass
+        if current is None:
+            # Also when the batch read found no blob: only a single read tells
+            # a missing blob from an empty response
+            current = self.read(snapser_clients.storage_api(), user_id)
+
+        character_ids: List[str] = sorted(batch.character_ids)
+        delta, batch.failed = token_refresh.login_characters(
+            user_id, character_ids)
+        if not delta:
+            # Nothing to write; every caller gets its own login error
+            return
+        batch.characters = self.merge(user_id, delta, current)
+
+    def merge(self, user_id: str, delta: Dict[str, dict],
+              current: Optional[Tuple[str, dict]] = None) -> dict:
+        '''
+        Write character records into the user's characters blob with a bounded
+        CAS retry loop that re-applies only `delta`. `current` is an optional
+        (cas, characters) pair the caller has already read.
+        Returns the characters blob as written.
+        '''
+        storage_api_instance = snapser_clients.storage_api()
+        attempt = 0
+        while True:
+            if current is None:
+                current = self.read(storage_api_instance, user_id)
+            cas, characters = current
+            current = None
+            if 'characters' not in characters:
+                characters['characters'] = {}
+            characters['characters'].update(delta)
+            try:
+                storage_api_response = storage_api_instance.storage_internal_replace_blob(
+                    access_type='private',
+                    blob_key='characters',
+                    owner_id=user_id,
+                    gateway=os.environ['SNAPEND_INTERNAL_HEADER'],
+                    body={
+                        "value": blob_codec.dumps(characters),
+                        "ttl": 0,
+                        "create": True,
+                        "cas": cas
+                    }
+                )
+            except ApiException as e:
+                if e.status not in CAS_CONFLICT_STATUSES or attempt >= self.max_cas_retries:
+                    raise
+                attempt += 1
+                with self._lock:
+                    self._stats['cas_conflicts'] += 1
+                continue
+            if storage_api_response is None:
+                raise ApiException(status=500, reason='Server Error')
+            return characters
+
+    @staticmethod
+    def read(storage_api_instance, user_id: str) -> Tuple[str, dict]:
+        '''
+        Return (cas, characters) for the user, or a fresh blob if there is none.
+        Raises NoBlobError when Storage sends back an empty response.
+        '''
+        try:
+            storage_api_response = storage_api_instance.storage_internal_get_blob(
+                access_type='private',
+                blob_key='characters',
+                owner_id=user_id,
+                gateway=os.environ['SNAPEND_INTERNAL_HEADER']
+            )
+        except NotFoundException:
+            # You come here when the doc is not even present
+            return NEW_BLOB_CAS, {'characters': {}}
+        if storage_api_response is None:
+            raise NoBlobError()
+        return storage_api_response.cas, blob_codec.loads(storage_api_response.value)
+
+    @staticmethod
+    def decode(blob: Tuple[str, str]) -> Tuple[str, dict]:
+        '''
+        Turn a (cas, value) pair from the blob loader into what `read` returns.
+        '''
+        return blob[0], blob_codec.loads(blob[1])
+
+
+activations = ActivationCoalescer()
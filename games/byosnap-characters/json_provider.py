@@ -0,0 +1,53 @@
+'''
+Flask JSON provider backed by `snapser.json_codec`.
+
+`jsonify`, `request.get_json` and the JSON responses use orjson when it is
+installed. The output matches Flask's default provider: sorted keys and the
+default handling of dates, decimals, UUIDs and dataclasses. The provider defers
+to Flask without orjson, in debug mode, or when the caller passes json.dumps
+keyword arguments, so pretty printing and options keep working.
+
+`raw_json_response` sends a value that is already JSON, such as a Storage blob
+value, without decoding and re-encoding it.
+'''
+from typing import Union
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+from snapser import json_codec
+
+
+class CodecJSONProvider(DefaultJSONProvider):
+    '''
+    DefaultJSONProvider with the SDK JSON codec doing the work.
+    '''
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs or json_codec.BACKEND != 'orjson':
+            return super().dumps(obj, **kwargs)
+        return json_codec.dumps(obj, default=self.default,
+                                sort_keys=self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs or json_codec.BACKEND != 'orjson':
+            return super().loads(s, **kwargs)
+        return json_codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        if json_codec.BACKEND != 'orjson' or self.compact is False or \
+                (self.compact is None and self._app.debug):
+            # No orjson, or indented output for development
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            json_codec.dumps(obj, default=self.default, sort_keys=self.sort_keys) + b'\n',
+            mimetype=self.mimetype)
+
+
+def raw_json_response(value: Union[str, bytes], status: int = 200):
+    '''
+    Respond with an already serialized JSON document as is.
+    '''
+    return current_app.response_class(
+        value, status=status, mimetype=current_app.json.mimetype)
@@ -0,0 +1,106 @@
+'''
+Per-request deadlines for the Snap calls a handler makes.
+
+A gunicorn worker is blocked for as long as a handler waits on Storage or Auth.
+Every request therefore gets a deadline when it arrives:
+  - DEADLINE_DEFAULT_SECONDS, or the value of `@request_deadline(seconds)` on
+    the route,
+  - shortened by the caller's `Request-Timeout-Ms` header (milliseconds left),
+    when it is sent.
+While the handler runs, every `snapser` SDK call uses the time that is left
+as its timeout, and fails at once with DeadlineExceededException once it has
+passed (see `snapser.deadline`). A request that arrives with no time
+left is answered with 504 without running the handler.
+
+`stats()` counts, per route, the requests that ran past their deadline.
+
+Tuning (environment variables):
+  - DEADLINE_DEFAULT_SECONDS: deadline of a route without its own (default 10)
+'''
+import os
+import threading
+from typing import Dict
+
+from flask import Flask, current_app, g, jsonify, make_response, request
+
+from snapser import deadline
+from snapser.exceptions import DeadlineExceededException
+
+
+# Constants
+DEADLINE_DEFAULT_SECONDS = float(os.getenv('DEADLINE_DEFAULT_SECONDS', '10'))
+
+_exceeded: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def request_deadline(seconds: float):
+    '''
+    Decorator: set the deadline of a route. Place it under `@app.route`.
+    '''
+    def decorator(f):
+        f.deadline_seconds = seconds
+        return f
+    return decorator
+
+
+def _route() -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _count_exceeded():
+    route = _route()
+    with _lock:
+        _exceeded[route] = _exceeded.get(route, 0) + 1
+
+
+def _deadline_exceeded_response():
+    return make_response(jsonify({'error_message': 'Deadline exceeded'}), 504)
+
+
+def _start_deadline():
+    view = current_app.view_functions.get(request.endpoint)
+    seconds = getattr(view, 'deadline_seconds', DEADLINE_DEFAULT_SECONDS)
+    header = request.headers.get(deadline.DEADLINE_HEADER)
+    if header:
+        try:
+            seconds = min(seconds, float(header) / 1000)
+        except ValueError:
+            pass
+    if seconds <= 0:
+        # The caller has already given up
+        _count_exceeded()
+        return _deadline_exceeded_response()
+    g.deadline_token = deadline.start(seconds)
+    return None
+
+
+def _end_deadline(exc):
+    token = g.pop('deadline_token', None)
+    if token is None:
+        return
+    current = deadline.current()
+    if current.exceeded or current.expired():
+        _count_exceeded()
+    deadline.reset(token)
+
+
+def _handle_deadline_exceeded(e):
+    return _deadline_exceeded_response()
+
+
+def init_app(app: Flask):
+    '''
+    Register the deadline hooks on the app.
+    '''
+    app.before_request(_start_deadline)
+    app.teardown_request(_end_deadline)
+    app.register_error_handler(DeadlineExceededException, _handle_deadline_exceeded)
+
+
+def stats() -> Dict[str, int]:
+    '''
+    Requests that ran past their deadline in this worker, per route.
+    '''
+    with _lock:
+        return dict(_exceeded)
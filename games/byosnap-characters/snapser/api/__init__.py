@@ -1,8 +1,29 @@
 # flake8: noqa
 
-# import apis into api package
-from snapser.api.auth_service_api import AuthServiceApi
-from snapser.api.statistics_service_api import StatisticsServiceApi
-from snapser.api.storage_service_api import StorageServiceApi
-from snapser.api.default_api import DefaultApi
+import importlib
 
+# Imported on first access by `__getattr__` below
+_LAZY_IMPORTS = {
+    # apis
+    'AuthServiceApi': 'snapser.api.auth_service_api',
+    'StatisticsServiceApi': 'snapser.api.statistics_service_api',
+    'StorageServiceApi': 'snapser.api.storage_service_api',
+    'DefaultApi': 'snapser.api.default_api',
+    'AsyncAuthServiceApi': 'snapser.api.async_auth_service_api',
+    'AsyncStorageServiceApi': 'snapser.api.async_storage_service_api',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    # Cache it so later lookups do not come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
@@ -13,6 +13,7 @@
 
 
 import atexit
+import contextvars
 import datetime
 from dateutil.parser import parse
 import json
@@ -20,14 +21,15 @@ import mimetypes
 from multiprocessing.pool import ThreadPool
 import os
 import re
+import sys
 import tempfile
+import time
 
 from urllib.parse import quote
 
 from snapser.configuration import Configuration
 from snapser.api_response import ApiResponse
-import snapser.models
-from snapser import rest
+from snapser import deserializers, instrumentation, json_codec, rest
 from snapser.exceptions import ApiValueError, ApiException
 
 
@@ -47,6 +49,8 @@ class ApiClient:
         to the API
     :param pool_threads: The number of threads to use for async requests
         to the API. More threads means more concurrent API requests.
+    :param trusted_responses: Build response models without pydantic
+        validation. See `snapser.deserializers`.
     """
 
     PRIMITIVE_TYPES = (float, bool, bytes, str, int)
@@ -63,12 +67,13 @@ class ApiClient:
     _pool = None
 
     def __init__(self, configuration=None, header_name=None, header_value=None,
-                 cookie=None, pool_threads=1) -> None:
+                 cookie=None, pool_threads=1, trusted_responses=False) -> None:
         # use default configuration if none is provided
         if configuration is None:
             configuration = Configuration.get_default()
         self.configuration = configuration
         self.pool_threads = pool_threads
+        self.trusted_responses = trusted_responses
 
         self.rest_client = rest.RESTClientObject(configuration)
         self.default_headers = {}
@@ -148,8 +153,50 @@ class ApiClient:
             files=None, response_types_map=None, auth_settings=None,
             _return_http_data_only=None, collection_formats=None,
             _preload_content=True, _request_timeout=None, _host=None,
-            _request_auth=None):
+            _request_auth=None, _operation_id=None):
 
+        started = time.perf_counter()
+        try:
+            url, query_params, header_params, post_params, body = \
+                self._prepare_request(
+                    resource_path, method, path_params, query_params,
+                    header_params, body, post_params, files, auth_settings,
+                    collection_formats, _host, _request_auth)
+
+            try:
+                # perform request and return response
+                response_data = self.request(
+                    method, url,
+                    query_params=query_params,
+                    headers=header_params,
+                    post_params=post_params, body=body,
+                    _preload_content=_preload_content,
+                    _request_timeout=_request_timeout)
+            except ApiException as e:
+                if e.body:
+                    e.body = e.body.decode('utf-8')
+                raise e
+
+            result = self._handle_response(
+                response_data, response_types_map, _return_http_data_only,
+                _preload_content)
+        except Exception as e:
+            instrumentation.operation(_operation_id, instrumentation.status_of(e),
+                                      started)
+            raise
+        instrumentation.operation(_operation_id, response_data.status, started)
+        return result
+
+    def _prepare_request(self, resource_path, method, path_params,
+                         query_params, header_params, body, post_params,
+                         files, auth_settings, collection_formats, _host,
+                         _request_auth):
+        """Builds the url, headers and body of a request.
+
+        Shared by the blocking client and `AsyncApiClient`.
+
+        :return: tuple (url, query_params, header_params, post_params, body)
+        """
         config = self.configuration
 
         # header parameters
@@ -206,20 +253,11 @@ class ApiClient:
                                                      collection_formats)
             url += "?" + url_query
 
-        try:
-            # perform request and return response
-            response_data = self.request(
-                method, url,
-                query_params=query_params,
-                headers=header_params,
-                post_params=post_params, body=body,
-                _preload_content=_preload_content,
-                _request_timeout=_request_timeout)
-        except ApiException as e:
-            if e.body:
-                e.body = e.body.decode('utf-8')
-            raise e
+        return url, query_params, header_params, post_params, body
 
+    def _handle_response(self, response_data, response_types_map,
+                         _return_http_data_only, _preload_content):
+        """Decodes a response into the return value of `call_api`."""
         self.last_response = response_data
 
         return_data = None # assuming derialization is not needed
@@ -312,10 +350,12 @@ class ApiClient:
 
         # fetch data from response object
         try:
-            data = json.loads(response.data)
+            data = json_codec.loads(response.data)
         except ValueError:
             data = response.data
 
+        if self.trusted_responses and isinstance(response_type, str):
+            return deserializers.deserialize_trusted(data, response_type)
         return self.__deserialize(data, response_type)
 
     def __deserialize(self, data, klass):
@@ -330,21 +370,8 @@ class ApiClient:
             return None
 
         if isinstance(klass, str):
-            if klass.startswith('List['):
-                sub_kls = re.match(r'List\[(.*)]', klass).group(1)
-                return [self.__deserialize(sub_data, sub_kls)
-                        for sub_data in data]
-
-            if klass.startswith('Dict['):
-                sub_kls = re.match(r'Dict\[([^,]*), (.*)]', klass).group(2)
-                return {k: self.__deserialize(v, sub_kls)
-                        for k, v in data.items()}
-
-            # convert str to class
-            if klass in self.NATIVE_TYPES_MAPPING:
-                klass = self.NATIVE_TYPES_MAPPING[klass]
-            else:
-                klass = getattr(snapser.models, klass)
+            # Type strings are compiled once into a decoder tree
+            return deserializers.deserialize_validated(data, klass)
 
         if klass in self.PRIMITIVE_TYPES:
             return self.__deserialize_primitive(data, klass)
@@ -405,6 +432,8 @@ class ApiClient:
             If parameter async_req is False or missing,
             then the method will return the response directly.
         """
+        _operation_id = instrumentation.operation_id(
+            sys._getframe(1), method, resource_path)
         if not async_req:
             return self.__call_api(resource_path, method,
                                    path_params, query_params, header_params,
@@ -412,20 +441,18 @@ class ApiClient:
                                    response_types_map, auth_settings,
                                    _return_http_data_only, collection_formats,
                                    _preload_content, _request_timeout, _host,
-                                   _request_auth)
-
-        return self.pool.apply_async(self.__call_api, (resource_path,
-                                                       method, path_params,
-                                                       query_params,
-                                                       header_params, body,
-                                                       post_params, files,
-                                                       response_types_map,
-                                                       auth_settings,
-                                                       _return_http_data_only,
-                                                       collection_formats,
-                                                       _preload_content,
-                                                       _request_timeout,
-                                                       _host, _request_auth))
+                                   _request_auth, _operation_id)
+
+        # The copied context carries the caller's deadline to the pool thread
+        return self.pool.apply_async(contextvars.copy_context().run,
+                                     (self.__call_api, resource_path,
+                                      method, path_params, query_params,
+                                      header_params, body, post_params,
+                                      files, response_types_map,
+                                      auth_settings, _return_http_data_only,
+                                      collection_formats, _preload_content,
+                                      _request_timeout, _host,
+                                      _request_auth, _operation_id))
 
     def request(self, method, url, query_params=None, headers=None,
                 post_params=None, body=None, _preload_content=True,
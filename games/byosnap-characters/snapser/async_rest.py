@@ -0,0 +1,318 @@
+# coding: utf-8
+
+"""
+    asyncio REST transport for `AsyncApiClient`, backed by aiohttp.
+
+    Mirrors `snapser.rest`: the same request methods, the same
+    ApiException subclasses for non-2xx responses, and a RESTResponse with the
+    body in `data`. The aiohttp session (and its keep-alive connection pool) is
+    created on the first request, inside the running event loop, and is bound
+    to that loop.
+
+    aiohttp is optional; it is only needed when an AsyncApiClient is created.
+"""  # noqa: E501
+
+
+import asyncio
+import io
+import logging
+import re
+import ssl
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - depends on the environment
+    aiohttp = None
+
+from snapser import deadline, instrumentation, json_codec, resilience
+from snapser.exceptions import ApiException, ApiValueError
+from snapser.rest import raise_for_status
+
+logger = logging.getLogger(__name__)
+
+
+class RESTResponse(io.IOBase):
+
+    def __init__(self, resp, data) -> None:
+        self.aiohttp_response = resp
+        self.status = resp.status
+        self.reason = resp.reason
+        self.data = data
+
+    def getheaders(self):
+        """Returns a CIMultiDictProxy of the response headers."""
+        return self.aiohttp_response.headers
+
+    def getheader(self, name, default=None):
+        """Returns a given response header."""
+        return self.aiohttp_response.headers.get(name, default)
+
+
+async def _on_request_start(session, context, params):
+    context.opened = False
+
+
+async def _on_connection_create_end(session, context, params):
+    context.opened = True
+
+
+async def _on_request_end(session, context, params):
+    if instrumentation.enabled():
+        instrumentation.connection(str(params.url.origin()),
+                                   not context.opened)
+
+
+class RESTClientObject:
+
+    def __init__(self, configuration, maxsize=None) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncApiClient requires aiohttp: pip install 'aiohttp >= 3.8'")
+
+        # maxsize is the number of requests to host that are allowed in parallel  # noqa: E501
+        if maxsize is None:
+            if configuration.connection_pool_maxsize is not None:
+                maxsize = configuration.connection_pool_maxsize
+            else:
+                maxsize = 100
+        self.maxsize = maxsize
+
+        # https
+        self.ssl_context = ssl.create_default_context(
+            cafile=configuration.ssl_ca_cert)
+        if configuration.cert_file:
+            self.ssl_context.load_cert_chain(
+                configuration.cert_file, keyfile=configuration.key_file)
+        if not configuration.verify_ssl:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+
+        self.proxy = configuration.proxy
+        self.proxy_headers = configuration.proxy_headers
+        self.pool_manager = None
+
+    def _session(self):
+        # Created lazily: aiohttp sessions must be built inside the event loop
+        if self.pool_manager is None or self.pool_manager.closed:
+            connector = aiohttp.TCPConnector(limit=self.maxsize,
+                                             ssl=self.ssl_context)
+            # Tells instrumentation whether a request opened a connection
+            trace = aiohttp.TraceConfig()
+            trace.on_request_start.append(_on_request_start)
+            trace.on_connection_create_end.append(_on_connection_create_end)
+            trace.on_request_end.append(_on_request_end)
+            self.pool_manager = aiohttp.ClientSession(
+                connector=connector, trace_configs=[trace])
+        return self.pool_manager
+
+    async def close(self):
+        if self.pool_manager is not None:
+            await self.pool_manager.close()
+            self.pool_manager = None
+
+    async def request(self, method, url, query_params=None, headers=None,
+                      body=None, post_params=None, _preload_content=True,
+                      _request_timeout=None):
+        """Execute request
+
+        :param method: http request method
+        :param url: http request url
+        :param query_params: query parameters in the url
+        :param headers: http request headers
+        :param body: request json body, for `application/json`
+        :param post_params: request post parameters,
+                            `application/x-www-form-urlencoded`
+                            and `multipart/form-data`
+        :param _preload_content: accepted for compatibility with the blocking
+                                 transport. The body is always read, so the
+                                 connection goes back to the pool.
+        :param _request_timeout: timeout setting for this request. If one
+                                 number provided, it will be total request
+                                 timeout. It can also be a pair (tuple) of
+                                 (connection, read) timeouts.
+        """
+        method = method.upper()
+        assert method in ['GET', 'HEAD', 'DELETE', 'POST', 'PUT',
+                          'PATCH', 'OPTIONS']
+
+        if post_params and body:
+            raise ApiValueError(
+                "body parameter cannot be used with post_params parameter."
+            )
+
+        post_params = post_params or {}
+        headers = headers or {}
+        # url already contains the URL query string, so query_params is
+        # ignored here as it is in the blocking transport
+
+        args = {
+            "method": method,
+            "url": url,
+            "headers": headers
+        }
+
+        if _request_timeout:
+            if isinstance(_request_timeout, (int, float)):
+                args["timeout"] = aiohttp.ClientTimeout(total=_request_timeout)
+            elif (isinstance(_request_timeout, tuple) and
+                  len(_request_timeout) == 2):
+                args["timeout"] = aiohttp.ClientTimeout(
+                    sock_connect=_request_timeout[0],
+                    sock_read=_request_timeout[1])
+
+        if self.proxy:
+            args["proxy"] = self.proxy
+        if self.proxy_headers:
+            args["proxy_headers"] = self.proxy_headers
+
+        # For `POST`, `PUT`, `PATCH`, `OPTIONS`, `DELETE`
+        if method in ['POST', 'PUT', 'PATCH', 'OPTIONS', 'DELETE']:
+            # no content type provided or payload is json
+            if not headers.get('Content-Type') or re.search('json', headers['Content-Type'], re.IGNORECASE):
+                if body is not None:
+                    args["data"] = json_codec.dumps(body)
+                    headers.setdefault('Content-Type', 'application/json')
+            elif headers['Content-Type'] == 'application/x-www-form-urlencoded':  # noqa: E501
+                args["data"] = aiohttp.FormData(post_params)
+            elif headers['Content-Type'] == 'multipart/form-data':
+                # must del headers['Content-Type'], or the correct
+                # Content-Type which generated by aiohttp will be
+                # overwritten.
+                del headers['Content-Type']
+                data = aiohttp.FormData()
+                for param in post_params:
+                    k, v = param
+                    if isinstance(v, tuple) and len(v) == 3:
+                        data.add_field(k,
+                                       value=v[1],
+                                       filename=v[0],
+                                       content_type=v[2])
+                    else:
+                        data.add_field(k, v)
+                args["data"] = data
+            # Pass a `bytes` parameter directly in the body to support
+            # other content types than Json when `body` argument is provided
+            # in serialized form
+            elif isinstance(body, str) or isinstance(body, bytes):
+                args["data"] = body
+            else:
+                # Cannot generate the request from given parameters
+                msg = """Cannot prepare a request message for provided
+                         arguments. Please check that your arguments match
+                         declared content type."""
+                raise ApiException(status=0, reason=msg)
+
+        async def send():
+            # Each attempt is bounded by the current deadline
+            deadline.check()
+            attempt = dict(args, headers=deadline.headers(headers))
+            left = deadline.remaining()
+            if left is not None:
+                left = max(left, 0.001)
+                timeout = args.get("timeout")
+                attempt["timeout"] = aiohttp.ClientTimeout(
+                    total=left if timeout is None or timeout.total is None
+                    else min(left, timeout.total),
+                    sock_connect=timeout.sock_connect if timeout else None,
+                    sock_read=timeout.sock_read if timeout else None)
+            try:
+                async with self._session().request(**attempt) as resp:
+                    r = RESTResponse(resp, await resp.read())
+            except asyncio.TimeoutError as e:
+                error = deadline.exceeded(e)
+                if error is None:
+                    raise
+                raise error from e
+            if instrumentation.enabled():
+                data = attempt.get("data")
+                instrumentation.transfer(
+                    str(resp.url.origin()),
+                    len(data) if isinstance(data, (bytes, str)) else 0,
+                    len(r.data))
+            return r
+
+        try:
+            # A FormData body can only be sent once, so it is never retried
+            r = await resilience.call_async(
+                method, url, send,
+                retry=not isinstance(args.get("data"), aiohttp.FormData))
+        except aiohttp.ClientSSLError as e:
+            msg = "{0}\n{1}".format(type(e).__name__, str(e))
+            raise ApiException(status=0, reason=msg)
+
+        # log response body
+        logger.debug("response body: %s", r.data)
+
+        raise_for_status(r)
+
+        return r
+
+    async def get_request(self, url, headers=None, query_params=None,
+                          _preload_content=True, _request_timeout=None):
+        return (await self.request("GET", url,
+                                   headers=headers,
+                                   _preload_content=_preload_content,
+                                   _request_timeout=_request_timeout,
+                                   query_params=query_params))
+
+    async def head_request(self, url, headers=None, query_params=None,
+                           _preload_content=True, _request_timeout=None):
+        return (await self.request("HEAD", url,
+                                   headers=headers,
+                                   _preload_content=_preload_content,
+                                   _request_timeout=_request_timeout,
+                                   query_params=query_params))
+
+    async def options_request(self, url, headers=None, query_params=None,
+                              post_params=None, body=None,
+                              _preload_content=True, _request_timeout=None):
+        return (await self.request("OPTIONS", url,
+                                   headers=headers,
+                                   query_params=query_params,
+                                   post_params=post_params,
+                                   _preload_content=_preload_content,
+                                   _request_timeout=_request_timeout,
+                                   body=body))
+
+    async def delete_request(self, url, headers=None, query_params=None,
+                             body=None, _preload_content=True,
+                             _request_timeout=None):
+        return (await self.request("DELETE", url,
+                                   headers=headers,
+                                   query_params=query_params,
+                                   _preload_content=_preload_content,
+                                   _request_timeout=_request_timeout,
+                                   body=body))
+
+    async def post_request(self, url, headers=None, query_params=None,
+                           post_params=None, body=None, _preload_content=True,
+                           _request_timeout=None):
+        return (await self.request("POST", url,
+                                   headers=headers,
+                                   query_params=query_params,
+                                   post_params=post_params,
+                                   _preload_content=_preload_content,
+                                   _request_timeout=_request_timeout,
+                                   body=body))
+
+    async def put_request(self, url, headers=None, query_params=None,
+                          post_params=None, body=None, _preload_content=True,
+                          _request_timeout=None):
+        return (await self.request("PUT", url,
+                                   headers=headers,
+                                   query_params=query_params,
+                                   post_params=post_params,
+                                   _preload_content=_preload_content,
+                                   _request_timeout=_request_timeout,
+                                   body=body))
+
+    async def patch_request(self, url, headers=None, query_params=None,
+                            post_params=None, body=None, _preload_content=True,
+                            _request_timeout=None):
+        return (await self.request("PATCH", url,
+                                   headers=headers,
+                                   query_params=query_params,
+                                   post_params=post_params,
+                                   _preload_content=_preload_content,
+                                   _request_timeout=_request_timeout,
+                                   body=body))
@@ -0,0 +1,137 @@
+# coding: utf-8
+
+"""
+    Deadlines for the SDK calls made while handling a request.
+
+    A deadline is stored in a context variable. Every request sent by the REST
+    transports while a deadline is set:
+      - fails at once with DeadlineExceededException if the deadline has
+        already passed,
+      - gets the time that is left as its timeout (or the explicit
+        `_request_timeout`, if that is shorter),
+      - sends the time that is left to the Snap in the DEADLINE_HEADER header,
+        so a Snap that reads it can stop at the same point.
+    A timeout that fires once the deadline has passed is raised as
+    DeadlineExceededException too, and retries are not started if their
+    backoff would run past the deadline.
+
+        with deadline.scope(2.5):
+            api.storage_get_blob(...)
+
+    Context variables follow asyncio tasks. Calls made with `async_req=True`
+    run in the SDK thread pool with a copy of the caller's context.
+"""  # noqa: E501
+
+
+import contextlib
+import contextvars
+import time
+
+import urllib3
+
+from snapser.exceptions import DeadlineExceededException
+
+
+# Remaining milliseconds of the caller's deadline
+DEADLINE_HEADER = 'Request-Timeout-Ms'
+
+_current = contextvars.ContextVar('snapser_deadline', default=None)
+
+
+class Deadline:
+    """A point in time (time.monotonic) by which the work must be done."""
+
+    __slots__ = ('expires_at', 'exceeded')
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+        # Set when a call was stopped or timed out because of this deadline
+        self.exceeded = False
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+def start(seconds):
+    """Set a deadline `seconds` from now for the current context. A deadline
+    that is already set and ends sooner is kept. Returns the token for
+    `reset`."""
+    parent = _current.get()
+    deadline = Deadline(seconds)
+    if parent is not None and parent.expires_at < deadline.expires_at:
+        deadline = parent
+    return _current.set(deadline)
+
+
+def reset(token):
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def scope(seconds):
+    """Run the enclosed SDK calls under a deadline."""
+    token = start(seconds)
+    try:
+        yield _current.get()
+    finally:
+        reset(token)
+
+
+def current():
+    """The Deadline of the current context, or None."""
+    return _current.get()
+
+
+def remaining():
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def check():
+    """Raise DeadlineExceededException if the current deadline has passed."""
+    deadline = _current.get()
+    if deadline is not None and deadline.expired():
+        deadline.exceeded = True
+        raise DeadlineExceededException()
+
+
+def exceeded(error):
+    """Return DeadlineExceededException for a timeout `error` when the
+    current deadline has passed, None otherwise."""
+    deadline = _current.get()
+    if deadline is None or not deadline.expired():
+        return None
+    deadline.exceeded = True
+    return DeadlineExceededException(
+        reason="Deadline exceeded: {0}".format(error))
+
+
+def timeout(request_timeout):
+    """Bound a urllib3 timeout (None, a number or a Timeout) by the current
+    deadline."""
+    left = remaining()
+    if left is None:
+        return request_timeout
+    # check() has just passed, but the clock kept running
+    left = max(left, 0.001)
+    if request_timeout is None:
+        return urllib3.Timeout(total=left)
+    if isinstance(request_timeout, urllib3.Timeout):
+        if request_timeout.total is not None:
+            left = min(left, request_timeout.total)
+        return urllib3.Timeout(total=left,
+                               connect=request_timeout._connect,
+                               read=request_timeout._read)
+    return urllib3.Timeout(total=min(left, request_timeout))
+
+
+def headers(header_params):
+    """Add the remaining time to outgoing headers, when a deadline is set."""
+    left = remaining()
+    if left is not None:
+        header_params[DEADLINE_HEADER] = str(max(0, int(left * 1000)))
+    return header_params
@@ -0,0 +1,226 @@
+# coding: utf-8
+
+"""
+    Compiled response deserializers.
+
+    Each response type string (e.g. 'List[StorageGetBlobResponse]') is parsed
+    once and compiled into a tree of decoder closures, so repeated responses
+    skip the regexes and the `snapser.models` lookups.
+
+    `validated_decoder` is what `ApiClient.deserialize` uses by default: its
+    leaves are the generated `from_dict` methods, so pydantic still validates
+    every model. Responses from the Snaps are produced by the same OpenAPI
+    document as the models, so a client can opt in to trusting them
+    (`ApiClient(trusted_responses=True)`). `trusted_decoder` then builds models
+    with pydantic's `construct()` semantics: no validation, with nested models,
+    enums and integer fields still converted the same way `from_dict` does.
+"""  # noqa: E501
+
+
+import enum
+import functools
+import re
+
+from dateutil.parser import parse
+from pydantic import BaseModel, ConstrainedInt
+from pydantic.fields import SHAPE_DICT, SHAPE_LIST, SHAPE_SINGLETON
+
+import snapser.models
+from snapser.exceptions import ApiException
+
+
+_LIST_TYPE = re.compile(r'List\[(.*)]')
+_DICT_TYPE = re.compile(r'Dict\[([^,]*), (.*)]')
+
+
+def _identity(value):
+    return value
+
+
+def _primitive(klass):
+    def decode(value):
+        try:
+            return klass(value)
+        except UnicodeEncodeError:
+            return str(value)
+        except TypeError:
+            return value
+    return decode
+
+
+def _to_int(value):
+    # grpc-gateway sends int64 fields as JSON strings
+    return value if type(value) is int else int(value)
+
+
+def _list_of(decode_item):
+    def decode(value):
+        return [decode_item(item) if item is not None else None for item in value]
+    return decode
+
+
+def _dict_of(decode_item):
+    def decode(value):
+        return {k: decode_item(v) if v is not None else None for k, v in value.items()}
+    return decode
+
+
+def _date(value):
+    try:
+        return parse(value).date()
+    except ValueError:
+        raise ApiException(
+            status=0,
+            reason="Failed to parse `{0}` as date object".format(value)
+        )
+
+
+def _datetime(value):
+    try:
+        return parse(value)
+    except ValueError:
+        raise ApiException(
+            status=0,
+            reason="Failed to parse `{0}` as datetime object".format(value)
+        )
+
+
+_NATIVE_DECODERS = {
+    'int': _primitive(int),
+    'long': _primitive(int),
+    'float': _primitive(float),
+    'str': _primitive(str),
+    'bool': _primitive(bool),
+    'bytes': _primitive(bytes),
+    'date': _date,
+    'datetime': _datetime,
+    'object': _identity,
+}
+
+
+def _compile(response_type, compile_item, model_decoder):
+    """Parse a type string once; `compile_item` compiles the inner types."""
+    if response_type.startswith('List['):
+        return _list_of(compile_item(_LIST_TYPE.match(response_type).group(1)))
+    if response_type.startswith('Dict['):
+        return _dict_of(compile_item(_DICT_TYPE.match(response_type).group(2)))
+    if response_type in _NATIVE_DECODERS:
+        return _NATIVE_DECODERS[response_type]
+    klass = getattr(snapser.models, response_type)
+    if issubclass(klass, enum.Enum):
+        return klass
+    return model_decoder(klass)
+
+
+def _field_decoder(field):
+    """Decoder for one pydantic field, or None when the JSON value is used as is."""
+    decode_item = None
+    klass = field.type_
+    if isinstance(klass, type):
+        if issubclass(klass, BaseModel):
+            decode_item = _lazy_model_decoder(klass)
+        elif issubclass(klass, enum.Enum):
+            decode_item = klass
+        elif issubclass(klass, ConstrainedInt):
+            decode_item = _to_int
+    if decode_item is None:
+        return None
+    if field.shape == SHAPE_SINGLETON:
+        return decode_item
+    if field.shape == SHAPE_LIST:
+        return _list_of(decode_item)
+    if field.shape == SHAPE_DICT:
+        return _dict_of(decode_item)
+    return None
+
+
+def _lazy_model_decoder(klass):
+    # Resolved on first use so that recursive models compile
+    def decode(value):
+        return trusted_model_decoder(klass)(value)
+    return decode
+
+
+@functools.lru_cache(maxsize=None)
+def trusted_model_decoder(klass):
+    """Compile a dict -> model decoder that skips pydantic validation."""
+    if 'additional_properties' in klass.__fields__:
+        # Models with free-form properties keep the generated from_dict
+        return klass.from_dict
+
+    plan = []
+    for name, field in klass.__fields__.items():
+        plan.append((field.alias, name, _field_decoder(field)))
+    fields_set = frozenset(klass.__fields__)
+    has_private = bool(klass.__private_attributes__)
+
+    def decode(data):
+        if not isinstance(data, dict):
+            return klass.from_dict(data)
+        values = {}
+        for key, name, decode_value in plan:
+            value = data.get(key)
+            if value is not None and decode_value is not None:
+                value = decode_value(value)
+            values[name] = value
+        # Same as BaseModel.construct(), without re-walking the fields
+        model = klass.__new__(klass)
+        object.__setattr__(model, '__dict__', values)
+        object.__setattr__(model, '__fields_set__', set(fields_set))
+        if has_private:
+            model._init_private_attributes()
+        return model
+
+    return decode
+
+
+def _has_free_form_properties(klass, seen=None):
+    seen = seen if seen is not None else set()
+    if klass in seen:
+        return False
+    seen.add(klass)
+    if 'additional_properties' in klass.__fields__:
+        return True
+    return any(isinstance(field.type_, type) and issubclass(field.type_, BaseModel)
+               and _has_free_form_properties(field.type_, seen)
+               for field in klass.__fields__.values())
+
+
+@functools.lru_cache(maxsize=None)
+def validated_model_decoder(klass):
+    """Decoder for one model that keeps pydantic validation.
+
+    The generated `from_dict` validates every nested model and then the outer
+    `parse_obj` validates (copies) them again. `parse_obj` on the raw dict does
+    the same work in one pass. Only models that reach a free-form
+    `additional_properties` model (ProtobufAny) need `from_dict`.
+    """
+    if _has_free_form_properties(klass):
+        return klass.from_dict
+    return klass.parse_obj
+
+
+@functools.lru_cache(maxsize=None)
+def validated_decoder(response_type):
+    """Compile a response type string into a decoder that validates models."""
+    return _compile(response_type, validated_decoder, validated_model_decoder)
+
+
+@functools.lru_cache(maxsize=None)
+def trusted_decoder(response_type):
+    """Compile a response type string into a decoder that skips validation."""
+    return _compile(response_type, trusted_decoder, trusted_model_decoder)
+
+
+def deserialize_validated(data, response_type):
+    """Deserialize already JSON-decoded `data` through the generated models."""
+    if data is None:
+        return None
+    return validated_decoder(response_type)(data)
+
+
+def deserialize_trusted(data, response_type):
+    """Deserialize already JSON-decoded `data` without model validation."""
+    if data is None:
+        return None
+    return trusted_decoder(response_type)(data)
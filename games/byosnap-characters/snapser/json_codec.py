@@ -0,0 +1,45 @@
+# coding: utf-8
+
+"""
+    JSON codec shared by the REST transport and the ApiClient.
+
+    Uses orjson when it is installed and falls back to the standard library
+    otherwise. Set SNAPSER_JSON_CODEC=stdlib to force the fallback. `dumps`
+    always returns bytes, which is what urllib3 sends on the wire anyway.
+"""  # noqa: E501
+
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+BACKEND = 'orjson' if orjson is not None and \
+    os.getenv('SNAPSER_JSON_CODEC', 'auto').lower() != 'stdlib' else 'stdlib'
+
+if BACKEND == 'orjson':
+    # Datetimes go through `default` so callers keep control of their format
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(obj, default=None, sort_keys=False):
+    """Serialize `obj` to JSON bytes."""
+    if BACKEND == 'orjson':
+        option = _OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _OPTIONS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # e.g. integers wider than 64 bits; the stdlib handles them
+            pass
+    return json.dumps(obj, default=default, sort_keys=sort_keys).encode('utf-8')
+
+
+def loads(data):
+    """Deserialize JSON from str or bytes. Raises ValueError on invalid input."""
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
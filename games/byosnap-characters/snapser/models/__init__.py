@@ -12,99 +12,118 @@
     Do not edit the class manually.
 """  # noqa: E501
 
+import importlib
 
-# import models into model package
-from snapser.models.api_http_body import ApiHttpBody
-from snapser.models.auth_anon_login_request import AuthAnonLoginRequest
-from snapser.models.auth_anon_login_response import AuthAnonLoginResponse
-from snapser.models.auth_apple_login_request import AuthAppleLoginRequest
-from snapser.models.auth_apple_login_response import AuthAppleLoginResponse
-from snapser.models.auth_associate_logins_request import AuthAssociateLoginsRequest
-from snapser.models.auth_email_login_request import AuthEmailLoginRequest
-from snapser.models.auth_email_login_response import AuthEmailLoginResponse
-from snapser.models.auth_epic_login_request import AuthEpicLoginRequest
-from snapser.models.auth_epic_login_response import AuthEpicLoginResponse
-from snapser.models.auth_facebook_login_request import AuthFacebookLoginRequest
-from snapser.models.auth_facebook_login_response import AuthFacebookLoginResponse
-from snapser.models.auth_get_user_ids_by_login_ids_response import AuthGetUserIdsByLoginIdsResponse
-from snapser.models.auth_google_login_request import AuthGoogleLoginRequest
-from snapser.models.auth_google_login_response import AuthGoogleLoginResponse
-from snapser.models.auth_login_type_type import AuthLoginTypeType
-from snapser.models.auth_otp_request import AuthOtpRequest
-from snapser.models.auth_refresh_request import AuthRefreshRequest
-from snapser.models.auth_refresh_response import AuthRefreshResponse
-from snapser.models.auth_steam_login_request import AuthSteamLoginRequest
-from snapser.models.auth_steam_login_response import AuthSteamLoginResponse
-from snapser.models.auth_steam_open_id_login_request import AuthSteamOpenIdLoginRequest
-from snapser.models.auth_steam_session_ticket_login_request import AuthSteamSessionTicketLoginRequest
-from snapser.models.auth_user import AuthUser
-from snapser.models.auth_validate_request import AuthValidateRequest
-from snapser.models.auth_validate_response import AuthValidateResponse
-from snapser.models.auth_xbox_login_request import AuthXboxLoginRequest
-from snapser.models.auth_xbox_login_response import AuthXboxLoginResponse
-from snapser.models.batch_update_user_statistics_request import BatchUpdateUserStatisticsRequest
-from snapser.models.character_activation_response_schema import CharacterActivationResponseSchema
-from snapser.models.characters_response_schema import CharactersResponseSchema
-from snapser.models.error_response_schema import ErrorResponseSchema
-from snapser.models.increment_counter_request import IncrementCounterRequest
-from snapser.models.increment_user_statistic_request import IncrementUserStatisticRequest
-from snapser.models.insert_blob_request import InsertBlobRequest
-from snapser.models.protobuf_any import ProtobufAny
-from snapser.models.replace_blob_request import ReplaceBlobRequest
-from snapser.models.set_user_statistic_request import SetUserStatisticRequest
-from snapser.models.statistics_batch_get_user_statistics_response import StatisticsBatchGetUserStatisticsResponse
-from snapser.models.statistics_batch_get_user_statistics_single_response import StatisticsBatchGetUserStatisticsSingleResponse
-from snapser.models.statistics_batch_set_user_statistics_request import StatisticsBatchSetUserStatisticsRequest
-from snapser.models.statistics_batch_set_user_statistics_response import StatisticsBatchSetUserStatisticsResponse
-from snapser.models.statistics_batch_set_user_statistics_single_response import StatisticsBatchSetUserStatisticsSingleResponse
-from snapser.models.statistics_batch_update_user_statistics_item import StatisticsBatchUpdateUserStatisticsItem
-from snapser.models.statistics_batch_update_user_statistics_response import StatisticsBatchUpdateUserStatisticsResponse
-from snapser.models.statistics_get_user_statistics_request import StatisticsGetUserStatisticsRequest
-from snapser.models.statistics_get_user_statistics_response import StatisticsGetUserStatisticsResponse
-from snapser.models.statistics_is_user_in_segment_response import StatisticsIsUserInSegmentResponse
-from snapser.models.statistics_multi_user_statistics import StatisticsMultiUserStatistics
-from snapser.models.statistics_set_user_statistic_request import StatisticsSetUserStatisticRequest
-from snapser.models.statistics_user_statistic import StatisticsUserStatistic
-from snapser.models.storage_append_blob_and_owner import StorageAppendBlobAndOwner
-from snapser.models.storage_batch_get_append_blobs_response import StorageBatchGetAppendBlobsResponse
-from snapser.models.storage_batch_get_append_blobs_single_response import StorageBatchGetAppendBlobsSingleResponse
-from snapser.models.storage_batch_get_blobs_response import StorageBatchGetBlobsResponse
-from snapser.models.storage_batch_get_blobs_single_response import StorageBatchGetBlobsSingleResponse
-from snapser.models.storage_batch_get_counters_response import StorageBatchGetCountersResponse
-from snapser.models.storage_batch_get_counters_single_response import StorageBatchGetCountersSingleResponse
-from snapser.models.storage_batch_increment_counter_request import StorageBatchIncrementCounterRequest
-from snapser.models.storage_batch_increment_counter_response import StorageBatchIncrementCounterResponse
-from snapser.models.storage_batch_insert_blob_request import StorageBatchInsertBlobRequest
-from snapser.models.storage_batch_insert_blob_response import StorageBatchInsertBlobResponse
-from snapser.models.storage_batch_replace_blob_request import StorageBatchReplaceBlobRequest
-from snapser.models.storage_batch_replace_blob_response import StorageBatchReplaceBlobResponse
-from snapser.models.storage_batch_single_blob_response import StorageBatchSingleBlobResponse
-from snapser.models.storage_batch_single_increment_counter_response import StorageBatchSingleIncrementCounterResponse
-from snapser.models.storage_batch_single_replace_blob_response import StorageBatchSingleReplaceBlobResponse
-from snapser.models.storage_batch_single_update_append_blob_response import StorageBatchSingleUpdateAppendBlobResponse
-from snapser.models.storage_batch_update_append_blob_request import StorageBatchUpdateAppendBlobRequest
-from snapser.models.storage_batch_update_append_blob_response import StorageBatchUpdateAppendBlobResponse
-from snapser.models.storage_blob_and_owner import StorageBlobAndOwner
-from snapser.models.storage_counter_and_owner import StorageCounterAndOwner
-from snapser.models.storage_delete_append_blob_response import StorageDeleteAppendBlobResponse
-from snapser.models.storage_delete_blob_response import StorageDeleteBlobResponse
-from snapser.models.storage_get_append_blob_request import StorageGetAppendBlobRequest
-from snapser.models.storage_get_append_blob_response import StorageGetAppendBlobResponse
-from snapser.models.storage_get_blob_request import StorageGetBlobRequest
-from snapser.models.storage_get_blob_response import StorageGetBlobResponse
-from snapser.models.storage_get_cas_response import StorageGetCasResponse
-from snapser.models.storage_get_counter_request import StorageGetCounterRequest
-from snapser.models.storage_get_counter_response import StorageGetCounterResponse
-from snapser.models.storage_increment_counter_request import StorageIncrementCounterRequest
-from snapser.models.storage_increment_counter_response import StorageIncrementCounterResponse
-from snapser.models.storage_insert_blob_request import StorageInsertBlobRequest
-from snapser.models.storage_insert_blob_response import StorageInsertBlobResponse
-from snapser.models.storage_replace_blob_request import StorageReplaceBlobRequest
-from snapser.models.storage_replace_blob_response import StorageReplaceBlobResponse
-from snapser.models.storage_reset_counter_response import StorageResetCounterResponse
-from snapser.models.storage_update_append_blob_request import StorageUpdateAppendBlobRequest
-from snapser.models.storage_update_append_blob_response import StorageUpdateAppendBlobResponse
-from snapser.models.storage_user_append_blob_response import StorageUserAppendBlobResponse
-from snapser.models.storage_user_blob_response import StorageUserBlobResponse
-from snapser.models.storage_user_counter_response import StorageUserCounterResponse
-from snapser.models.update_append_blob_request import UpdateAppendBlobRequest
+# Imported on first access by `__getattr__` below
+_LAZY_IMPORTS = {
+    # models
+    'ApiHttpBody': 'snapser.models.api_http_body',
+    'AuthAnonLoginRequest': 'snapser.models.auth_anon_login_request',
+    'AuthAnonLoginResponse': 'snapser.models.auth_anon_login_response',
+    'AuthAppleLoginRequest': 'snapser.models.auth_apple_login_request',
+    'AuthAppleLoginResponse': 'snapser.models.auth_apple_login_response',
+    'AuthAssociateLoginsRequest': 'snapser.models.auth_associate_logins_request',
+    'AuthEmailLoginRequest': 'snapser.models.auth_email_login_request',
+    'AuthEmailLoginResponse': 'snapser.models.auth_email_login_response',
+    'AuthEpicLoginRequest': 'snapser.models.auth_epic_login_request',
+    'AuthEpicLoginResponse': 'snapser.models.auth_epic_login_response',
+    'AuthFacebookLoginRequest': 'snapser.models.auth_facebook_login_request',
+    'AuthFacebookLoginResponse': 'snapser.models.auth_facebook_login_response',
+    'AuthGetUserIdsByLoginIdsResponse': 'snapser.models.auth_get_user_ids_by_login_ids_response',
+    'AuthGoogleLoginRequest': 'snapser.models.auth_google_login_request',
+    'AuthGoogleLoginResponse': 'snapser.models.auth_google_login_response',
+    'AuthLoginTypeType': 'snapser.models.auth_login_type_type',
+    'AuthOtpRequest': 'snapser.models.auth_otp_request',
+    'AuthRefreshRequest': 'snapser.models.auth_refresh_request',
+    'AuthRefreshResponse': 'snapser.models.auth_refresh_response',
+    'AuthSteamLoginRequest': 'snapser.models.auth_steam_login_request',
+    'AuthSteamLoginResponse': 'snapser.models.auth_steam_login_response',
+    'AuthSteamOpenIdLoginRequest': 'snapser.models.auth_steam_open_id_login_request',
+    'AuthSteamSessionTicketLoginRequest': 'snapser.models.auth_steam_session_ticket_login_request',
+    'AuthUser': 'snapser.models.auth_user',
+    'AuthValidateRequest': 'snapser.models.auth_validate_request',
+    'AuthValidateResponse': 'snapser.models.auth_validate_response',
+    'AuthXboxLoginRequest': 'snapser.models.auth_xbox_login_request',
+    'AuthXboxLoginResponse': 'snapser.models.auth_xbox_login_response',
+    'BatchUpdateUserStatisticsRequest': 'snapser.models.batch_update_user_statistics_request',
+    'CharacterActivationResponseSchema': 'snapser.models.character_activation_response_schema',
+    'CharactersResponseSchema': 'snapser.models.characters_response_schema',
+    'ErrorResponseSchema': 'snapser.models.error_response_schema',
+    'IncrementCounterRequest': 'snapser.models.increment_counter_request',
+    'IncrementUserStatisticRequest': 'snapser.models.increment_user_statistic_request',
+    'InsertBlobRequest': 'snapser.models.insert_blob_request',
+    'ProtobufAny': 'snapser.models.protobuf_any',
+    'ReplaceBlobRequest': 'snapser.models.replace_blob_request',
+    'SetUserStatisticRequest': 'snapser.models.set_user_statistic_request',
+    'StatisticsBatchGetUserStatisticsResponse': 'snapser.models.statistics_batch_get_user_statistics_response',
+    'StatisticsBatchGetUserStatisticsSingleResponse': 'snapser.models.statistics_batch_get_user_statistics_single_response',
+    'StatisticsBatchSetUserStatisticsRequest': 'snapser.models.statistics_batch_set_user_statistics_request',
+    'StatisticsBatchSetUserStatisticsResponse': 'snapser.models.statistics_batch_set_user_statistics_response',
+    'StatisticsBatchSetUserStatisticsSingleResponse': 'snapser.models.statistics_batch_set_user_statistics_single_response',
+    'StatisticsBatchUpdateUserStatisticsItem': 'snapser.models.statistics_batch_update_user_statistics_item',
+    'StatisticsBatchUpdateUserStatisticsResponse': 'snapser.models.statistics_batch_update_user_statistics_response',
+    'StatisticsGetUserStatisticsRequest': 'snapser.models.statistics_get_user_statistics_request',
+    'StatisticsGetUserStatisticsResponse': 'snapser.models.statistics_get_user_statistics_response',
+    'StatisticsIsUserInSegmentResponse': 'snapser.models.statistics_is_user_in_segment_response',
+    'StatisticsMultiUserStatistics': 'snapser.models.statistics_multi_user_statistics',
+    'StatisticsSetUserStatisticRequest': 'snapser.models.statistics_set_user_statistic_request',
+    'StatisticsUserStatistic': 'snapser.models.statistics_user_statistic',
+    'StorageAppendBlobAndOwner': 'snapser.models.storage_append_blob_and_owner',
+    'StorageBatchGetAppendBlobsResponse': 'snapser.models.storage_batch_get_append_blobs_response',
+    'StorageBatchGetAppendBlobsSingleResponse': 'snapser.models.storage_batch_get_append_blobs_single_response',
+    'StorageBatchGetBlobsResponse': 'snapser.models.storage_batch_get_blobs_response',
+    'StorageBatchGetBlobsSingleResponse': 'snapser.models.storage_batch_get_blobs_single_response',
+    'StorageBatchGetCountersResponse': 'snapser.models.storage_batch_get_counters_response',
+    'StorageBatchGetCountersSingleResponse': 'snapser.models.storage_batch_get_counters_single_response',
+    'StorageBatchIncrementCounterRequest': 'snapser.models.storage_batch_increment_counter_request',
+    'StorageBatchIncrementCounterResponse': 'snapser.models.storage_batch_increment_counter_response',
+    'StorageBatchInsertBlobRequest': 'snapser.models.storage_batch_insert_blob_request',
+    'StorageBatchInsertBlobResponse': 'snapser.models.storage_batch_insert_blob_response',
+    'StorageBatchReplaceBlobRequest': 'snapser.models.storage_batch_replace_blob_request',
+    'StorageBatchReplaceBlobResponse': 'snapser.models.storage_batch_replace_blob_response',
+    'StorageBatchSingleBlobResponse': 'snapser.models.storage_batch_single_blob_response',
+    'StorageBatchSingleIncrementCounterResponse': 'snapser.models.storage_batch_single_increment_counter_response',
+    'StorageBatchSingleReplaceBlobResponse': 'snapser.models.storage_batch_single_replace_blob_response',
+    'StorageBatchSingleUpdateAppendBlobResponse': 'snapser.models.storage_batch_single_update_append_blob_response',
+    'StorageBatchUpdateAppendBlobRequest': 'snapser.models.storage_batch_update_append_blob_request',
+    'StorageBatchUpdateAppendBlobResponse': 'snapser.models.storage_batch_update_append_blob_response',
+    'StorageBlobAndOwner': 'snapser.models.storage_blob_and_owner',
+    'StorageCounterAndOwner': 'snapser.models.storage_counter_and_owner',
+    'StorageDeleteAppendBlobResponse': 'snapser.models.storage_delete_append_blob_response',
+    'StorageDeleteBlobResponse': 'snapser.models.storage_delete_blob_response',
+    'StorageGetAppendBlobRequest': 'snapser.models.storage_get_append_blob_request',
+    'StorageGetAppendBlobResponse': 'snapser.models.storage_get_append_blob_response',
+    'StorageGetBlobRequest': 'snapser.models.storage_get_blob_request',
+    'StorageGetBlobResponse': 'snapser.models.storage_get_blob_response',
+    'StorageGetCasResponse': 'snapser.models.storage_get_cas_response',
+    'StorageGetCounterRequest': 'snapser.models.storage_get_counter_request',
+    'StorageGetCounterResponse': 'snapser.models.storage_get_counter_response',
+    'StorageIncrementCounterRequest': 'snapser.models.storage_increment_counter_request',
+    'StorageIncrementCounterResponse': 'snapser.models.storage_increment_counter_response',
+    'StorageInsertBlobRequest': 'snapser.models.storage_insert_blob_request',
+    'StorageInsertBlobResponse': 'snapser.models.storage_insert_blob_response',
+    'StorageReplaceBlobRequest': 'snapser.models.storage_replace_blob_request',
+    'StorageReplaceBlobResponse': 'snapser.models.storage_replace_blob_response',
+    'StorageResetCounterResponse': 'snapser.models.storage_reset_counter_response',
+    'StorageUpdateAppendBlobRequest': 'snapser.models.storage_update_append_blob_request',
+    'StorageUpdateAppendBlobResponse': 'snapser.models.storage_update_append_blob_response',
+    'StorageUserAppendBlobResponse': 'snapser.models.storage_user_append_blob_response',
+    'StorageUserBlobResponse': 'snapser.models.storage_user_blob_response',
+    'StorageUserCounterResponse': 'snapser.models.storage_user_counter_response',
+    'UpdateAppendBlobRequest': 'snapser.models.update_append_blob_request',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    # Cache it so later lookups do not come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
@@ -0,0 +1,380 @@
+# coding: utf-8
+
+"""
+    Retries with backoff, a retry budget and per-host circuit breakers.
+
+    Every request the REST transports send goes through `call` (or
+    `call_async`):
+      - Failures are retried with jittered exponential backoff ("full jitter":
+        a random delay up to base * 2^attempt, capped). A request that never
+        reached the Snap (connection refused, connect timeout) is retried for
+        any method. A read error, or a 502/503/504, is only retried for GET,
+        HEAD and OPTIONS: the first attempt may have reached the Snap, and
+        Storage uses PUT for appends and counter increments. A PUT or DELETE
+        that is safe to repeat is marked so by its caller:
+
+            with resilience.idempotent():
+                api.storage_replace_blob(...)
+
+      - Retries draw from a process-wide budget. Each request adds
+        RETRY_BUDGET_RATIO of a token, and the budget also refills at
+        RETRY_BUDGET_MIN_PER_SECOND. Retries can then never be more than about
+        that fraction of traffic, so a degraded Snap does not get extra load.
+      - Each Snap host has a circuit breaker. After BREAKER_FAILURE_THRESHOLD
+        failures in a row (transport errors or 5xx), it opens. While it is
+        open, requests fail at once with CircuitOpenException, without taking
+        a connection or waiting on a timeout. After BREAKER_OPEN_SECONDS, one
+        probe request is let through (half-open). If it succeeds, the breaker
+        closes. If it fails, the breaker opens again.
+
+    `breaker_states()` and `retry_stats()` export the state of this process.
+    The retry layer only runs when `Configuration.retries` is not set; an
+    explicit urllib3 Retry keeps its old behaviour, behind the breaker.
+
+    Tuning (environment variables):
+      - SNAPSER_RETRY_MAX_RETRIES: retries per request (default 2)
+      - SNAPSER_RETRY_BACKOFF_BASE_SECONDS / _MAX_SECONDS: backoff (default 0.05 / 1)
+      - SNAPSER_RETRY_BUDGET_RATIO: retries per request allowed (default 0.1)
+      - SNAPSER_RETRY_BUDGET_MIN_PER_SECOND: retries always allowed (default 1)
+      - SNAPSER_BREAKER_FAILURE_THRESHOLD: failures in a row that open it (default 5)
+      - SNAPSER_BREAKER_OPEN_SECONDS: time before a half-open probe (default 10)
+      - SNAPSER_RESILIENCE: 'false' turns retries and breakers off (default 'true')
+"""  # noqa: E501
+
+
+import contextlib
+import contextvars
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import urllib3
+
+from snapser import deadline
+from snapser.exceptions import CircuitOpenException
+
+
+ENABLED = os.getenv('SNAPSER_RESILIENCE', 'true').lower() != 'false'
+RETRY_MAX_RETRIES = int(os.getenv('SNAPSER_RETRY_MAX_RETRIES', '2'))
+RETRY_BACKOFF_BASE_SECONDS = float(
+    os.getenv('SNAPSER_RETRY_BACKOFF_BASE_SECONDS', '0.05'))
+RETRY_BACKOFF_MAX_SECONDS = float(
+    os.getenv('SNAPSER_RETRY_BACKOFF_MAX_SECONDS', '1'))
+RETRY_BUDGET_RATIO = float(os.getenv('SNAPSER_RETRY_BUDGET_RATIO', '0.1'))
+RETRY_BUDGET_MIN_PER_SECOND = float(
+    os.getenv('SNAPSER_RETRY_BUDGET_MIN_PER_SECOND', '1'))
+BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv('SNAPSER_BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_OPEN_SECONDS = float(os.getenv('SNAPSER_BREAKER_OPEN_SECONDS', '10'))
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+# Set by `idempotent()` for the calls that are safe to repeat
+_idempotent = contextvars.ContextVar('snapser_idempotent', default=False)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one Snap host."""
+
+    def __init__(self, host, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 open_seconds=BREAKER_OPEN_SECONDS):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    def acquire(self):
+        """Return whether the request is the half-open probe. Raises
+        CircuitOpenException when the request must not be sent."""
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            if self._state == OPEN and \
+                    time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._stats['rejected'] += 1
+        raise CircuitOpenException(self.host)
+
+    def record_success(self, probe):
+        with self._lock:
+            self._failures = 0
+            if probe:
+                self._probing = False
+                self._state = CLOSED
+
+    def record_failure(self, probe):
+        with self._lock:
+            self._failures += 1
+            if probe:
+                self._probing = False
+            if probe or (self._state == CLOSED and
+                         self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._stats['opened'] += 1
+
+    def release(self, probe):
+        """The request ended without telling anything about the host."""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def state(self):
+        with self._lock:
+            state = self._state
+            if state == OPEN and \
+                    time.monotonic() - self._opened_at >= self.open_seconds:
+                state = HALF_OPEN
+            return dict(self._stats, state=state,
+                        consecutive_failures=self._failures)
+
+
+class RetryBudget:
+    """Token bucket that caps retries at a fraction of requests."""
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO,
+                 min_per_second=RETRY_BUDGET_MIN_PER_SECOND):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        # Enough for a burst of ten seconds of the minimum rate
+        self.capacity = max(1.0, min_per_second * 10)
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._stats = {'requests': 0, 'retries': 0, 'exhausted': 0}
+
+    def deposit(self):
+        with self._lock:
+            self._stats['requests'] += 1
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens +
+                               (now - self._updated_at) * self.min_per_second)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._stats['retries'] += 1
+                return True
+            self._stats['exhausted'] += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+_breakers = {}
+_lock = threading.Lock()
+_budget = RetryBudget()
+
+
+def _reset_after_fork():
+    # The parent's locks may be held by threads that do not exist in the child
+    global _breakers, _lock, _budget
+    _breakers = {}
+    _lock = threading.Lock()
+    _budget = RetryBudget()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def breaker_for(url):
+    """The circuit breaker of the host of `url`."""
+    parts = urlsplit(url)
+    host = '{0}://{1}'.format(parts.scheme, parts.netloc)
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(host))
+    return breaker
+
+
+def breaker_states():
+    """{host: {'state', 'consecutive_failures', 'opened', 'rejected'}}"""
+    return {host: breaker.state() for host, breaker in list(_breakers.items())}
+
+
+def retry_stats():
+    """Requests, retries, and retries refused by the budget."""
+    return _budget.stats()
+
+
+@contextlib.contextmanager
+def idempotent():
+    """Let the enclosed SDK calls be retried after a read error or a
+    502/503/504 whatever their method. Only for calls that are safe to send
+    twice."""
+    token = _idempotent.set(True)
+    try:
+        yield
+    finally:
+        _idempotent.reset(token)
+
+
+def _idempotent_method(method):
+    return method in IDEMPOTENT_METHODS or _idempotent.get()
+
+
+def backoff(retry):
+    """Full-jitter delay before retry number `retry` (1-based)."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX_SECONDS,
+                                 RETRY_BACKOFF_BASE_SECONDS * 2 ** (retry - 1)))
+
+
+def _urllib3_error_retryable(method, error):
+    if isinstance(error, urllib3.exceptions.MaxRetryError):
+        error = error.reason
+    if isinstance(error, (urllib3.exceptions.NewConnectionError,
+                          urllib3.exceptions.ConnectTimeoutError)):
+        # The request never left this process
+        return True
+    return _idempotent_method(method)
+
+
+def _aiohttp_error_retryable(method, error):
+    import aiohttp
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return True
+    return _idempotent_method(method)
+
+
+def _retry_delay(retry, retries):
+    """Backoff before the next retry, or None if there is no retry left,
+    the budget is spent, or the wait would run past the current deadline."""
+    if not retry or retries >= RETRY_MAX_RETRIES:
+        return None
+    delay = backoff(retries + 1)
+    left = deadline.remaining()
+    if left is not None and left <= delay:
+        return None
+    if not _budget.withdraw():
+        return None
+    return delay
+
+
+def _release(r):
+    # Put the connection back in the pool before retrying
+    release_conn = getattr(r, 'release_conn', None)
+    if release_conn is not None:
+        r.read()
+        release_conn()
+
+
+def _acquire(breaker, last):
+    """Acquire the breaker for an attempt. When it opened while retrying,
+    the caller gets the last failure instead of CircuitOpenException."""
+    try:
+        return breaker.acquire()
+    except CircuitOpenException:
+        if last is None:
+            raise
+        if isinstance(last, BaseException):
+            raise last
+        return None
+
+
+def call(method, url, send, retry=True):
+    """Send a urllib3 request through the breaker and the retry policy.
+
+    `send()` performs one attempt and returns the urllib3 response.
+    """
+    if not ENABLED:
+        return send()
+    breaker = breaker_for(url)
+    _budget.deposit()
+    retries = 0
+    last = None
+    while True:
+        probe = _acquire(breaker, last)
+        if probe is None:
+            return last
+        if last is not None and not isinstance(last, BaseException):
+            _release(last)
+        try:
+            r = send()
+        except urllib3.exceptions.HTTPError as e:
+            breaker.record_failure(probe)
+            delay = _retry_delay(retry, retries) \
+                if _urllib3_error_retryable(method, e) else None
+            if delay is None:
+                raise
+            last = e
+        except BaseException:
+            breaker.release(probe)
+            raise
+        else:
+            if r.status < 500:
+                breaker.record_success(probe)
+                return r
+            breaker.record_failure(probe)
+            delay = _retry_delay(retry, retries) \
+                if r.status in RETRY_STATUSES and \
+                _idempotent_method(method) else None
+            if delay is None:
+                return r
+            last = r
+        retries += 1
+        time.sleep(delay)
+
+
+async def call_async(method, url, send, retry=True):
+    """`call` for the aiohttp transport; `send()` is a coroutine function
+    that returns a response with the body already read."""
+    if not ENABLED:
+        return await send()
+    # Imported here so that blocking clients do not pay for asyncio
+    import asyncio
+    import aiohttp
+    breaker = breaker_for(url)
+    _budget.deposit()
+    retries = 0
+    last = None
+    while True:
+        probe = _acquire(breaker, last)
+        if probe is None:
+            return last
+        try:
+            r = await send()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            breaker.record_failure(probe)
+            delay = _retry_delay(retry, retries) \
+                if _aiohttp_error_retryable(method, e) else None
+            if delay is None:
+                raise
+            last = e
+        except BaseException:
+            breaker.release(probe)
+            raise
+        else:
+            if r.status < 500:
+                breaker.record_success(probe)
+                return r
+            breaker.record_failure(probe)
+            delay = _retry_delay(retry, retries) \
+                if r.status in RETRY_STATUSES and \
+                _idempotent_method(method) else None
+            if delay is None:
+                return r
+            last = r
+        retries += 1
+        await asyncio.sleep(delay)
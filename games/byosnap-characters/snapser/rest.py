@@ -13,14 +13,15 @@
 
 
 import io
-import json
 import logging
 import re
 import ssl
+import threading
 
-from urllib.parse import urlencode, quote_plus
+from urllib.parse import urlencode, quote_plus, urlsplit
 import urllib3
 
+from snapser import deadline, instrumentation, json_codec, resilience
 from snapser.exceptions import ApiException, UnauthorizedException, ForbiddenException, NotFoundException, ServiceException, ApiValueError, BadRequestException
 
 
@@ -44,6 +45,59 @@ class RESTResponse(io.IOBase):
         return self.urllib3_response.headers.get(name, default)
 
 
+def raise_for_status(r):
+    """Raise the ApiException subclass matching a non-2xx response."""
+    if not 200 <= r.status <= 299:
+        if r.status == 400:
+            raise BadRequestException(http_resp=r)
+
+        if r.status == 401:
+            raise UnauthorizedException(http_resp=r)
+
+        if r.status == 403:
+            raise ForbiddenException(http_resp=r)
+
+        if r.status == 404:
+            raise NotFoundException(http_resp=r)
+
+        if 500 <= r.status <= 599:
+            raise ServiceException(http_resp=r)
+
+        raise ApiException(http_resp=r)
+
+
+# Set by the connection pools when the current thread opens a connection
+_local = threading.local()
+
+
+class _TrackedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+
+    def _new_conn(self):
+        _local.opened = True
+        return super()._new_conn()
+
+
+class _TrackedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+
+    def _new_conn(self):
+        _local.opened = True
+        return super()._new_conn()
+
+
+def _observe(url, kwargs, r):
+    # Report one attempt to the instrumentation observers
+    parts = urlsplit(url)
+    host = '{0}://{1}'.format(parts.scheme, parts.netloc)
+    instrumentation.connection(host, not _local.opened)
+    body = kwargs.get('body')
+    if kwargs.get('preload_content', True):
+        received = len(r.data)
+    else:
+        # Reading `data` here would consume the body the caller streams
+        received = int(r.headers.get('Content-Length') or 0)
+    instrumentation.transfer(host, len(body) if body else 0, received)
+
+
 class RESTClientObject:
 
     def __init__(self, configuration, pools_size=4, maxsize=None) -> None:
@@ -65,6 +119,13 @@ class RESTClientObject:
 
         if configuration.retries is not None:
             addition_pool_args['retries'] = configuration.retries
+        elif resilience.ENABLED:
+            # Retries happen in `resilience.call`, with backoff and a budget.
+            # urllib3 only follows redirects.
+            addition_pool_args['retries'] = urllib3.Retry(
+                total=3, connect=0, read=0, status=0)
+        # An explicit `retries` keeps urllib3 in charge of retrying
+        self.resilient_retries = configuration.retries is None
 
         if configuration.tls_server_name:
             addition_pool_args['server_hostname'] = configuration.tls_server_name
@@ -102,6 +163,36 @@ class RESTClientObject:
                 key_file=configuration.key_file,
                 **addition_pool_args
             )
+        # Pools that tell whether a request needed a new connection
+        self.pool_manager.pool_classes_by_scheme = {
+            'http': _TrackedHTTPConnectionPool,
+            'https': _TrackedHTTPSConnectionPool,
+        }
+
+    def _urlopen(self, method, url, **kwargs):
+        # One request through the host's circuit breaker and the retry
+        # policy. Each attempt is bounded by the current deadline.
+        def send():
+            deadline.check()
+            _local.opened = False
+            try:
+                r = self.pool_manager.request(
+                    method, url,
+                    **dict(kwargs,
+                           timeout=deadline.timeout(kwargs.get('timeout')),
+                           headers=deadline.headers(kwargs['headers'])))
+            except (urllib3.exceptions.TimeoutError,
+                    urllib3.exceptions.MaxRetryError) as e:
+                error = deadline.exceeded(e)
+                if error is None:
+                    raise
+                raise error from e
+            if instrumentation.enabled():
+                _observe(url, kwargs, r)
+            return r
+
+        return resilience.call(method, url, send,
+                               retry=self.resilient_retries)
 
     def request(self, method, url, query_params=None, headers=None,
                 body=None, post_params=None, _preload_content=True,
@@ -156,15 +247,15 @@ class RESTClientObject:
                 if not headers.get('Content-Type') or re.search('json', headers['Content-Type'], re.IGNORECASE):
                     request_body = None
                     if body is not None:
-                        request_body = json.dumps(body)
-                    r = self.pool_manager.request(
+                        request_body = json_codec.dumps(body)
+                    r = self._urlopen(
                         method, url,
                         body=request_body,
                         preload_content=_preload_content,
                         timeout=timeout,
                         headers=headers)
                 elif headers['Content-Type'] == 'application/x-www-form-urlencoded':  # noqa: E501
-                    r = self.pool_manager.request(
+                    r = self._urlopen(
                         method, url,
                         fields=post_params,
                         encode_multipart=False,
@@ -176,7 +267,7 @@ class RESTClientObject:
                     # Content-Type which generated by urllib3 will be
                     # overwritten.
                     del headers['Content-Type']
-                    r = self.pool_manager.request(
+                    r = self._urlopen(
                         method, url,
                         fields=post_params,
                         encode_multipart=True,
@@ -188,7 +279,7 @@ class RESTClientObject:
                 # provided in serialized form
                 elif isinstance(body, str) or isinstance(body, bytes):
                     request_body = body
-                    r = self.pool_manager.request(
+                    r = self._urlopen(
                         method, url,
                         body=request_body,
                         preload_content=_preload_content,
@@ -202,11 +293,11 @@ class RESTClientObject:
                     raise ApiException(status=0, reason=msg)
             # For `GET`, `HEAD`
             else:
-                r = self.pool_manager.request(method, url,
-                                              fields={},
-                                              preload_content=_preload_content,
-                                              timeout=timeout,
-                                              headers=headers)
+                r = self._urlopen(method, url,
+                                  fields={},
+                                  preload_content=_preload_content,
+                                  timeout=timeout,
+                                  headers=headers)
         except urllib3.exceptions.SSLError as e:
             msg = "{0}\n{1}".format(type(e).__name__, str(e))
             raise ApiException(status=0, reason=msg)
@@ -217,23 +308,7 @@ class RESTClientObject:
             # log response body
             logger.debug("response body: %s", r.data)
 
-        if not 200 <= r.status <= 299:
-            if r.status == 400:
-                raise BadRequestException(http_resp=r)
-
-            if r.status == 401:
-                raise UnauthorizedException(http_resp=r)
-
-            if r.status == 403:
-                raise ForbiddenException(http_resp=r)
-
-            if r.status == 404:
-                raise NotFoundException(http_resp=r)
-
-            if 500 <= r.status <= 599:
-                raise ServiceException(http_resp=r)
-
-            raise ApiException(http_resp=r)
+        raise_for_status(r)
 
         return r
 
@@ -0,0 +1,153 @@
+'''
+Concurrent character token refresh.
+
+A user can own many characters, and each expiring token is renewed with one
+Auth anon-login call. Running those calls one after another makes a request
+take N Auth round trips. This module fans them out over a bounded, per-worker
+thread pool. It then waits no longer than a per-request deadline and reports
+which characters were refreshed and which were not. Each call runs with a copy
+of the request's context, so it keeps the request deadline (see
+`request_deadlines.py`), and that deadline caps TOKEN_REFRESH_DEADLINE_SECONDS.
+
+Tuning (environment variables):
+  - TOKEN_REFRESH_MAX_WORKERS: concurrent anon-logins per worker process (default 8)
+  - TOKEN_REFRESH_DEADLINE_SECONDS: time budget for all refreshes in a request (default 5)
+'''
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import snapser
+from snapser import deadline
+from snapser.rest import ApiException
+import snapser_clients
+
+
+# Constants
+TOKEN_REFRESH_MAX_WORKERS = int(os.getenv('TOKEN_REFRESH_MAX_WORKERS', '8'))
+TOKEN_REFRESH_DEADLINE_SECONDS = float(
+    os.getenv('TOKEN_REFRESH_DEADLINE_SECONDS', '5'))
+# Tokens that expire within this window are renewed
+TOKEN_REFRESH_WINDOW_SECONDS = 86400
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    '''
+    Lazily create the refresh pool. gunicorn forks its workers, and threads do
+    not survive a fork, so a worker that inherits a pool builds its own.
+    '''
+    global _executor, _executor_lock, _owner_pid
+    if _owner_pid != os.getpid():
+        _executor = None
+        _executor_lock = threading.Lock()
+        _owner_pid = os.getpid()
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=TOKEN_REFRESH_MAX_WORKERS,
+                    thread_name_prefix='token-refresh')
+    return _executor
+
+
+def needs_refresh(character: dict, now: Optional[int] = None) -> bool:
+    '''
+    True if the character token expires within TOKEN_REFRESH_WINDOW_SECONDS.
+    '''
+    if now is None:
+        now = int(time.time())
+    expiry_time = int(character['refreshed_at']) + \
+        int(character['token_validity_seconds'])
+    return expiry_time - now <= TOKEN_REFRESH_WINDOW_SECONDS
+
+
+def anon_login(user_id: str, character_id: str, timeout: Optional[float] = None) -> dict:
+    '''
+    Log the character in anonymously and return its new character record.
+    '''
+    body = snapser.AuthAnonLoginRequest(
+        create_user=True,
+        username=f"{user_id}-{character_id}"
+    )
+    auth_api_response = snapser_clients.auth_api().auth_internal_anon_login(
+        body, _request_timeout=timeout)
+    if auth_api_response is None:
+        raise ApiException(status=500, reason='Empty anon login response')
+    return {
+        'id': auth_api_response.user.id,
+        'session_token': auth_api_response.user.session_token,
+        'refreshed_at': auth_api_response.user.refreshed_at,
+        'token_validity_seconds': auth_api_response.user.token_validity_seconds
+    }
+
+
+def _refresh_before(user_id: str, character_id: str, expires_at: float) -> dict:
+    # Queued calls only get whatever is left of the request budget
+    remaining = expires_at - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError('Token refresh deadline exceeded')
+    return anon_login(user_id, character_id, timeout=remaining)
+
+
+def login_characters(user_id: str, character_ids: List[str],
+                     deadline_seconds: float = TOKEN_REFRESH_DEADLINE_SECONDS
+                     ) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    '''
+    Anon-login every character concurrently, waiting at most `deadline_seconds`.
+
+    Returns (refreshed, failed): new records keyed by character id, and an error
+    message for each character that could not be logged in before the deadline.
+    '''
+    refreshed: Dict[str, dict] = {}
+    failed: Dict[str, str] = {}
+    if not character_ids:
+        return refreshed, failed
+
+    expires_at = time.monotonic() + deadline_seconds
+    request_remaining = deadline.remaining()
+    if request_remaining is not None:
+        expires_at = min(expires_at, time.monotonic() + request_remaining)
+    executor = _get_executor()
+    # Each call runs with a copy of the request's context, so it keeps the
+    # request deadline
+    futures = {
+        executor.submit(contextvars.copy_context().run, _refresh_before,
+                        user_id, character_id, expires_at): character_id
+        for character_id in character_ids
+    }
+    done, not_done = wait(futures, timeout=max(0.0, expires_at - time.monotonic()))
+    for future in done:
+        character_id = futures[future]
+        try:
+            refreshed[character_id] = future.result()
+        except Exception as e:
+            failed[character_id] = str(e)
+    for future in not_done:
+        # Still queued or in flight; the HTTP timeout bounds the in-flight ones
+        future.cancel()
+        failed[futures[future]] = 'Token refresh deadline exceeded'
+    if failed:
+        logging.warning('Token refresh failed for %s/%s characters of %s: %s',
+                        len(failed), len(character_ids), user_id, failed)
+    return refreshed, failed
+
+
+def refresh_expiring(user_id: str, characters: Dict[str, dict],
+                     deadline_seconds: float = TOKEN_REFRESH_DEADLINE_SECONDS
+                     ) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    '''
+    Refresh every character whose token is near expiry, concurrently.
+    The `characters` dict is not modified; see `login_characters` for the result.
+    '''
+    now = int(time.time())
+    expiring = [character_id for character_id, character in characters.items()
+                if needs_refresh(character, now)]
+    return login_characters(user_id, expiring, deadline_seconds)
@@ -0,0 +1,257 @@
+'''
+Background character token refresh.
+
+Without this, `get_characters` renews tokens lazily, on the player's request,
+once a token is within TOKEN_REFRESH_WINDOW_SECONDS of expiring. With the
+scheduler enabled, every worker remembers the users it served recently. It
+keeps a min-heap of when each user's earliest token needs renewing and
+refreshes those users ahead of time on a background thread. In the common
+case `get_characters` then finds nothing to refresh and is a pure read.
+
+Users are refreshed in batches. Anon-logins are rate limited, and every due time
+gets random jitter so that users seen together do not all come due together.
+Writes go through the same CAS merge as activations.
+
+Tuning (environment variables):
+  - TOKEN_SCHEDULER_ENABLED: 'true' to start the scheduler (default 'false')
+  - TOKEN_SCHEDULER_LEAD_SECONDS: refresh this long before the lazy refresh window opens (default 3600)
+  - TOKEN_SCHEDULER_JITTER_SECONDS: random spread added to each due time (default 600)
+  - TOKEN_SCHEDULER_ACTIVE_SECONDS: stop tracking a user not seen for this long (default 86400)
+  - TOKEN_SCHEDULER_MAX_USERS: users tracked per worker (default 10000)
+  - TOKEN_SCHEDULER_BATCH_SIZE: users refreshed per scheduler tick (default 20)
+  - TOKEN_SCHEDULER_MAX_LOGINS_PER_SECOND: anon-login rate limit per worker (default 20)
+'''
+import atexit
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import snapser_clients
+import token_refresh
+from character_activations import activations
+
+
+# Constants
+TOKEN_SCHEDULER_ENABLED = os.getenv(
+    'TOKEN_SCHEDULER_ENABLED', 'false').lower() == 'true'
+TOKEN_SCHEDULER_LEAD_SECONDS = float(
+    os.getenv('TOKEN_SCHEDULER_LEAD_SECONDS', '3600'))
+TOKEN_SCHEDULER_JITTER_SECONDS = float(
+    os.getenv('TOKEN_SCHEDULER_JITTER_SECONDS', '600'))
+TOKEN_SCHEDULER_ACTIVE_SECONDS = float(
+    os.getenv('TOKEN_SCHEDULER_ACTIVE_SECONDS', '86400'))
+TOKEN_SCHEDULER_MAX_USERS = int(os.getenv('TOKEN_SCHEDULER_MAX_USERS', '10000'))
+TOKEN_SCHEDULER_BATCH_SIZE = int(os.getenv('TOKEN_SCHEDULER_BATCH_SIZE', '20'))
+TOKEN_SCHEDULER_MAX_LOGINS_PER_SECOND = float(
+    os.getenv('TOKEN_SCHEDULER_MAX_LOGINS_PER_SECOND', '20'))
+# Delay before retrying a user whose refresh failed
+RETRY_SECONDS = 60.0
+# Longest the scheduler thread sleeps before re-checking the heap
+MAX_IDLE_SECONDS = 5.0
+
+
+class _RateLimiter:
+    '''
+    Token bucket allowing `rate` logins per second with a burst of one second.
+    '''
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+
+    def acquire(self, n: int, stop: threading.Event):
+        # A batch larger than the bucket is let through once the bucket is full
+        n = min(n, self.rate)
+        while not stop.is_set():
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens +
+                              (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return
+            stop.wait((n - self.tokens) / self.rate)
+
+
+class TokenRefreshScheduler:
+    '''
+    Min-heap of (due_at, user_id) drained by one background thread per worker.
+    '''
+
+    def __init__(self, enabled: bool = TOKEN_SCHEDULER_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._heap: List[Tuple[float, str]] = []
+        # Current due time per user; heap entries that disagree are stale
+        self._due: Dict[str, float] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._owner_pid = os.getpid()
+        self._limiter = _RateLimiter(TOKEN_SCHEDULER_MAX_LOGINS_PER_SECOND)
+        self._stats = {'tracked': 0, 'refreshed_users': 0,
+                       'refreshed_characters': 0, 'failed_characters': 0,
+                       'dropped_users': 0}
+
+    def track(self, user_id: str, characters: Dict[str, dict]):
+        '''
+        Remember that the user is active and schedule the refresh of its
+        earliest expiring token. No-op when the scheduler is disabled.
+        '''
+        if not self.enabled or not characters:
+            return
+        self._ensure_thread()
+        due_at = self._due_at(characters)
+        with self._lock:
+            if user_id not in self._last_seen and len(self._last_seen) >= TOKEN_SCHEDULER_MAX_USERS:
+                self._stats['dropped_users'] += 1
+                return
+            self._last_seen[user_id] = time.monotonic()
+            # In the same critical section, so `_forget` never sees the user
+            # seen but not yet scheduled
+            earliest = self._schedule_locked(user_id, due_at)
+        if earliest:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['users'] = len(self._due)
+        return stats
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    @staticmethod
+    def _due_at(characters: Dict[str, dict]) -> float:
+        '''
+        Monotonic time at which the earliest token should be refreshed.
+        '''
+        now = time.time()
+        expiry_time = min(int(character['refreshed_at']) + int(character['token_validity_seconds'])
+                          for character in characters.values())
+        refresh_at = expiry_time - token_refresh.TOKEN_REFRESH_WINDOW_SECONDS - \
+            TOKEN_SCHEDULER_LEAD_SECONDS - \
+            random.uniform(0, TOKEN_SCHEDULER_JITTER_SECONDS)
+        return time.monotonic() + max(0.0, refresh_at - now)
+
+    def _schedule(self, user_id: str, due_at: float):
+        with self._lock:
+            earliest = self._schedule_locked(user_id, due_at)
+        if earliest:
+            self._wakeup.set()
+
+    def _schedule_locked(self, user_id: str, due_at: float) -> bool:
+        # Called with self._lock held. Returns whether the user is now due first.
+        current = self._due.get(user_id)
+        if current is not None and current <= due_at:
+            return False
+        self._due[user_id] = due_at
+        heapq.heappush(self._heap, (due_at, user_id))
+        self._stats['tracked'] += 1
+        return self._heap[0][1] == user_id
+
+    def _forget(self, user_id: str):
+        # A refreshed user that was not rescheduled (no characters left, or the
+        # refresh failed) stops counting towards TOKEN_SCHEDULER_MAX_USERS.
+        # `track` adds it back on its next request.
+        with self._lock:
+            if user_id not in self._due:
+                self._last_seen.pop(user_id, None)
+
+    def _ensure_thread(self):
+        # @GOTCHAS 👋 - Threads do not survive a fork, so each gunicorn worker
+        # starts its own scheduler thread the first time it tracks a user.
+        if self._thread is not None and self._owner_pid == os.getpid():
+            return
+        with self._lock:
+            if self._owner_pid != os.getpid():
+                self._owner_pid = os.getpid()
+                self._thread = None
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='token-scheduler', daemon=True)
+                self._thread.start()
+
+    def _pop_due(self) -> Tuple[List[str], float]:
+        '''
+        Pop up to one batch of due users. Also returns how long to sleep when nothing is due.
+        '''
+        users: List[str] = []
+        now = time.monotonic()
+        with self._lock:
+            while self._heap and len(users) < TOKEN_SCHEDULER_BATCH_SIZE:
+                due_at, user_id = self._heap[0]
+                if self._due.get(user_id) != due_at:
+                    heapq.heappop(self._heap)
+                    continue
+                if due_at > now:
+                    break
+                heapq.heappop(self._heap)
+                del self._due[user_id]
+                if now - self._last_seen.get(user_id, 0) > TOKEN_SCHEDULER_ACTIVE_SECONDS:
+                    # Gone quiet; the lazy refresh in get_characters takes over
+                    self._last_seen.pop(user_id, None)
+                    continue
+                users.append(user_id)
+            idle = min(MAX_IDLE_SECONDS, self._heap[0][0] - now) if self._heap else MAX_IDLE_SECONDS
+        return users, max(0.0, idle)
+
+    def _run(self):
+        while not self._stop.is_set():
+            users, idle = self._pop_due()
+            if not users:
+                self._wakeup.wait(idle)
+                self._wakeup.clear()
+                continue
+            for user_id in users:
+                if self._stop.is_set():
+                    return
+                try:
+                    self._refresh_user(user_id)
+                except Exception as e:
+                    logging.warning(
+                        'Scheduled token refresh failed for %s: %s', user_id, e)
+                finally:
+                    self._forget(user_id)
+
+    def _refresh_user(self, user_id: str):
+        storage_api_instance = snapser_clients.storage_api()
+        cas, characters = activations.read(storage_api_instance, user_id)
+        current = characters.get('characters', {})
+        # Refresh everything that would come due before the next scheduler pass
+        horizon = int(time.time()) + int(TOKEN_SCHEDULER_LEAD_SECONDS +
+                                          TOKEN_SCHEDULER_JITTER_SECONDS)
+        expiring = [character_id for character_id, character in current.items()
+                    if token_refresh.needs_refresh(character, horizon)]
+        failed: Dict[str, str] = {}
+        if expiring:
+            self._limiter.acquire(len(expiring), self._stop)
+            refreshed, failed = token_refresh.login_characters(
+                user_id, expiring)
+            with self._lock:
+                self._stats['failed_characters'] += len(failed)
+            if refreshed:
+                characters = activations.merge(
+                    user_id, refreshed, current=(cas, characters))
+                with self._lock:
+                    self._stats['refreshed_users'] += 1
+                    self._stats['refreshed_characters'] += len(refreshed)
+        # Schedule the next pass for this user, backing off if a login failed
+        current = characters.get('characters', {})
+        if current:
+            due_at = self._due_at(current)
+            if expiring and failed:
+                due_at = max(due_at, time.monotonic() + RETRY_SECONDS)
+            self._schedule(user_id, due_at)
+
+
+token_scheduler = TokenRefreshScheduler()
+atexit.register(token_scheduler.stop)